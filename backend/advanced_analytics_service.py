@@ -24,7 +24,7 @@ class AdvancedAnalyticsService:
             # Get page views
             page_views = await self.db.analytics_events.count_documents({
                 "event_type": "page_view",
-                "created_at": {"$gte": start_date.isoformat()}
+                "created_at": {"$gte": start_date}
             })
             
             # Get unique visitors
@@ -32,7 +32,7 @@ class AdvancedAnalyticsService:
                 {
                     "$match": {
                         "event_type": "page_view",
-                        "created_at": {"$gte": start_date.isoformat()}
+                        "created_at": {"$gte": start_date}
                     }
                 },
                 {
@@ -51,7 +51,7 @@ class AdvancedAnalyticsService:
                 {
                     "$match": {
                         "event_type": "session_end",
-                        "created_at": {"$gte": start_date.isoformat()}
+                        "created_at": {"$gte": start_date}
                     }
                 },
                 {
@@ -77,7 +77,7 @@ class AdvancedAnalyticsService:
                 {
                     "$match": {
                         "event_type": "session_end",
-                        "created_at": {"$gte": start_date.isoformat()}
+                        "created_at": {"$gte": start_date}
                     }
                 },
                 {
@@ -308,7 +308,7 @@ class AdvancedAnalyticsService:
                 pipeline = [
                     {
                         "$match": {
-                            "created_at": {"$gte": start_date.isoformat()},
+                            "created_at": {"$gte": start_date},
                             "items.product_id": product_id
                         }
                     },
@@ -374,19 +374,14 @@ class AdvancedAnalyticsService:
             pipeline = [
                 {
                     "$match": {
-                        "created_at": {"$gte": start_date.isoformat()}
-                    }
-                },
-                {
-                    "$addFields": {
-                        "created_date": {"$toDate": "$created_at"}
+                        "created_at": {"$gte": start_date}
                     }
                 },
                 {
                     "$group": {
                         "_id": {
-                            "year": {"$year": "$created_date"},
-                            "month": {"$month": "$created_date"}
+                            "year": {"$year": "$created_at"},
+                            "month": {"$month": "$created_at"}
                         },
                         "orders_count": {"$sum": 1},
                         "revenue": {"$sum": "$total_amount"}
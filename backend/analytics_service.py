@@ -6,6 +6,8 @@ from datetime import datetime, timezone, timedelta
 from typing import Dict, List, Any
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
+from category_tree import category_tree
+
 class AnalyticsService:
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
@@ -25,11 +27,11 @@ class AnalyticsService:
         week_ago = now - timedelta(days=7)
         
         users_this_month = await self.db.users.count_documents({
-            "created_at": {"$gte": month_ago.isoformat()}
+            "created_at": {"$gte": month_ago}
         })
         
         orders_this_month = await self.db.orders.count_documents({
-            "created_at": {"$gte": month_ago.isoformat()}
+            "created_at": {"$gte": month_ago}
         })
         
         return {
@@ -51,7 +53,7 @@ class AnalyticsService:
             {
                 "$match": {
                     "payment_status": "paid",
-                    "created_at": {"$gte": start_date.isoformat()}
+                    "created_at": {"$gte": start_date}
                 }
             },
             {
@@ -59,7 +61,7 @@ class AnalyticsService:
                     "_id": {
                         "$dateToString": {
                             "format": "%Y-%m-%d",
-                            "date": {"$dateFromString": {"dateString": "$created_at"}}
+                            "date": "$created_at"
                         }
                     },
                     "revenue": {"$sum": "$total_amount"},
@@ -115,32 +117,17 @@ class AnalyticsService:
         return top_products
     
     async def get_category_distribution(self) -> List[Dict[str, Any]]:
-        """Get product distribution by category"""
-        pipeline = [
-            {
-                "$group": {
-                    "_id": "$category_id",
-                    "count": {"$sum": 1}
-                }
-            },
-            {"$sort": {"count": -1}},
-            {"$limit": 10}
+        """Get published product distribution by category"""
+        # Read from the materialized category stats instead of grouping all products
+        results = await self.db.category_stats.find(
+            {"own.count": {"$gt": 0}}, {"_id": 0, "id": 1, "own.count": 1}
+        ).sort("own.count", -1).limit(10).to_list(10)
+
+        names = {cat["id"]: cat["name"] for cat in await category_tree.categories(self.db)}
+        return [
+            {"category": names[r["id"]], "count": r["own"]["count"]}
+            for r in results if r["id"] in names
         ]
-        
-        results = await self.db.products.aggregate(pipeline).to_list(10)
-        
-        # Enrich with category names
-        distribution = []
-        for r in results:
-            if r["_id"]:
-                category = await self.db.categories.find_one({"id": r["_id"]}, {"_id": 0, "name": 1})
-                if category:
-                    distribution.append({
-                        "category": category["name"],
-                        "count": r["count"]
-                    })
-        
-        return distribution
     
     async def get_user_growth(self, days: int = 30) -> List[Dict[str, Any]]:
         """Get user registration growth"""
@@ -150,7 +137,7 @@ class AnalyticsService:
         pipeline = [
             {
                 "$match": {
-                    "created_at": {"$gte": start_date.isoformat()}
+                    "created_at": {"$gte": start_date}
                 }
             },
             {
@@ -158,7 +145,7 @@ class AnalyticsService:
                     "_id": {
                         "$dateToString": {
                             "format": "%Y-%m-%d",
-                            "date": {"$dateFromString": {"dateString": "$created_at"}}
+                            "date": "$created_at"
                         }
                     },
                     "count": {"$sum": 1}
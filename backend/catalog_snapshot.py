@@ -0,0 +1,325 @@
+"""
+Catalog Snapshot
+Columnar in-memory view of published products for listing queries
+
+Category listings only need a handful of numeric columns to filter and
+sort, so they are held as NumPy arrays (one row per published product)
+and answered with vectorized masks plus argpartition/lexsort. Only the
+final page of documents is fetched from MongoDB, by id.
+
+The snapshot is kept current through catalog_sync on every product write
+and refreshed periodically from `updated_at` to pick up writes made by
+other processes. When a refresh has not succeeded within
+CATALOG_MAX_STALENESS seconds, listings fall back to MongoDB.
+
+Missing numeric values are stored as -inf, which sorts like null does in
+MongoDB (lowest), so the order and keyset cursors match the Mongo path.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from config import CATALOG_MAX_STALENESS, CATALOG_REFRESH_INTERVAL, CATALOG_SNAPSHOT_ENABLED
+
+logger = logging.getLogger(__name__)
+
+NUMERIC_COLUMNS = ("price", "rating", "reviews_count", "views_count", "trending_rank", "created_at")
+INITIAL_CAPACITY = 1024
+# Clock skew allowance when refreshing by updated_at
+REFRESH_OVERLAP = timedelta(seconds=5)
+
+
+def _number(value: Any) -> float:
+    if value is None:
+        return -np.inf
+    if isinstance(value, str):
+        # Legacy documents store dates as ISO strings
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            pass
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return -np.inf
+
+
+class CatalogSnapshot:
+    """Columnar arrays over published products with incremental updates"""
+
+    def __init__(self, enabled: bool = CATALOG_SNAPSHOT_ENABLED):
+        self.enabled = enabled
+        self.ready = False
+        self._refreshed_at = 0.0
+        self._synced_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+        self._reset(INITIAL_CAPACITY)
+
+    def _reset(self, capacity: int) -> None:
+        self._size = 0
+        self._live = 0
+        self._rows: Dict[str, int] = {}
+        self._codes: Dict[str, Dict[str, int]] = {"category_id": {}, "seller_id": {}}
+        self.ids = np.empty(capacity, dtype="U36")
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.columns = {name: np.full(capacity, -np.inf) for name in NUMERIC_COLUMNS}
+        self.category = np.full(capacity, -1, dtype=np.int32)
+        self.seller = np.full(capacity, -1, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return self._live
+
+    @property
+    def fresh(self) -> bool:
+        """True when listings may be served from the snapshot"""
+        return self.enabled and self.ready and time.monotonic() - self._refreshed_at < CATALOG_MAX_STALENESS
+
+    # ---- incremental maintenance ----
+
+    def _code(self, kind: str, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        codes = self._codes[kind]
+        if value not in codes:
+            codes[value] = len(codes)
+        return codes[value]
+
+    def _grow(self) -> None:
+        capacity = len(self.ids) * 2
+        self.ids = np.concatenate([self.ids, np.empty(capacity - len(self.ids), dtype=self.ids.dtype)])
+        self.alive = np.concatenate([self.alive, np.zeros(capacity - len(self.alive), dtype=bool)])
+        for name, column in self.columns.items():
+            self.columns[name] = np.concatenate([column, np.full(capacity - len(column), -np.inf)])
+        self.category = np.concatenate([self.category, np.full(capacity - len(self.category), -1, dtype=np.int32)])
+        self.seller = np.concatenate([self.seller, np.full(capacity - len(self.seller), -1, dtype=np.int32)])
+
+    def index_product(self, product: Dict[str, Any]) -> None:
+        """Insert or update a product row; unpublished products are dropped"""
+        product_id = product.get("id")
+        if not product_id:
+            return
+        if product.get("status", "published") != "published":
+            self.remove_product(product_id)
+            return
+
+        row = self._rows.get(product_id)
+        if row is None:
+            if self._size == len(self.ids):
+                self._grow()
+            if len(product_id) > self.ids.dtype.itemsize // 4:
+                self.ids = self.ids.astype(f"U{len(product_id)}")
+            row = self._size
+            self._size += 1
+            self._rows[product_id] = row
+            self.ids[row] = product_id
+            self.alive[row] = True
+            self._live += 1
+
+        for name in NUMERIC_COLUMNS:
+            self.columns[name][row] = _number(product.get(name))
+        self.category[row] = self._code("category_id", product.get("category_id"))
+        self.seller[row] = self._code("seller_id", product.get("seller_id"))
+
+    def update_stats(self, product_id: str, **fields: Any) -> None:
+        """Refresh counters (rating, views...) of an existing row"""
+        row = self._rows.get(product_id)
+        if row is None:
+            return
+        for name, value in fields.items():
+            if name in self.columns and value is not None:
+                self.columns[name][row] = _number(value)
+
+    def remove_product(self, product_id: str) -> None:
+        """Drop a product; the row is reclaimed on the next rebuild"""
+        row = self._rows.pop(product_id, None)
+        if row is None:
+            return
+        self.alive[row] = False
+        self._live -= 1
+
+    # ---- querying ----
+
+    def listing(
+        self,
+        sort_fields: Sequence[Tuple[str, int]],
+        category_ids: Optional[Iterable[str]] = None,
+        seller_id: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        after: Optional[List[Any]] = None,
+        offset: int = 0,
+        limit: int = 50,
+    ) -> Optional[List[str]]:
+        """
+        Return one page of product ids, or None if this sort order cannot be
+        served from the snapshot. `sort_fields` must end with the `id`
+        tie-breaker and use one direction throughout; `after` holds the
+        keyset cursor values for those fields.
+        """
+        names = [name for name, _ in sort_fields]
+        directions = {direction for _, direction in sort_fields}
+        if names[-1] != "id" or len(directions) != 1 or any(n not in self.columns for n in names[:-1]):
+            return None
+        descending = directions.pop() < 0
+
+        n = self._size
+        mask = self.alive[:n].copy()
+        if category_ids is not None:
+            codes = [self._codes["category_id"][c] for c in category_ids if c in self._codes["category_id"]]
+            mask &= np.isin(self.category[:n], codes)
+        if seller_id is not None:
+            mask &= self.seller[:n] == self._codes["seller_id"].get(seller_id, -2)
+        if min_price is not None or max_price is not None:
+            price = self.columns["price"][:n]
+            mask &= np.isfinite(price)
+            if min_price is not None:
+                mask &= price >= min_price
+            if max_price is not None:
+                mask &= price <= max_price
+
+        keys = [self.columns[name][:n] for name in names[:-1]] + [self.ids[:n]]
+        if after is not None:
+            mask &= self._after(keys, after, descending)
+
+        rows = np.flatnonzero(mask)
+        wanted = offset + limit
+        if wanted <= 0 or rows.size == 0:
+            return []
+
+        # Narrow to the rows that can reach the page by the primary key
+        # before the full lexicographic sort
+        if rows.size > 4 * wanted:
+            primary = keys[0][rows]
+            if descending:
+                threshold = np.partition(primary, rows.size - wanted)[rows.size - wanted]
+                rows = rows[primary >= threshold]
+            else:
+                threshold = np.partition(primary, wanted - 1)[wanted - 1]
+                rows = rows[primary <= threshold]
+
+        order = np.lexsort([key[rows] for key in reversed(keys)])
+        if descending:
+            order = order[::-1]
+        return self.ids[rows[order[offset:wanted]]].tolist()
+
+    def sort_key(self, product_id: str, sort_fields: Sequence[Tuple[str, int]]) -> Optional[List[Any]]:
+        """
+        Keyset cursor values of a product for `sort_fields`, as the Mongo path
+        encodes them (datetimes for created_at, None for missing values)
+        """
+        row = self._rows.get(product_id)
+        if row is None:
+            return None
+        values: List[Any] = []
+        for name, _ in sort_fields:
+            if name == "id":
+                values.append(product_id)
+                continue
+            value = float(self.columns[name][row])
+            if value == -np.inf:
+                values.append(None)
+            elif name == "created_at":
+                values.append(datetime.fromtimestamp(value, timezone.utc))
+            else:
+                values.append(value)
+        return values
+
+    @staticmethod
+    def _after(keys: List[np.ndarray], values: List[Any], descending: bool) -> np.ndarray:
+        """Vectorized keyset predicate: rows strictly after `values`"""
+        after = np.zeros(len(keys[0]), dtype=bool)
+        equal = np.ones(len(keys[0]), dtype=bool)
+        for key, value in zip(keys, values):
+            value = value if key.dtype.kind == "U" else _number(value)
+            after |= equal & (key < value if descending else key > value)
+            equal &= key == value
+        return after
+
+    # ---- building ----
+
+    _STATE = ("_size", "_live", "_rows", "_codes", "ids", "alive", "columns", "category", "seller")
+
+    async def build(self, db: AsyncIOMotorDatabase) -> None:
+        """
+        Rebuild all columns from published products. The new arrays are
+        filled aside and swapped in, so listings keep using the old ones
+        meanwhile; writes made during the build are picked up by the next
+        refresh.
+        """
+        started = datetime.now(timezone.utc)
+        projection = {"_id": 0, "id": 1, "status": 1, "category_id": 1, "seller_id": 1}
+        projection.update({name: 1 for name in NUMERIC_COLUMNS})
+
+        total = await db.products.count_documents({"status": "published"})
+        fresh = CatalogSnapshot(enabled=self.enabled)
+        fresh._reset(max(INITIAL_CAPACITY, total + total // 4))
+        count = 0
+        async for product in db.products.find({"status": "published"}, projection):
+            fresh.index_product(product)
+            count += 1
+            if count % 5000 == 0:
+                await asyncio.sleep(0)
+
+        for name in self._STATE:
+            setattr(self, name, getattr(fresh, name))
+        self._synced_at = started
+        self._refreshed_at = time.monotonic()
+        self.ready = True
+        logger.info(f"Catalog snapshot built with {count} products")
+
+    async def refresh(self, db: AsyncIOMotorDatabase) -> None:
+        """
+        Apply products changed since the last sync. Deletions are not visible
+        by updated_at, so a published-count mismatch triggers a full rebuild,
+        as does a large share of dead rows.
+        """
+        started = datetime.now(timezone.utc)
+        projection = {"_id": 0, "id": 1, "status": 1, "category_id": 1, "seller_id": 1}
+        projection.update({name: 1 for name in NUMERIC_COLUMNS})
+        async for product in db.products.find({"updated_at": {"$gte": self._synced_at - REFRESH_OVERLAP}}, projection):
+            self.index_product(product)
+
+        published = await db.products.count_documents({"status": "published"})
+        if published != self._live or self._size > 2 * max(self._live, INITIAL_CAPACITY):
+            await self.build(db)
+            return
+        self._synced_at = started
+        self._refreshed_at = time.monotonic()
+
+    async def _run(self, db: AsyncIOMotorDatabase) -> None:
+        try:
+            await self.build(db)
+        except Exception as e:
+            logger.error(f"Catalog snapshot failed to build, listings use Mongo: {str(e)}")
+        while True:
+            await asyncio.sleep(CATALOG_REFRESH_INTERVAL)
+            try:
+                if self.ready:
+                    await self.refresh(db)
+                else:
+                    await self.build(db)
+            except Exception as e:
+                logger.error(f"Catalog snapshot refresh failed: {str(e)}")
+
+    def start(self, db: AsyncIOMotorDatabase) -> None:
+        """Build in the background and keep refreshing; no-op when disabled"""
+        if self.enabled:
+            self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+
+# Global instance
+catalog_snapshot = CatalogSnapshot()
@@ -0,0 +1,91 @@
+"""
+Catalog change propagation
+
+Product writes go to MongoDB first and are then pushed to the in-process
+indexes and caches through these helpers, so routes have a single call per write
+instead of knowing about every index.
+"""
+from typing import Any, Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from catalog_snapshot import catalog_snapshot
+from category_stats import category_stats
+from product_cache import product_cache
+from seller_stats import seller_stats
+from search_service import search_index
+from suggestion_service import suggestion_index
+
+
+def product_saved(product: Dict[str, Any], previous: Optional[Dict[str, Any]] = None) -> None:
+    """
+    A product was created or updated; `product` is the stored document and
+    `previous` the one it replaced (None for new products)
+    """
+    product_cache.invalidate(product.get("id"))
+    search_index.index_product(product)
+    suggestion_index.index_product(product)
+    catalog_snapshot.index_product(product)
+    category_stats.record(previous, product)
+    seller_stats.record_product(previous, product)
+
+
+def product_deleted(product_id: str, previous: Optional[Dict[str, Any]] = None) -> None:
+    """A product was deleted; `previous` is the removed document if known"""
+    product_cache.invalidate(product_id)
+    search_index.remove_product(product_id)
+    suggestion_index.remove_product(product_id)
+    catalog_snapshot.remove_product(product_id)
+    category_stats.record(previous, None)
+    seller_stats.record_product(previous, None)
+
+
+def product_changed(product_id: str) -> None:
+    """Fields that no index covers (flags such as is_bestseller) changed"""
+    product_cache.invalidate(product_id)
+
+
+def product_stats_changed(product_id: str, **fields: Any) -> None:
+    """Counters such as rating, reviews_count, views_count or trending_rank changed"""
+    product_cache.invalidate(product_id)
+    search_index.update_meta(product_id, **fields)
+    catalog_snapshot.update_stats(product_id, **fields)
+    if "views_count" in fields or "rating" in fields:
+        suggestion_index.update_rank(
+            product_id, views_count=fields.get("views_count"), rating=fields.get("rating")
+        )
+
+
+def product_views_changed(product_id: str, views_count: Any, trending_rank: Any) -> None:
+    """
+    The view counter flushed new views. Cached products are left alone and show
+    the views as of their caching until they expire
+    """
+    search_index.update_meta(product_id, views_count=views_count, trending_rank=trending_rank)
+    catalog_snapshot.update_stats(product_id, views_count=views_count, trending_rank=trending_rank)
+    suggestion_index.update_rank(product_id, views_count=views_count, rating=None)
+
+
+def product_stock_changed(product: Dict[str, Any], previous_stock: int) -> None:
+    """
+    Only stock_level changed, e.g. by an inventory reservation; `product`
+    holds the fields category stats need
+    """
+    product_cache.invalidate(product["id"])
+    category_stats.record({**product, "stock_level": previous_stock}, product)
+
+
+def start(db: AsyncIOMotorDatabase) -> None:
+    """Load all in-process indexes in the background"""
+    search_index.start(db)
+    suggestion_index.start(db)
+    catalog_snapshot.start(db)
+    category_stats.start(db)
+
+
+async def stop() -> None:
+    """Stop background work and persist what needs persisting"""
+    await category_stats.stop()
+    await catalog_snapshot.stop()
+    await suggestion_index.stop()
+    await search_index.stop()
@@ -0,0 +1,272 @@
+"""
+Category Stats
+Materialized product counts and price ranges per category
+
+The `category_stats` collection holds one document per category:
+
+    {"id": <category_id>,
+     "own":   {"count", "in_stock", "price_sum", "min_price", "max_price"},
+     "total": {... same, including every subcategory ...}}
+
+Only published products are counted. Product writes report the previous
+and the new version of the product through catalog_sync; the deltas are
+buffered and flushed as one bulk_write of $inc/$min/$max updates on the
+category and its ancestors. When a removed price may have been a min or
+max, that bound is re-read with an indexed sort. A periodic reconcile
+rebuilds everything from `products` to absorb drift, such as writes made
+by other processes or scripts.
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import DeleteMany, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from category_tree import category_tree
+from config import CATEGORY_STATS_FLUSH_INTERVAL, CATEGORY_STATS_RECONCILE_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+SCOPES = ("own", "total")
+Contribution = Tuple[str, float, int]
+
+
+def _contribution(product: Optional[Dict[str, Any]]) -> Optional[Contribution]:
+    """(category_id, price, in_stock) a product adds to the stats, if any"""
+    if not product or product.get("status", "published") != "published" or not product.get("category_id"):
+        return None
+    return product["category_id"], float(product.get("price") or 0), int((product.get("stock_level") or 0) > 0)
+
+
+def _empty() -> Dict[str, Any]:
+    return {"count": 0, "in_stock": 0, "price_sum": 0.0, "min_price": None, "max_price": None}
+
+
+def format_stats(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Public representation with the average price"""
+    result = {"category_id": doc["id"]}
+    for scope in SCOPES:
+        stats = {**_empty(), **(doc.get(scope) or {})}
+        result[scope] = {
+            "product_count": stats["count"],
+            "in_stock_count": stats["in_stock"],
+            "min_price": stats["min_price"],
+            "max_price": stats["max_price"],
+            "avg_price": round(stats["price_sum"] / stats["count"], 2) if stats["count"] else None,
+        }
+    return result
+
+
+class CategoryStats:
+    """Buffers product changes and maintains the category_stats collection"""
+
+    def __init__(self):
+        self._pending: List[Tuple[Optional[Contribution], Optional[Contribution]]] = []
+        # Updates a failed flush built but could not write, retried by the next flush
+        self._retry: List[UpdateOne] = []
+        self._db: Optional[AsyncIOMotorDatabase] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        # Set when the category hierarchy changed and rollups must be recomputed
+        self._stale = False
+
+    def invalidate(self) -> None:
+        """Reconcile on the next tick, e.g. after categories were moved"""
+        self._stale = True
+
+    def record(self, previous: Optional[Dict[str, Any]], current: Optional[Dict[str, Any]]) -> None:
+        """Queue the change from `previous` to `current` (None = absent)"""
+        old, new = _contribution(previous), _contribution(current)
+        if old != new:
+            self._pending.append((old, new))
+
+    async def _scopes(self, category_id: str) -> List[Tuple[str, str]]:
+        ancestors = await category_tree.path(self._db, category_id)
+        return [("own", category_id)] + [("total", cat) for cat in [category_id] + ancestors]
+
+    async def flush(self) -> int:
+        """Apply buffered changes; returns the number of categories touched"""
+        if self._db is None:
+            return 0
+        async with self._lock:
+            pending, self._pending = self._pending, []
+            retry, self._retry = self._retry, []
+            if not pending and not retry:
+                return 0
+            try:
+                operations, removed = await self._updates(pending)
+            except Exception:
+                # Nothing was written; keep it all for the next flush
+                self._pending[:0] = pending
+                self._retry[:0] = retry
+                raise
+
+            operations = retry + operations
+            failed: List[UpdateOne] = []
+            try:
+                await self._db.category_stats.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                failed = [operations[error["index"]] for error in e.details.get("writeErrors", [])]
+                self._retry.extend(failed)
+                logger.error(f"Failed to update {len(failed)} category stats documents, retrying: {str(e)}")
+            except Exception as e:
+                self._retry.extend(operations)
+                logger.error(f"Failed to update category stats, retrying: {str(e)}")
+                return 0
+
+            await self._refresh_bounds(removed)
+            return len(operations) - len(failed)
+
+    async def _updates(
+        self, pending: List[Tuple[Optional[Contribution], Optional[Contribution]]]
+    ) -> Tuple[List[UpdateOne], Dict[Tuple[str, str], List[float]]]:
+        """One $inc/$min/$max upsert per touched category, and the prices removed per scope"""
+        inc: Dict[str, Dict[str, float]] = {}
+        low: Dict[str, Dict[str, float]] = {}
+        high: Dict[str, Dict[str, float]] = {}
+        removed: Dict[Tuple[str, str], List[float]] = {}
+        for old, new in pending:
+            for sign, contribution in ((-1, old), (1, new)):
+                if contribution is None:
+                    continue
+                category_id, price, in_stock = contribution
+                for scope, cat in await self._scopes(category_id):
+                    fields = inc.setdefault(cat, {})
+                    fields[f"{scope}.count"] = fields.get(f"{scope}.count", 0) + sign
+                    fields[f"{scope}.in_stock"] = fields.get(f"{scope}.in_stock", 0) + sign * in_stock
+                    fields[f"{scope}.price_sum"] = fields.get(f"{scope}.price_sum", 0.0) + sign * price
+                    if sign > 0:
+                        key = f"{scope}.min_price"
+                        low.setdefault(cat, {})[key] = min(low.get(cat, {}).get(key, price), price)
+                        key = f"{scope}.max_price"
+                        high.setdefault(cat, {})[key] = max(high.get(cat, {}).get(key, price), price)
+                    else:
+                        removed.setdefault((scope, cat), []).append(price)
+
+        now = datetime.now(timezone.utc)
+        operations = []
+        for cat, fields in inc.items():
+            update: Dict[str, Any] = {"$inc": fields, "$set": {"updated_at": now}}
+            if cat in low:
+                update["$min"] = low[cat]
+                update["$max"] = high[cat]
+            operations.append(UpdateOne({"id": cat}, update, upsert=True))
+        return operations, removed
+
+    async def _refresh_bounds(self, removed: Dict[Tuple[str, str], List[float]]) -> None:
+        """Re-read min/max where a removed price may have been the bound"""
+        if not removed:
+            return
+        categories = list({cat for _, cat in removed})
+        docs = {
+            doc["id"]: doc
+            async for doc in self._db.category_stats.find({"id": {"$in": categories}}, {"_id": 0})
+        }
+        operations = []
+        for (scope, cat), prices in removed.items():
+            stats = (docs.get(cat) or {}).get(scope) or {}
+            min_price, max_price = stats.get("min_price"), stats.get("max_price")
+            if (min_price is None or min(prices) > min_price) and (max_price is None or max(prices) < max_price):
+                continue
+            category_ids = [cat] if scope == "own" else await category_tree.descendant_ids(self._db, cat)
+            query = {"status": "published", "category_id": {"$in": category_ids}, "price": {"$ne": None}}
+            bounds = {}
+            for field, direction in (("min_price", 1), ("max_price", -1)):
+                found = await self._db.products.find(query, {"_id": 0, "price": 1}).sort(
+                    "price", direction).limit(1).to_list(1)
+                if found and found[0].get("price") is not None:
+                    bounds[f"{scope}.{field}"] = found[0]["price"]
+            if bounds:
+                operations.append(UpdateOne({"id": cat}, {"$set": bounds}))
+            else:
+                # No products left: unset, since $min would keep a null forever
+                operations.append(UpdateOne({"id": cat}, {"$unset": {f"{scope}.min_price": "", f"{scope}.max_price": ""}}))
+        if operations:
+            await self._db.category_stats.bulk_write(operations, ordered=False)
+
+    async def reconcile(self, db: AsyncIOMotorDatabase) -> int:
+        """Recompute all stats from products in one aggregation"""
+        async with self._lock:
+            # Changes queued so far are contained in the aggregation below
+            queued = len(self._pending)
+            count = await self._reconcile(db)
+            del self._pending[:queued]
+            self._retry.clear()
+        logger.info(f"Category stats reconciled for {count} categories")
+        return count
+
+    async def _reconcile(self, db: AsyncIOMotorDatabase) -> int:
+        pipeline = [
+            {"$match": {"status": "published", "category_id": {"$ne": None}}},
+            {"$group": {
+                "_id": "$category_id",
+                "count": {"$sum": 1},
+                "in_stock": {"$sum": {"$cond": [{"$gt": ["$stock_level", 0]}, 1, 0]}},
+                "price_sum": {"$sum": {"$ifNull": ["$price", 0]}},
+                "min_price": {"$min": "$price"},
+                "max_price": {"$max": "$price"},
+            }},
+        ]
+        own = {row.pop("_id"): row async for row in db.products.aggregate(pipeline)}
+
+        total: Dict[str, Dict[str, Any]] = {}
+        for category_id, stats in own.items():
+            for cat in [category_id] + await category_tree.path(db, category_id):
+                rollup = total.setdefault(cat, _empty())
+                rollup["count"] += stats["count"]
+                rollup["in_stock"] += stats["in_stock"]
+                rollup["price_sum"] += stats["price_sum"]
+                for field, pick in (("min_price", min), ("max_price", max)):
+                    if stats[field] is not None:
+                        rollup[field] = stats[field] if rollup[field] is None else pick(rollup[field], stats[field])
+
+        now = datetime.now(timezone.utc)
+        operations = []
+        for cat in set(own) | set(total):
+            doc = {"id": cat, "updated_at": now}
+            for scope, values in (("own", own.get(cat)), ("total", total.get(cat))):
+                # Omit empty bounds so later $min/$max updates can set them
+                doc[scope] = {k: v for k, v in {**_empty(), **(values or {})}.items() if v is not None}
+            operations.append(ReplaceOne({"id": cat}, doc, upsert=True))
+        operations.append(DeleteMany({"id": {"$nin": list(set(own) | set(total))}}))
+        await db.category_stats.bulk_write(operations, ordered=False)
+        return len(operations) - 1
+
+    async def get_all(self, db: AsyncIOMotorDatabase) -> List[Dict[str, Any]]:
+        return [format_stats(doc) async for doc in db.category_stats.find({}, {"_id": 0})]
+
+    async def get(self, db: AsyncIOMotorDatabase, category_id: str) -> Dict[str, Any]:
+        doc = await db.category_stats.find_one({"id": category_id}, {"_id": 0})
+        return format_stats(doc or {"id": category_id})
+
+    async def _run(self, db: AsyncIOMotorDatabase) -> None:
+        elapsed = CATEGORY_STATS_RECONCILE_INTERVAL
+        while True:
+            try:
+                if self._stale or elapsed >= CATEGORY_STATS_RECONCILE_INTERVAL:
+                    elapsed, self._stale = 0, False
+                    await self.reconcile(db)
+                else:
+                    await asyncio.shield(self.flush())
+            except Exception as e:
+                logger.error(f"Category stats update failed: {str(e)}")
+            await asyncio.sleep(CATEGORY_STATS_FLUSH_INTERVAL)
+            elapsed += CATEGORY_STATS_FLUSH_INTERVAL
+
+    def start(self, db: AsyncIOMotorDatabase) -> None:
+        """Reconcile once, then flush changes and reconcile periodically"""
+        self._db = db
+        self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+
+# Global instance
+category_stats = CategoryStats()
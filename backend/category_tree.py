@@ -0,0 +1,110 @@
+"""
+Category Tree Cache
+In-memory category hierarchy with materialized ancestor paths
+
+All categories are loaded once and linked in a single pass. Every node
+keeps its ancestor path (root first), from which each category's
+descendant set is derived, so a parent-category filter becomes one
+indexed `category_id: {$in: [...]}` query. Category writes invalidate the
+cache; the TTL bounds staleness for writes made by other processes.
+Accessors return copies, so callers may modify what they get.
+"""
+import asyncio
+import copy
+import time
+from typing import Any, Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from config import CATEGORY_TREE_TTL
+
+
+class CategoryTree:
+    """Cached category hierarchy"""
+
+    def __init__(self, ttl: int = CATEGORY_TREE_TTL):
+        self.ttl = ttl
+        self._loaded_at: Optional[float] = None
+        self._categories: List[Dict[str, Any]] = []
+        self._paths: Dict[str, List[str]] = {}
+        self._descendants: Dict[str, List[str]] = {}
+        self._tree: List[Dict[str, Any]] = []
+        self._lock = asyncio.Lock()
+        # Bumped on invalidation so a load that raced with a write is not kept
+        self._generation = 0
+
+    def invalidate(self) -> None:
+        """Drop the cached tree; the next read reloads it"""
+        self._generation += 1
+        self._loaded_at = None
+
+    def _build(self, categories: List[Dict[str, Any]]) -> None:
+        by_id = {cat["id"]: cat for cat in categories}
+        children: Dict[Optional[str], List[str]] = {}
+        for cat in categories:
+            parent_id = cat.get("parent_id")
+            # Orphans (missing parent) are shown at the top level
+            if parent_id not in by_id:
+                parent_id = None
+            children.setdefault(parent_id, []).append(cat["id"])
+
+        # Breadth-first from the roots: each node's path extends its parent's.
+        # Nodes caught in a parent cycle are never reached and stay out of the tree.
+        paths: Dict[str, List[str]] = {}
+        nodes: Dict[str, Dict[str, Any]] = {}
+        tree: List[Dict[str, Any]] = []
+        queue = [(None, cat_id) for cat_id in children.get(None, [])]
+        for parent_id, cat_id in queue:
+            paths[cat_id] = (paths[parent_id] + [parent_id]) if parent_id else []
+            node = nodes[cat_id] = dict(by_id[cat_id])
+            if parent_id:
+                nodes[parent_id].setdefault("children", []).append(node)
+            else:
+                tree.append(node)
+            queue.extend((cat_id, child_id) for child_id in children.get(cat_id, []))
+
+        descendants: Dict[str, List[str]] = {cat_id: [cat_id] for cat_id in paths}
+        for cat_id, path in paths.items():
+            for ancestor_id in path:
+                descendants[ancestor_id].append(cat_id)
+
+        self._categories = categories
+        self._paths = paths
+        self._descendants = descendants
+        self._tree = tree
+
+    async def _ensure(self, db: AsyncIOMotorDatabase) -> None:
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return
+        async with self._lock:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return
+            generation, loaded_at = self._generation, time.monotonic()
+            categories = await db.categories.find({}, {"_id": 0}).to_list(None)
+            self._build(categories)
+            if generation == self._generation:
+                self._loaded_at = loaded_at
+
+    async def categories(self, db: AsyncIOMotorDatabase) -> List[Dict[str, Any]]:
+        """Flat list of all categories"""
+        await self._ensure(db)
+        return [dict(cat) for cat in self._categories]
+
+    async def tree(self, db: AsyncIOMotorDatabase) -> List[Dict[str, Any]]:
+        """Nested categories with `children` on nodes that have any"""
+        await self._ensure(db)
+        return copy.deepcopy(self._tree)
+
+    async def path(self, db: AsyncIOMotorDatabase, category_id: str) -> List[str]:
+        """Ancestor ids of a category, root first"""
+        await self._ensure(db)
+        return list(self._paths.get(category_id, []))
+
+    async def descendant_ids(self, db: AsyncIOMotorDatabase, category_id: str) -> List[str]:
+        """The category itself followed by all of its descendants"""
+        await self._ensure(db)
+        return list(self._descendants.get(category_id, [category_id]))
+
+
+# Global instance
+category_tree = CategoryTree()
@@ -25,4 +25,59 @@ SITE_URL = os.environ.get('SITE_URL', 'https://ystore.ua')
 
 # API Keys
 STRIPE_API_KEY = os.environ.get('STRIPE_API_KEY')
+# Public URL of POST /api/webhook/stripe, as registered with Stripe; when unset
+# it is derived from the base URL of the first checkout or webhook request
+STRIPE_WEBHOOK_URL = os.environ.get('STRIPE_WEBHOOK_URL', '')
 EMERGENT_LLM_KEY = os.environ.get('EMERGENT_LLM_KEY')
+# Public key of the RozetkaPay card widget, served to the storefront
+ROZETKAPAY_WIDGET_KEY = os.environ.get('ROZETKAPAY_WIDGET_KEY', '')
+
+# Checkout status polling
+CHECKOUT_STATUS_POLL_TTL = int(os.environ.get('CHECKOUT_STATUS_POLL_TTL', 3))
+CHECKOUT_STATUS_CACHE_SIZE = int(os.environ.get('CHECKOUT_STATUS_CACHE_SIZE', 10000))
+
+# Search index
+SEARCH_INDEX_PATH = os.environ.get('SEARCH_INDEX_PATH', str(ROOT_DIR / 'data' / 'search_index.json.gz'))
+SEARCH_SNAPSHOT_INTERVAL = int(os.environ.get('SEARCH_SNAPSHOT_INTERVAL', 300))
+SEARCH_STATS_CACHE_TTL = int(os.environ.get('SEARCH_STATS_CACHE_TTL', 60))
+SEARCH_STATS_CACHE_SIZE = int(os.environ.get('SEARCH_STATS_CACHE_SIZE', 10000))
+
+# Product cache
+PRODUCT_CACHE_SIZE = int(os.environ.get('PRODUCT_CACHE_SIZE', 10000))
+PRODUCT_CACHE_TTL = int(os.environ.get('PRODUCT_CACHE_TTL', 300))
+
+# Product view counters
+VIEW_FLUSH_INTERVAL = int(os.environ.get('VIEW_FLUSH_INTERVAL', 30))
+TRENDING_HALF_LIFE_HOURS = float(os.environ.get('TRENDING_HALF_LIFE_HOURS', 24))
+
+# Category tree cache
+CATEGORY_TREE_TTL = int(os.environ.get('CATEGORY_TREE_TTL', 300))
+
+# Materialized category stats
+CATEGORY_STATS_FLUSH_INTERVAL = int(os.environ.get('CATEGORY_STATS_FLUSH_INTERVAL', 5))
+CATEGORY_STATS_RECONCILE_INTERVAL = int(os.environ.get('CATEGORY_STATS_RECONCILE_INTERVAL', 3600))
+
+# Materialized seller stats
+SELLER_STATS_FLUSH_INTERVAL = int(os.environ.get('SELLER_STATS_FLUSH_INTERVAL', 5))
+SELLER_STATS_RECONCILE_INTERVAL = int(os.environ.get('SELLER_STATS_RECONCILE_INTERVAL', 86400))
+
+# Inventory reservations
+INVENTORY_HOLD_MINUTES = int(os.environ.get('INVENTORY_HOLD_MINUTES', 30))
+INVENTORY_SWEEP_INTERVAL = int(os.environ.get('INVENTORY_SWEEP_INTERVAL', 60))
+INVENTORY_HOLD_RETENTION_DAYS = int(os.environ.get('INVENTORY_HOLD_RETENTION_DAYS', 30))
+
+# Email outbox
+EMAIL_WORKERS = int(os.environ.get('EMAIL_WORKERS', 2))
+EMAIL_MAX_ATTEMPTS = int(os.environ.get('EMAIL_MAX_ATTEMPTS', 6))
+EMAIL_RETRY_BASE_SECONDS = int(os.environ.get('EMAIL_RETRY_BASE_SECONDS', 30))
+EMAIL_POLL_INTERVAL = int(os.environ.get('EMAIL_POLL_INTERVAL', 30))
+EMAIL_OUTBOX_RETENTION_DAYS = int(os.environ.get('EMAIL_OUTBOX_RETENTION_DAYS', 30))
+
+# Idempotency keys
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.environ.get('IDEMPOTENCY_KEY_TTL_HOURS', 24))
+IDEMPOTENCY_WAIT_SECONDS = int(os.environ.get('IDEMPOTENCY_WAIT_SECONDS', 30))
+
+# Columnar catalog snapshot for listings
+CATALOG_SNAPSHOT_ENABLED = os.environ.get('CATALOG_SNAPSHOT_ENABLED', 'true').lower() == 'true'
+CATALOG_REFRESH_INTERVAL = int(os.environ.get('CATALOG_REFRESH_INTERVAL', 30))
+CATALOG_MAX_STALENESS = int(os.environ.get('CATALOG_MAX_STALENESS', 120))
@@ -4,7 +4,8 @@ Database connection and initialization
 from motor.motor_asyncio import AsyncIOMotorClient
 from config import MONGO_URL, DB_NAME
 
-client = AsyncIOMotorClient(MONGO_URL)
+# tz_aware so stored BSON dates come back as UTC-aware datetimes
+client = AsyncIOMotorClient(MONGO_URL, tz_aware=True)
 db = client[DB_NAME]
 
 async def close_db_connection():
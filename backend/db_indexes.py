@@ -0,0 +1,304 @@
+"""
+MongoDB Index Registry
+Declares the indexes every collection needs and applies them idempotently
+
+Indexes are applied at startup and can be checked or applied by hand:
+    python db_indexes.py [--check] [--collection products]
+
+Missing indexes are created; indexes that exist but are not declared here
+are only reported, never dropped. The unique indexes in REQUIRED_UNIQUE are
+applied before the app serves requests, and startup fails without them.
+"""
+import argparse
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import ASCENDING as ASC, DESCENDING as DESC, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+from config import EMAIL_OUTBOX_RETENTION_DAYS, IDEMPOTENCY_KEY_TTL_HOURS, INVENTORY_HOLD_RETENTION_DAYS
+
+logger = logging.getLogger(__name__)
+
+# Listing sorts from routes/products.py SORT_OPTIONS, each with the `id`
+# keyset tie-breaker
+_PRODUCT_SORTS = {
+    "newest": [("created_at", DESC)],
+    "price_asc": [("price", ASC)],
+    "price_desc": [("price", DESC)],
+    "rating": [("rating", DESC), ("reviews_count", DESC)],
+    "popularity": [("views_count", DESC), ("rating", DESC)],
+    "trending": [("trending_rank", DESC), ("views_count", DESC)],
+}
+
+
+def _product_listing_indexes() -> List[IndexModel]:
+    """status (+ category_id) equality prefix followed by each sort order"""
+    indexes = []
+    for sort in _PRODUCT_SORTS.values():
+        direction = sort[-1][1]
+        for prefix in ([("status", ASC)], [("status", ASC), ("category_id", ASC)]):
+            indexes.append(IndexModel(prefix + sort + [("id", direction)]))
+    return indexes
+
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "products": [
+        IndexModel([("id", ASC)], unique=True),
+        IndexModel(
+            [("title", TEXT), ("description", TEXT), ("short_description", TEXT)],
+            weights={"title": 10, "description": 5, "short_description": 7},
+            name="product_text_search",
+        ),
+        *_product_listing_indexes(),
+        IndexModel([("seller_id", ASC), ("created_at", DESC)]),
+        IndexModel([("seller_id", ASC), ("slug", ASC)], unique=True),
+        IndexModel(
+            [("seller_id", ASC), ("sku", ASC)],
+            unique=True,
+            partialFilterExpression={"sku": {"$type": "string"}},
+        ),
+        IndexModel([("updated_at", ASC)]),
+        # Multikey attribute-pattern indexes for attr.<name> filters and facets
+        IndexModel([("status", ASC), ("category_id", ASC), ("attrs.k", ASC), ("attrs.v", ASC)]),
+        IndexModel([("attrs.k", ASC), ("attrs.v", ASC)]),
+    ],
+    "users": [
+        IndexModel([("id", ASC)], unique=True),
+        IndexModel([("email", ASC)], unique=True),
+        IndexModel([("role", ASC), ("created_at", DESC)]),
+        IndexModel([("created_at", DESC)]),
+    ],
+    "categories": [
+        IndexModel([("id", ASC)], unique=True),
+        IndexModel([("slug", ASC)]),
+        IndexModel([("parent_id", ASC)]),
+    ],
+    "category_stats": [
+        IndexModel([("id", ASC)], unique=True),
+        IndexModel([("own.count", DESC)]),
+    ],
+    "carts": [
+        IndexModel([("user_id", ASC)], unique=True),
+    ],
+    "orders": [
+        IndexModel([("id", ASC)], unique=True),
+        # Order listings sort by (created_at, id) descending for keyset cursors
+        IndexModel([("buyer_id", ASC), ("created_at", DESC), ("id", DESC)]),
+        IndexModel([("buyer_id", ASC), ("status", ASC), ("created_at", DESC), ("id", DESC)]),
+        IndexModel([("buyer_id", ASC), ("payment_status", ASC)]),
+        # Multikey: seller dashboards read only orders with a line of that seller
+        IndexModel([("items.seller_id", ASC), ("created_at", DESC), ("id", DESC)]),
+        IndexModel([("items.seller_id", ASC), ("payment_status", ASC), ("created_at", DESC), ("id", DESC)]),
+        IndexModel([("status", ASC), ("created_at", DESC), ("id", DESC)]),
+        IndexModel([("payment_status", ASC), ("created_at", DESC), ("id", DESC)]),
+        IndexModel([("created_at", DESC), ("id", DESC)]),
+    ],
+    "seller_stats": [
+        IndexModel([("id", ASC)], unique=True),
+    ],
+    "seller_stats_daily": [
+        IndexModel([("id", ASC)], unique=True),
+        IndexModel([("seller_id", ASC), ("day", ASC)]),
+    ],
+    "email_outbox": [
+        IndexModel([("id", ASC)], unique=True),
+        IndexModel([("status", ASC), ("next_attempt_at", ASC)]),
+        IndexModel([("status", ASC), ("lease_until", ASC)]),
+        IndexModel([("sent_at", ASC)], expireAfterSeconds=EMAIL_OUTBOX_RETENTION_DAYS * 86400),
+    ],
+    "idempotency_keys": [
+        IndexModel([("id", ASC)], unique=True),
+        IndexModel([("created_at", ASC)], expireAfterSeconds=IDEMPOTENCY_KEY_TTL_HOURS * 3600),
+    ],
+    "inventory_holds": [
+        IndexModel([("id", ASC)], unique=True),
+        IndexModel([("order_id", ASC)]),
+        IndexModel([("status", ASC), ("expires_at", ASC)]),
+        # Settled holds are kept for a while for support, then removed
+        IndexModel([("settled_at", ASC)], expireAfterSeconds=INVENTORY_HOLD_RETENTION_DAYS * 86400),
+    ],
+    "payment_transactions": [
+        IndexModel([("session_id", ASC)]),
+        IndexModel([("order_id", ASC)]),
+        IndexModel([("order_number", ASC)]),
+    ],
+    "reviews": [
+        IndexModel([("id", ASC)], unique=True),
+        IndexModel([("product_id", ASC), ("user_id", ASC)]),
+        IndexModel([("product_id", ASC), ("created_at", DESC)]),
+    ],
+    "comments": [
+        IndexModel([("id", ASC)], unique=True),
+        IndexModel([("product_id", ASC), ("created_at", DESC)]),
+        IndexModel([("parent_id", ASC)]),
+    ],
+    "analytics_events": [
+        IndexModel([("event_type", ASC), ("created_at", DESC)]),
+        IndexModel([("product_id", ASC), ("event_type", ASC)]),
+        IndexModel([("session_id", ASC), ("created_at", ASC)]),
+        IndexModel([("created_at", DESC)]),
+    ],
+    "payouts": [
+        IndexModel([("id", ASC)], unique=True),
+        IndexModel([("seller_id", ASC), ("created_at", DESC)]),
+        IndexModel([("seller_id", ASC), ("status", ASC)]),
+        IndexModel([("status", ASC), ("created_at", DESC)]),
+    ],
+    "popular_categories": [
+        IndexModel([("active", ASC), ("order", ASC)]),
+    ],
+    "actual_offers": [
+        IndexModel([("id", ASC)], unique=True),
+        IndexModel([("active", ASC), ("order", ASC)]),
+    ],
+    "promotions": [
+        IndexModel([("id", ASC)], unique=True),
+        IndexModel([("active", ASC), ("order", ASC)]),
+    ],
+    "custom_sections": [
+        IndexModel([("id", ASC)], unique=True),
+        IndexModel([("slug", ASC)]),
+    ],
+    "crm_tasks": [
+        IndexModel([("id", ASC)], unique=True),
+        IndexModel([("customer_id", ASC)]),
+        IndexModel([("status", ASC), ("due_date", ASC)]),
+    ],
+    "customer_notes": [
+        IndexModel([("customer_id", ASC), ("created_at", DESC)]),
+    ],
+    "leads": [
+        IndexModel([("id", ASC)], unique=True),
+        IndexModel([("status", ASC), ("created_at", DESC)]),
+    ],
+}
+
+# Unique indexes that writes rely on to reject duplicates (a DuplicateKeyError
+# is what keeps a user at one cart and an idempotency key at one request)
+REQUIRED_UNIQUE = {
+    "carts": [("user_id", ASC)],
+    "idempotency_keys": [("id", ASC)],
+}
+
+
+def _key(key) -> List[tuple]:
+    """Normalize an index key (declared SON or index_information() list)"""
+    items = key.items() if hasattr(key, "items") else key
+    return [(field, direction) for field, direction in items]
+
+
+async def check_collection(db: AsyncIOMotorDatabase, collection: str) -> Dict[str, Any]:
+    """Compare declared and existing indexes of one collection"""
+    existing = await db[collection].index_information()
+    existing_keys = {name: _key(info["key"]) for name, info in existing.items()}
+
+    missing, present = [], []
+    for model in INDEXES[collection]:
+        doc = model.document
+        key = _key(doc["key"])
+        if doc["name"] in existing or key in existing_keys.values():
+            present.append(doc["name"])
+        else:
+            missing.append(doc["name"])
+
+    declared_names = {m.document["name"] for m in INDEXES[collection]}
+    declared_keys = [_key(m.document["key"]) for m in INDEXES[collection]]
+    extra = [
+        name for name, key in existing_keys.items()
+        if name != "_id_" and name not in declared_names and key not in declared_keys
+    ]
+    return {"present": present, "missing": missing, "extra": extra}
+
+
+async def check_indexes(db: AsyncIOMotorDatabase) -> Dict[str, Dict[str, Any]]:
+    """Report missing and extra indexes for every declared collection"""
+    return {collection: await check_collection(db, collection) for collection in INDEXES}
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase, collections: List[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Create every missing declared index. Failures (e.g. duplicates blocking
+    a unique index) are reported per index instead of aborting the run.
+    """
+    report = {}
+    for collection in collections or list(INDEXES):
+        status = await check_collection(db, collection)
+        created, failed = [], {}
+        models = {m.document["name"]: m for m in INDEXES[collection]}
+        for name in status["missing"]:
+            try:
+                await db[collection].create_indexes([models[name]])
+                created.append(name)
+            except OperationFailure as e:
+                failed[name] = str(e)
+                logger.error(f"Index {collection}.{name} could not be created: {str(e)}")
+
+        if status["extra"]:
+            logger.warning(f"Undeclared indexes on {collection}: {', '.join(status['extra'])}")
+        report[collection] = {**status, "created": created, "failed": failed}
+
+    created_total = sum(len(r["created"]) for r in report.values())
+    failed_total = sum(len(r["failed"]) for r in report.values())
+    logger.info(f"Index registry applied: {created_total} created, {failed_total} failed")
+    return report
+
+
+async def ensure_required(db: AsyncIOMotorDatabase) -> None:
+    """Apply the REQUIRED_UNIQUE indexes; raises RuntimeError if one is missing"""
+    await ensure_indexes(db, list(REQUIRED_UNIQUE))
+    for collection, key in REQUIRED_UNIQUE.items():
+        existing = await db[collection].index_information()
+        if not any(_key(info["key"]) == key and info.get("unique") for info in existing.values()):
+            raise RuntimeError(
+                f"Unique index on {collection}.{', '.join(f for f, _ in key)} is missing; "
+                f"remove the duplicates and run: python db_indexes.py --collection {collection}"
+            )
+
+
+async def _ensure_in_background(db: AsyncIOMotorDatabase) -> None:
+    try:
+        await ensure_indexes(db)
+    except Exception as e:
+        logger.error(f"Applying the index registry failed: {str(e)}")
+
+
+def start(db: AsyncIOMotorDatabase) -> asyncio.Task:
+    """Apply the registry in the background so startup is not blocked by index builds"""
+    return asyncio.create_task(_ensure_in_background(db))
+
+
+async def _main(check_only: bool, collection: str = None):
+    mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+    db_name = os.environ.get('DB_NAME', 'marketplace_db')
+    client = AsyncIOMotorClient(mongo_url)
+    db = client[db_name]
+    collections = [collection] if collection else list(INDEXES)
+
+    print(f"📦 Using database: {db_name}")
+    if check_only:
+        report = {c: await check_collection(db, c) for c in collections}
+    else:
+        report = await ensure_indexes(db, collections)
+
+    for name, status in report.items():
+        print(f"\n📋 {name}: {len(status['present'])} present")
+        for index in status.get("created", []):
+            print(f"   ✅ created {index}")
+        for index in status["missing"]:
+            if index not in status.get("created", []):
+                print(f"   ❌ missing {index}{': ' + status['failed'][index] if index in status.get('failed', {}) else ''}")
+        for index in status["extra"]:
+            print(f"   ⚠️  undeclared {index}")
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply or check the MongoDB index registry")
+    parser.add_argument("--check", action="store_true", help="Only report missing/extra indexes")
+    parser.add_argument("--collection", choices=list(INDEXES))
+    args = parser.parse_args()
+    asyncio.run(_main(args.check, args.collection))
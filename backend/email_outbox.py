@@ -0,0 +1,150 @@
+"""
+Email Outbox
+Persisted queue of outgoing emails with background delivery
+
+Request handlers only insert rendered messages into `email_outbox`. Worker
+tasks claim due messages with an atomic find_one_and_update and send them
+through email_service in a thread executor, so blocking SMTP never runs on
+the event loop and SMTP sessions are reused across messages. Failed sends
+are retried with exponential backoff; a message whose worker died while
+sending is claimed again once its lease runs out.
+
+    pending -> sending -> sent
+                       -> pending (retry at next_attempt_at)
+                       -> failed  (after EMAIL_MAX_ATTEMPTS)
+"""
+import asyncio
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+
+from config import EMAIL_MAX_ATTEMPTS, EMAIL_POLL_INTERVAL, EMAIL_RETRY_BASE_SECONDS, EMAIL_WORKERS
+from email_service import email_service
+
+logger = logging.getLogger(__name__)
+
+# A message still "sending" after this long is assumed lost and sent again
+SEND_LEASE = timedelta(minutes=5)
+
+
+class EmailOutbox:
+    """Enqueues emails and delivers them from background workers"""
+
+    def __init__(self, workers: int = EMAIL_WORKERS):
+        self.workers = workers
+        self._db: Optional[AsyncIOMotorDatabase] = None
+        self._tasks: List[asyncio.Task] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._wakeup = asyncio.Event()
+
+    async def enqueue(self, db: AsyncIOMotorDatabase, messages: List[Tuple[str, str, str]], kind: str = "") -> int:
+        """Store (to, subject, html) messages for delivery; returns how many were queued"""
+        if not email_service.configured:
+            logger.warning("SMTP credentials not configured. Email not sent.")
+            return 0
+        now = datetime.now(timezone.utc)
+        docs = [{
+            "id": str(uuid.uuid4()),
+            "kind": kind,
+            "to": to,
+            "subject": subject,
+            "html": html,
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now,
+        } for to, subject, html in messages if to]
+        if docs:
+            await db.email_outbox.insert_many(docs)
+            self._wakeup.set()
+        return len(docs)
+
+    async def enqueue_order_emails(self, db: AsyncIOMotorDatabase, order_data: Dict[str, Any]) -> int:
+        """Queue the customer confirmation and the admin notification of a new order"""
+        messages = [(email_service.admin_email, *email_service.render_admin_notification(order_data))]
+        if order_data.get("customer_email"):
+            messages.insert(0, (order_data["customer_email"], *email_service.render_order_confirmation(order_data)))
+        return await self.enqueue(db, messages, kind="order")
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        return await self._db.email_outbox.find_one_and_update(
+            {"$or": [
+                {"status": "pending", "next_attempt_at": {"$lte": now}},
+                {"status": "sending", "lease_until": {"$lte": now}},
+            ]},
+            {"$set": {"status": "sending", "lease_until": now + SEND_LEASE}, "$inc": {"attempts": 1}},
+            sort=[("next_attempt_at", 1)],
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _send(self, message: Dict[str, Any]) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                self._executor, email_service.deliver, message["to"], message["subject"], message["html"]
+            )
+        except Exception as e:
+            attempts = message["attempts"]
+            update: Dict[str, Any] = {"last_error": str(e)}
+            if attempts >= EMAIL_MAX_ATTEMPTS:
+                update["status"] = "failed"
+                logger.error(f"Giving up on email {message['id']} to {message['to']}: {str(e)}")
+            else:
+                update["status"] = "pending"
+                update["next_attempt_at"] = datetime.now(timezone.utc) + timedelta(
+                    seconds=EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+                )
+                logger.warning(f"Email {message['id']} to {message['to']} failed (attempt {attempts}): {str(e)}")
+            await self._db.email_outbox.update_one({"id": message["id"]}, {"$set": update})
+            return
+        await self._db.email_outbox.update_one(
+            {"id": message["id"]},
+            {"$set": {"status": "sent", "sent_at": datetime.now(timezone.utc)}, "$unset": {"last_error": ""}}
+        )
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                message = await self._claim()
+                if message:
+                    await asyncio.shield(self._send(message))
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Email outbox worker error: {str(e)}")
+            # Nothing due: sleep until a new message is queued or retries come due
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), EMAIL_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, db: AsyncIOMotorDatabase) -> None:
+        """Start the delivery workers; no-op without SMTP credentials"""
+        if not email_service.configured:
+            return
+        self._db = db
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="email")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            email_service.close()
+
+
+# Global instance
+email_outbox = EmailOutbox()
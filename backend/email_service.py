@@ -4,10 +4,11 @@ Sends notifications about orders and purchases
 """
 
 import os
+import queue
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import Dict, List
+from typing import Dict, List, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,30 +21,78 @@ class EmailService:
         self.smtp_password = os.environ.get('SMTP_PASSWORD', '')
         self.from_email = os.environ.get('FROM_EMAIL', self.smtp_user)
         self.admin_email = os.environ.get('ADMIN_EMAIL', 'admin@bazaar.com')
-        
+        # Idle logged-in SMTP sessions, reused across messages and threads
+        self._connections: "queue.LifoQueue[smtplib.SMTP]" = queue.LifoQueue()
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.smtp_user and self.smtp_password)
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=30)
+        server.starttls()
+        server.login(self.smtp_user, self.smtp_password)
+        return server
+
+    def deliver(self, to_email: str, subject: str, html_content: str) -> None:
+        """
+        Send one email over a pooled SMTP session; raises on failure.
+        Blocking, so async code runs it in a thread executor.
+        """
+        msg = MIMEMultipart('alternative')
+        msg['From'] = self.from_email
+        msg['To'] = to_email
+        msg['Subject'] = subject
+        msg.attach(MIMEText(html_content, 'html'))
+
+        try:
+            server = self._connections.get_nowait()
+        except queue.Empty:
+            server = self._connect()
+        try:
+            server.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # The server dropped the idle session; retry once on a fresh one
+            server = self._connect()
+            try:
+                server.send_message(msg)
+            except Exception:
+                self._discard(server)
+                raise
+        except Exception:
+            self._discard(server)
+            raise
+        self._connections.put(server)
+        logger.info(f"Email sent successfully to {to_email}")
+
+    @staticmethod
+    def _discard(server: smtplib.SMTP) -> None:
+        try:
+            server.close()
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        """Log out of all pooled SMTP sessions"""
+        while True:
+            try:
+                server = self._connections.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                server.quit()
+            except Exception:
+                self._discard(server)
+
     def send_email(self, to_email: str, subject: str, html_content: str) -> bool:
         """
         Send email using SMTP
         """
         try:
-            if not self.smtp_user or not self.smtp_password:
+            if not self.configured:
                 logger.warning("SMTP credentials not configured. Email not sent.")
                 return False
-                
-            msg = MIMEMultipart('alternative')
-            msg['From'] = self.from_email
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            
-            html_part = MIMEText(html_content, 'html')
-            msg.attach(html_part)
-            
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_user, self.smtp_password)
-                server.send_message(msg)
-            
-            logger.info(f"Email sent successfully to {to_email}")
+            self.deliver(to_email, subject, html_content)
             return True
             
         except Exception as e:
@@ -54,6 +103,12 @@ class EmailService:
         """
         Send order confirmation to customer
         """
+        return self.send_email(customer_email, *self.render_order_confirmation(order_data))
+    
+    def render_order_confirmation(self, order_data: Dict) -> Tuple[str, str]:
+        """
+        Subject and HTML of the customer's order confirmation
+        """
         items_html = ""
         for item in order_data.get("items", []):
             items_html += f"""
@@ -128,16 +183,18 @@ class EmailService:
         </html>
         """
         
-        return self.send_email(
-            customer_email,
-            f"Заказ #{order_data.get('order_number')} подтвержден",
-            html_content
-        )
+        return f"Заказ #{order_data.get('order_number')} подтвержден", html_content
     
     def send_admin_notification(self, order_data: Dict) -> bool:
         """
         Send new order notification to admin
         """
+        return self.send_email(self.admin_email, *self.render_admin_notification(order_data))
+    
+    def render_admin_notification(self, order_data: Dict) -> Tuple[str, str]:
+        """
+        Subject and HTML of the new order notification for the admin
+        """
         items_html = ""
         for item in order_data.get("items", []):
             items_html += f"""
@@ -209,11 +266,7 @@ class EmailService:
         </html>
         """
         
-        return self.send_email(
-            self.admin_email,
-            f"🔔 Новый заказ #{order_data.get('order_number')}",
-            html_content
-        )
+        return f"🔔 Новый заказ #{order_data.get('order_number')}", html_content
 
 # Global instance
 email_service = EmailService()
@@ -0,0 +1,187 @@
+"""
+Idempotency Keys
+Replays stored responses for retried POST requests
+
+A client sends an `Idempotency-Key` header with requests that must not run
+twice (order creation, checkout sessions). The first request with a key
+claims it by inserting a pending record; its response is stored on the
+record and returned to every later request with the same key and body.
+
+Concurrent duplicates are coalesced: inside one process they await the
+same future, across processes they wait for the pending record to finish.
+If the first request fails, its record is removed so the client can retry.
+A pending record whose lease ran out belongs to a request that died and is
+taken over; the lease is renewed while the handler runs and until its
+result is stored, so a finished handler is never run a second time.
+Records expire through a TTL index after IDEMPOTENCY_KEY_TTL_HOURS.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from fastapi import HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
+
+from config import IDEMPOTENCY_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 255
+# A pending record older than this belongs to a request that died
+PENDING_LEASE = timedelta(minutes=2)
+POLL_INTERVAL = 0.2
+# Delays between attempts to store a finished result
+STORE_RETRY_DELAYS = (0.1, 0.5, 2.0)
+
+
+def _fingerprint(payload: Any) -> str:
+    raw = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class Idempotency:
+    """Runs a handler at most once per (scope, user, key)"""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._background: Set[asyncio.Task] = set()
+
+    async def run(
+        self,
+        db: AsyncIOMotorDatabase,
+        key: Optional[str],
+        scope: str,
+        user_id: str,
+        payload: Any,
+        handler: Callable[[], Awaitable[Any]],
+        response: Optional[Response] = None,
+    ) -> Any:
+        """
+        Return the handler's result, or the stored result of an earlier request
+        with the same key. Without a key the handler simply runs.
+        """
+        if not key:
+            return await handler()
+        if len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+
+        record_id = f"{scope}:{user_id}:{key}"
+        fingerprint = _fingerprint(payload)
+
+        inflight = self._inflight.get(record_id)
+        if inflight is not None:
+            return self._replay(await asyncio.shield(inflight), fingerprint, response)
+
+        future = asyncio.get_running_loop().create_future()
+        # Nobody may be waiting on a failure; don't warn about it
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[record_id] = future
+        try:
+            record, result = await self._execute(db, record_id, fingerprint, handler)
+            future.set_result(record)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            del self._inflight[record_id]
+
+        if result is _REPLAYED:
+            return self._replay(record, fingerprint, response)
+        return result
+
+    async def _execute(self, db, record_id: str, fingerprint: str, handler) -> Any:
+        deadline = asyncio.get_running_loop().time() + IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            now = datetime.now(timezone.utc)
+            try:
+                await db.idempotency_keys.insert_one({
+                    "id": record_id,
+                    "status": "pending",
+                    "fingerprint": fingerprint,
+                    "lease_until": now + PENDING_LEASE,
+                    "created_at": now,
+                })
+            except DuplicateKeyError:
+                record = await db.idempotency_keys.find_one({"id": record_id}, {"_id": 0})
+                if record and record["status"] == "done":
+                    return record, _REPLAYED
+                if record and record["lease_until"].replace(tzinfo=timezone.utc) <= now:
+                    await db.idempotency_keys.delete_one({"id": record_id, "status": "pending", "lease_until": record["lease_until"]})
+                    continue
+                if asyncio.get_running_loop().time() >= deadline:
+                    raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+                # Being processed elsewhere, or just failed and removed: look again
+                await asyncio.sleep(POLL_INTERVAL)
+                continue
+
+            heartbeat = asyncio.create_task(self._keep_leased(db, record_id))
+            try:
+                result = await handler()
+            except BaseException:
+                heartbeat.cancel()
+                await db.idempotency_keys.delete_one({"id": record_id, "status": "pending"})
+                raise
+            record = {"id": record_id, "fingerprint": fingerprint, "body": jsonable_encoder(result)}
+            if await self._store(db, record):
+                heartbeat.cancel()
+            else:
+                # Keep the lease while retrying in the background; the result is returned meanwhile
+                task = asyncio.create_task(self._store_eventually(db, record, heartbeat))
+                self._background.add(task)
+                task.add_done_callback(self._background.discard)
+            return record, result
+
+    @staticmethod
+    async def _keep_leased(db, record_id: str) -> None:
+        """Renew the lease of a pending record until cancelled"""
+        while True:
+            await asyncio.sleep(PENDING_LEASE.total_seconds() / 4)
+            try:
+                await db.idempotency_keys.update_one(
+                    {"id": record_id, "status": "pending"},
+                    {"$set": {"lease_until": datetime.now(timezone.utc) + PENDING_LEASE}}
+                )
+            except Exception as e:
+                logger.warning(f"Failed to renew idempotency lease {record_id}: {str(e)}")
+
+    @staticmethod
+    async def _store(db, record: Dict[str, Any]) -> bool:
+        """Mark the record done with the handler's result; False if every attempt failed"""
+        for delay in (*STORE_RETRY_DELAYS, None):
+            try:
+                await db.idempotency_keys.update_one(
+                    {"id": record["id"]},
+                    {"$set": {"status": "done", "body": record["body"]}, "$unset": {"lease_until": ""}}
+                )
+                return True
+            except Exception as e:
+                if delay is None:
+                    logger.error(f"Failed to store idempotent result {record['id']}: {str(e)}")
+                    return False
+                await asyncio.sleep(delay)
+
+    async def _store_eventually(self, db, record: Dict[str, Any], heartbeat: asyncio.Task) -> None:
+        try:
+            while not await self._store(db, record):
+                pass
+        finally:
+            heartbeat.cancel()
+
+    @staticmethod
+    def _replay(record: Dict[str, Any], fingerprint: str, response: Optional[Response]) -> Any:
+        if record["fingerprint"] != fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+        if response is not None:
+            response.headers["Idempotent-Replayed"] = "true"
+        return record["body"]
+
+
+_REPLAYED = object()
+
+# Global instance
+idempotency = Idempotency()
@@ -0,0 +1,182 @@
+"""
+Inventory Reservations
+Stock holds taken at checkout and settled by payment or cancellation
+
+Each order line reserves stock with one conditional update
+`{stock_level: {$gte: qty}} -> {$inc: {stock_level: -qty}}`, so concurrent
+checkouts of the same product never oversell and need no read-modify-write
+or application lock. The hold is recorded in `inventory_holds` before any
+stock is taken:
+
+    reserving  written first; stock is being taken for it
+    held       stock is taken out, waiting for payment until expires_at
+    committed  the order was paid (or needs no online payment)
+    released   stock was given back (expired, cancelled or failed checkout)
+    void       no stock was taken (out of stock, or the request died)
+
+Holds move between states with conditional updates, so a hold is only ever
+given back once even when the sweeper and a cancellation race. Expired
+holds are released by a periodic sweep; a TTL index on `settled_at` then
+removes settled holds after INVENTORY_HOLD_RETENTION_DAYS. A TTL index
+alone cannot expire `held` holds, because deleting a hold would not return
+its stock. A hold left in `reserving` by a request that died is voided by
+the sweep; only the one product being taken at that moment can drift.
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+
+import catalog_sync
+from config import INVENTORY_HOLD_MINUTES, INVENTORY_SWEEP_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+STOCK_PROJECTION = {"_id": 0, "id": 1, "status": 1, "category_id": 1, "price": 1, "stock_level": 1}
+# A hold still reserving after this long belongs to a request that died
+RESERVING_LEASE = timedelta(minutes=2)
+
+
+def _quantities(items: Iterable[Any]) -> Dict[str, int]:
+    """Total quantity per product id of order items (models or dicts)"""
+    quantities: Dict[str, int] = {}
+    for item in items:
+        data = item if isinstance(item, dict) else item.model_dump()
+        if data.get("quantity", 0) > 0:
+            quantities[data["product_id"]] = quantities.get(data["product_id"], 0) + data["quantity"]
+    return quantities
+
+
+class Inventory:
+    """Atomic stock reservations with expiring holds"""
+
+    def __init__(self, hold_minutes: int = INVENTORY_HOLD_MINUTES, interval: int = INVENTORY_SWEEP_INTERVAL):
+        self.hold_minutes = hold_minutes
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def _adjust(self, db: AsyncIOMotorDatabase, product_id: str, delta: int) -> bool:
+        """Change stock by `delta`; a decrement only applies if enough stock is left"""
+        query: Dict[str, Any] = {"id": product_id}
+        if delta < 0:
+            query["stock_level"] = {"$gte": -delta}
+        product = await db.products.find_one_and_update(
+            query,
+            {"$inc": {"stock_level": delta}},
+            projection=STOCK_PROJECTION,
+            return_document=ReturnDocument.AFTER,
+        )
+        if product is None:
+            return False
+        catalog_sync.product_stock_changed(product, product["stock_level"] - delta)
+        return True
+
+    async def reserve(self, db: AsyncIOMotorDatabase, order_id: str, items: Iterable[Any], commit: bool = False) -> None:
+        """
+        Take stock for every line of an order, or none of it. Raises 409 naming
+        the first product without enough stock. With `commit`, the holds are
+        committed right away (orders that are not paid online).
+        """
+        quantities = _quantities(items)
+        if not quantities:
+            return
+        now = datetime.now(timezone.utc)
+        holds = [{
+            "id": str(uuid.uuid4()),
+            "order_id": order_id,
+            "product_id": product_id,
+            "quantity": quantity,
+            "status": "reserving",
+            "expires_at": now + timedelta(minutes=self.hold_minutes),
+            "created_at": now,
+        } for product_id, quantity in quantities.items()]
+        # Recorded before any stock moves, so every decrement has a hold to release
+        await db.inventory_holds.insert_many(holds)
+
+        target = "committed" if commit else "held"
+        taken: List[Dict[str, Any]] = []
+        for hold in holds:
+            if not await self._adjust(db, hold["product_id"], -hold["quantity"]):
+                for done in taken:
+                    if await self._settle(db, done["id"], [target], "released"):
+                        await self._adjust(db, done["product_id"], done["quantity"])
+                await db.inventory_holds.update_many(
+                    {"order_id": order_id, "status": "reserving"},
+                    {"$set": {"status": "void", "settled_at": datetime.now(timezone.utc)}}
+                )
+                raise HTTPException(status_code=409, detail=f"Insufficient stock for product {hold['product_id']}")
+            update: Dict[str, Any] = {"status": target}
+            if commit:
+                update["settled_at"] = datetime.now(timezone.utc)
+            await db.inventory_holds.update_one({"id": hold["id"], "status": "reserving"}, {"$set": update})
+            taken.append(hold)
+
+    async def _settle(self, db: AsyncIOMotorDatabase, hold_id: str, from_status: List[str], to_status: str) -> Optional[Dict[str, Any]]:
+        """Move one hold between states; None if another caller settled it first"""
+        return await db.inventory_holds.find_one_and_update(
+            {"id": hold_id, "status": {"$in": from_status}},
+            {"$set": {"status": to_status, "settled_at": datetime.now(timezone.utc)}},
+            projection={"_id": 0},
+        )
+
+    async def commit(self, db: AsyncIOMotorDatabase, order_id: str) -> None:
+        """Payment succeeded: keep the stock. Holds that expired meanwhile are taken again."""
+        async for hold in db.inventory_holds.find({"order_id": order_id, "status": {"$in": ["held", "released"]}}, {"_id": 0}):
+            if not await self._settle(db, hold["id"], [hold["status"]], "committed"):
+                continue
+            if hold["status"] == "released" and not await self._adjust(db, hold["product_id"], -hold["quantity"]):
+                # Paid after the hold expired and the stock sold out meanwhile
+                logger.error(f"Order {order_id} paid but product {hold['product_id']} is out of stock")
+
+    async def release(self, db: AsyncIOMotorDatabase, order_id: str) -> int:
+        """Order cancelled or checkout failed: give the stock back"""
+        released = 0
+        async for hold in db.inventory_holds.find({"order_id": order_id, "status": {"$in": ["held", "committed"]}}, {"_id": 0}):
+            if await self._settle(db, hold["id"], ["held", "committed"], "released"):
+                await self._adjust(db, hold["product_id"], hold["quantity"])
+                released += 1
+        return released
+
+    async def release_expired(self, db: AsyncIOMotorDatabase) -> int:
+        """Give back the stock of holds whose payment did not arrive in time"""
+        released = 0
+        now = datetime.now(timezone.utc)
+        abandoned = await db.inventory_holds.update_many(
+            {"status": "reserving", "created_at": {"$lte": now - RESERVING_LEASE}},
+            {"$set": {"status": "void", "settled_at": now}}
+        )
+        if abandoned.modified_count:
+            logger.warning(f"Voided {abandoned.modified_count} holds of interrupted reservations")
+        async for hold in db.inventory_holds.find({"status": "held", "expires_at": {"$lte": now}}, {"_id": 0}):
+            if await self._settle(db, hold["id"], ["held"], "released"):
+                await self._adjust(db, hold["product_id"], hold["quantity"])
+                released += 1
+        if released:
+            logger.info(f"Released {released} expired inventory holds")
+        return released
+
+    async def _run(self, db: AsyncIOMotorDatabase) -> None:
+        while True:
+            try:
+                await asyncio.shield(self.release_expired(db))
+            except Exception as e:
+                logger.error(f"Inventory hold sweep failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def start(self, db: AsyncIOMotorDatabase) -> None:
+        """Release expired holds periodically"""
+        self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+
+# Global instance
+inventory = Inventory()
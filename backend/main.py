@@ -9,9 +9,15 @@ import logging
 
 from config import CORS_ORIGINS
 from database import db, close_db_connection
+import catalog_sync
+import db_indexes
+from view_counter import view_counter
+from inventory import inventory
+from seller_stats import seller_stats
+from email_outbox import email_outbox
 
 # Import route modules
-from routes import auth, users, categories, products, reviews, comments, orders, admin, seller, ai, crm, seo
+from routes import auth, users, categories, products, reviews, comments, orders, payments, admin, seller, ai, crm, seo
 
 # Import existing services for analytics
 from advanced_analytics_service import get_advanced_analytics_service
@@ -30,6 +36,7 @@ app.include_router(products.router, prefix=API_PREFIX)
 app.include_router(reviews.router, prefix=API_PREFIX)
 app.include_router(comments.router, prefix=API_PREFIX)
 app.include_router(orders.router, prefix=API_PREFIX)
+app.include_router(payments.router, prefix=API_PREFIX)
 app.include_router(admin.router, prefix=API_PREFIX)
 app.include_router(seller.router, prefix=API_PREFIX)
 app.include_router(ai.router, prefix=API_PREFIX)
@@ -138,13 +145,17 @@ async def get_user_behavior_flow(current_user: User = Depends(get_current_admin)
 
 # ============= ANALYTICS EVENT TRACKING =============
 from models.ai import AnalyticsEvent
+from datetime import datetime, timezone
 
 @app.post("/api/analytics/event")
 async def track_analytics_event(event: AnalyticsEvent):
     """Track analytics event from frontend"""
     try:
         event_dict = event.model_dump()
+        event_dict["created_at"] = datetime.now(timezone.utc)
         await db.analytics_events.insert_one(event_dict)
+        if event.event_type == "product_view" and event.product_id:
+            view_counter.record(event.product_id)
         return {"success": True}
     except Exception as e:
         logger.error(f"Error tracking analytics event: {str(e)}")
@@ -158,12 +169,24 @@ async def startup_event():
     """Actions on application startup"""
     logger.info("Y-Store Marketplace API v2.0 starting up...")
     logger.info("Modular architecture initialized")
+    await db_indexes.ensure_required(db)
+    db_indexes.start(db)
+    catalog_sync.start(db)
+    view_counter.start(db)
+    inventory.start(db)
+    seller_stats.start(db)
+    email_outbox.start(db)
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Actions on application shutdown"""
     logger.info("Shutting down Y-Store Marketplace API...")
+    await view_counter.stop()
+    await inventory.stop()
+    await email_outbox.stop()
+    await seller_stats.stop()
+    await catalog_sync.stop()
     await close_db_connection()
 
 
@@ -0,0 +1,164 @@
+"""
+Migrate ISO-string timestamps to native BSON dates
+
+Older writers stored created_at/updated_at as ISO strings. This script
+converts them in place, collection by collection, in batches ordered by
+_id. Progress is checkpointed in the `migrations` collection, so an
+interrupted run resumes where it stopped.
+
+Usage:
+    python migrate_datetimes.py [--collection orders] [--batch-size 1000] [--dry-run] [--restart]
+"""
+import argparse
+import asyncio
+import os
+from datetime import datetime, timezone
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+# Collection -> string timestamp fields to convert
+DATETIME_FIELDS = {
+    "products": ["created_at", "updated_at"],
+    "users": ["created_at"],
+    "categories": ["created_at"],
+    "reviews": ["created_at"],
+    "comments": ["created_at", "updated_at"],
+    "carts": ["created_at", "updated_at"],
+    "orders": ["created_at", "updated_at"],
+    "payment_transactions": ["created_at", "updated_at"],
+    "payouts": ["created_at", "updated_at", "processed_at"],
+}
+
+# analytics_events were stored without created_at; it is backfilled
+# from the client-supplied `timestamp` string
+BACKFILL_FIELDS = {
+    "analytics_events": {"created_at": "timestamp"},
+}
+
+
+def parse_datetime(value: str):
+    """Parse an ISO string into an aware UTC datetime, or None if invalid"""
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (ValueError, AttributeError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def build_query(collection: str) -> dict:
+    if collection in BACKFILL_FIELDS:
+        return {"$or": [
+            {target: {"$exists": False}, source: {"$type": "string"}}
+            for target, source in BACKFILL_FIELDS[collection].items()
+        ]}
+    return {"$or": [{field: {"$type": "string"}} for field in DATETIME_FIELDS[collection]]}
+
+
+def build_update(collection: str, doc: dict) -> dict:
+    updates = {}
+    if collection in BACKFILL_FIELDS:
+        for target, source in BACKFILL_FIELDS[collection].items():
+            if target not in doc and isinstance(doc.get(source), str):
+                parsed = parse_datetime(doc[source])
+                if parsed:
+                    updates[target] = parsed
+    else:
+        for field in DATETIME_FIELDS[collection]:
+            if isinstance(doc.get(field), str):
+                parsed = parse_datetime(doc[field])
+                if parsed:
+                    updates[field] = parsed
+    return updates
+
+
+async def migrate_collection(db, collection: str, batch_size: int, dry_run: bool, restart: bool):
+    """Convert one collection, resuming from its checkpoint"""
+    checkpoint_id = f"datetimes:{collection}"
+    if restart:
+        await db.migrations.delete_one({"_id": checkpoint_id})
+
+    checkpoint = await db.migrations.find_one({"_id": checkpoint_id}) or {}
+    if checkpoint.get("done"):
+        print(f"⏭️  {collection}: already migrated")
+        return
+
+    last_id = checkpoint.get("last_id")
+    converted = checkpoint.get("converted", 0)
+    skipped = checkpoint.get("skipped", 0)
+    base_query = build_query(collection)
+    fields = {"_id": 1, "timestamp": 1}
+    fields.update({f: 1 for f in DATETIME_FIELDS.get(collection, [])})
+    fields.update({f: 1 for f in BACKFILL_FIELDS.get(collection, {})})
+
+    print(f"🔄 {collection}: starting{' from checkpoint' if last_id else ''}")
+    while True:
+        query = dict(base_query)
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await db[collection].find(query, fields).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+
+        operations = []
+        for doc in batch:
+            updates = build_update(collection, doc)
+            if updates:
+                operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": updates}))
+            else:
+                skipped += 1
+
+        if operations and not dry_run:
+            await db[collection].bulk_write(operations, ordered=False)
+        converted += len(operations)
+        last_id = batch[-1]["_id"]
+
+        if not dry_run:
+            await db.migrations.update_one(
+                {"_id": checkpoint_id},
+                {"$set": {"last_id": last_id, "converted": converted, "skipped": skipped,
+                          "updated_at": datetime.now(timezone.utc)}},
+                upsert=True
+            )
+        print(f"   {collection}: {converted} converted, {skipped} unparseable")
+
+    if not dry_run:
+        await db.migrations.update_one(
+            {"_id": checkpoint_id},
+            {"$set": {"done": True, "updated_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+    print(f"✅ {collection}: {converted} documents converted{' (dry run)' if dry_run else ''}")
+
+
+async def migrate_datetimes(collections, batch_size: int, dry_run: bool, restart: bool):
+    mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+    db_name = os.environ.get('DB_NAME', 'marketplace_db')
+    client = AsyncIOMotorClient(mongo_url, tz_aware=True)
+    db = client[db_name]
+
+    print(f"📦 Using database: {db_name}")
+    for collection in collections:
+        await migrate_collection(db, collection, batch_size, dry_run, restart)
+
+    print("\n🎉 Datetime migration complete!")
+    client.close()
+
+
+if __name__ == "__main__":
+    all_collections = list(DATETIME_FIELDS) + list(BACKFILL_FIELDS)
+    parser = argparse.ArgumentParser(description="Convert ISO-string timestamps to BSON dates")
+    parser.add_argument("--collection", choices=all_collections, help="Only migrate this collection")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="Report without writing")
+    parser.add_argument("--restart", action="store_true", help="Ignore saved checkpoints")
+    args = parser.parse_args()
+
+    asyncio.run(migrate_datetimes(
+        [args.collection] if args.collection else all_collections,
+        args.batch_size,
+        args.dry_run,
+        args.restart,
+    ))
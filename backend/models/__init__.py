@@ -3,13 +3,16 @@ Models package - all Pydantic models
 """
 from models.user import User, UserCreate, UserLogin, Token
 from models.category import Category, CategoryCreate
-from models.product import Product, ProductCreate, ProductUpdate
+from models.product import (
+    Product, ProductCreate, ProductUpdate, ProductPage, ProductCard, ProductCardPage,
+    ProductBulkUpdateItem, ProductBulkUpdateResult
+)
 from models.review import Review, ReviewCreate, ReviewWithProduct
 from models.comment import Comment, CommentCreate, CommentWithReplies, CommentReactions
 from models.order import (
     Cart, CartItem, AddToCartRequest,
-    Order, OrderItem, ShippingAddress, CheckoutRequest,
-    PaymentTransaction
+    Order, OrderItem, OrderPage, ShippingAddress, CheckoutRequest,
+    PaymentTransaction, RozetkaPayCreatePaymentRequest, RozetkaPayPaymentResponse
 )
 from models.promotion import (
     HeroSlide, HeroSlideCreate, HeroSlideUpdate,
@@ -37,15 +40,16 @@ __all__ = [
     # Category
     'Category', 'CategoryCreate',
     # Product
-    'Product', 'ProductCreate', 'ProductUpdate',
+    'Product', 'ProductCreate', 'ProductUpdate', 'ProductPage', 'ProductCard', 'ProductCardPage',
+    'ProductBulkUpdateItem', 'ProductBulkUpdateResult',
     # Review
     'Review', 'ReviewCreate', 'ReviewWithProduct',
     # Comment
     'Comment', 'CommentCreate', 'CommentWithReplies', 'CommentReactions',
     # Order
     'Cart', 'CartItem', 'AddToCartRequest',
-    'Order', 'OrderItem', 'ShippingAddress', 'CheckoutRequest',
-    'PaymentTransaction',
+    'Order', 'OrderItem', 'OrderPage', 'ShippingAddress', 'CheckoutRequest',
+    'PaymentTransaction', 'RozetkaPayCreatePaymentRequest', 'RozetkaPayPaymentResponse',
     # Promotion
     'HeroSlide', 'HeroSlideCreate', 'HeroSlideUpdate',
     'PopularCategory', 'PopularCategoryCreate', 'PopularCategoryUpdate',
@@ -24,7 +24,7 @@ class Cart(BaseModel):
 
 class AddToCartRequest(BaseModel):
     product_id: str
-    quantity: int = 1
+    quantity: int = Field(1, ge=1)
 
 
 class OrderItem(BaseModel):
@@ -33,6 +33,7 @@ class OrderItem(BaseModel):
     quantity: int
     price: float
     seller_id: str
+    category_name: Optional[str] = None
 
 
 class ShippingAddress(BaseModel):
@@ -48,6 +49,9 @@ class Order(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     order_number: str
     buyer_id: str
+    # Snapshot of the buyer at order time, so order lists need no user lookups
+    customer_name: Optional[str] = None
+    customer_email: Optional[str] = None
     items: List[OrderItem]
     total_amount: float
     currency: str = "USD"
@@ -60,6 +64,12 @@ class Order(BaseModel):
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
+class OrderPage(BaseModel):
+    """A keyset-paginated page of orders"""
+    items: List[Order]
+    next_cursor: Optional[str] = None
+
+
 class CheckoutRequest(BaseModel):
     shipping_address: ShippingAddress
 
@@ -76,3 +86,23 @@ class PaymentTransaction(BaseModel):
     metadata: Dict[str, Any] = {}
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class RozetkaPayCreatePaymentRequest(BaseModel):
+    external_id: str
+    amount: float
+    currency: str = "UAH"
+    customer: Dict[str, Any]
+    description: str = "Оплата заказа"
+
+
+class RozetkaPayPaymentResponse(BaseModel):
+    success: bool
+    payment_id: Optional[str] = None
+    external_id: Optional[str] = None
+    is_success: Optional[bool] = None
+    action_required: bool = False
+    action: Optional[Dict[str, Any]] = None
+    status: Optional[str] = None
+    error: Optional[str] = None
+    message: Optional[str] = None
@@ -13,6 +13,7 @@ class Product(BaseModel):
     seller_id: str
     title: str
     slug: str
+    sku: Optional[str] = None
     description: str
     description_html: Optional[str] = None
     short_description: Optional[str] = None
@@ -40,6 +41,7 @@ class Product(BaseModel):
 class ProductCreate(BaseModel):
     title: str
     slug: Optional[str] = None
+    sku: Optional[str] = None
     description: str
     description_html: Optional[str] = None
     short_description: Optional[str] = None
@@ -58,6 +60,7 @@ class ProductCreate(BaseModel):
 
 class ProductUpdate(BaseModel):
     title: Optional[str] = None
+    sku: Optional[str] = None
     description: Optional[str] = None
     description_html: Optional[str] = None
     short_description: Optional[str] = None
@@ -72,3 +75,52 @@ class ProductUpdate(BaseModel):
     status: Optional[str] = None
     is_bestseller: Optional[bool] = None
     is_featured: Optional[bool] = None
+
+
+class ProductBulkUpdateItem(BaseModel):
+    """One price/stock change in a bulk update"""
+    id: str
+    price: Optional[float] = None
+    compare_price: Optional[float] = None
+    stock_level: Optional[int] = None
+    status: Optional[str] = None
+
+
+class ProductBulkUpdateResult(BaseModel):
+    matched: int = 0
+    modified: int = 0
+    not_found: List[str] = []
+    forbidden: List[str] = []
+
+
+class ProductPage(BaseModel):
+    """A keyset-paginated page of products"""
+    items: List[Product]
+    next_cursor: Optional[str] = None
+
+
+class ProductCard(BaseModel):
+    """Slim product representation for listing grids"""
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    title: str
+    slug: Optional[str] = None
+    category_id: Optional[str] = None
+    category_name: Optional[str] = None
+    price: float
+    compare_price: Optional[float] = None
+    currency: str = "USD"
+    stock_level: int = 0
+    images: List[str] = []
+    rating: float = 0.0
+    reviews_count: int = 0
+    installment_months: Optional[int] = None
+    installment_available: bool = False
+    is_bestseller: bool = False
+    is_featured: bool = False
+
+
+class ProductCardPage(BaseModel):
+    """A keyset-paginated page of product cards"""
+    items: List[ProductCard]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,127 @@
+"""
+Keyset (cursor) pagination helpers
+
+Cursors are opaque URL-safe strings that carry the sort key values of the
+last document on a page. The next page is fetched with a range predicate on
+those values instead of `.skip()`, so every page costs the same regardless
+of how deep it is. The `id` field is always the final sort key so the order
+is total and stable.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Response
+
+SortSpec = List[Tuple[str, int]]
+
+
+def with_tiebreaker(sort_fields: SortSpec, field: str = "id") -> SortSpec:
+    """Append a unique tie-breaker field that follows the last sort direction"""
+    if any(name == field for name, _ in sort_fields):
+        return list(sort_fields)
+    direction = sort_fields[-1][1] if sort_fields else 1
+    return list(sort_fields) + [(field, direction)]
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "$dt" in value:
+        return datetime.fromisoformat(value["$dt"])
+    return value
+
+
+def encode_cursor(payload: Dict[str, Any]) -> str:
+    """Serialize a cursor payload into an opaque string"""
+    data = {k: [_encode_value(v) for v in val] if k == "k" else val for k, val in payload.items()}
+    raw = json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Parse an opaque cursor string; raises 400 on malformed input"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+        if not isinstance(data, dict):
+            raise ValueError("cursor payload must be an object")
+        if "k" in data:
+            data["k"] = [_decode_value(v) for v in data["k"]]
+        return data
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def page_response(items_json: bytes, next_cursor: Optional[str], as_page: bool) -> Response:
+    """
+    Response for an already serialized JSON list: wrapped in a page object
+    with `items` and `next_cursor` when `as_page`, the bare list otherwise.
+    The next cursor is also sent in the `X-Next-Cursor` header.
+    """
+    body = items_json
+    if as_page:
+        body = b'{"items":' + items_json + b',"next_cursor":' + json.dumps(next_cursor).encode() + b'}'
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def cursor_from_document(doc: Dict[str, Any], sort_fields: SortSpec, **extra: Any) -> str:
+    """Build the cursor pointing just past `doc` for the given sort order"""
+    payload = {"k": [doc.get(name) for name, _ in sort_fields]}
+    payload.update(extra)
+    return encode_cursor(payload)
+
+
+def keyset_filter(sort_fields: SortSpec, values: List[Any]) -> Dict[str, Any]:
+    """
+    Build the range predicate selecting documents strictly after `values`
+    in `sort_fields` order.
+
+    For sort (a, b, id) this is:
+        a > va OR (a == va AND b > vb) OR (a == va AND b == vb AND id > vid)
+    with `>` flipped to `<` for descending keys. Null/missing values sort
+    lowest in MongoDB, which is accounted for in each branch.
+    """
+    if len(values) != len(sort_fields):
+        raise HTTPException(status_code=400, detail="Cursor does not match sort order")
+
+    branches = []
+    for i, (name, direction) in enumerate(sort_fields):
+        value = values[i]
+        prefix = {sort_fields[j][0]: values[j] for j in range(i)}
+        if value is None:
+            if direction < 0:
+                # Nothing sorts below null in descending order
+                continue
+            condition = {"$ne": None}
+        else:
+            condition = {"$gt" if direction > 0 else "$lt": value}
+            if direction < 0:
+                # Null/missing values come after every real value when descending
+                branches.append({**prefix, name: None})
+        branches.append({**prefix, name: condition})
+
+    if not branches:
+        return {"id": {"$exists": False}}
+    return {"$or": branches}
+
+
+def apply_cursor(query: Dict[str, Any], sort_fields: SortSpec, cursor: Optional[str]) -> Dict[str, Any]:
+    """Combine a base query with the keyset predicate for `cursor`"""
+    if not cursor:
+        return query
+    return {"$and": [query, keyset_filter(sort_fields, cursor_values(cursor))]}
+
+
+def cursor_values(cursor: str) -> List[Any]:
+    """Sort-key values of a keyset cursor; raises 400 for offset or malformed cursors"""
+    payload = decode_cursor(cursor)
+    if "k" not in payload:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return payload["k"]
@@ -0,0 +1,196 @@
+"""
+Payment Gateway
+Payment settlement, shared Stripe client and cached checkout status lookups
+
+Checkout success pages poll GET /checkout/status/{session_id} until the
+payment is settled. Polls are answered in this order:
+
+    1. the in-process cache: settled sessions for an hour, pending ones for
+       CHECKOUT_STATUS_POLL_TTL seconds
+    2. the local payment state in `payment_transactions`, which the Stripe
+       webhook and the first remote lookup that saw the payment fill in
+    3. one remote Stripe lookup; concurrent polls of the same session share
+       the in-flight call instead of each calling Stripe
+
+Settling a payment (order paid, stock committed, cart cleared) is made of
+idempotent steps, and the transaction is marked paid only after all of them
+succeeded. A step that fails is retried by the next poll or webhook, and
+polls, webhooks and processes that observe the same payment settle it once.
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from cachetools import TTLCache
+from fastapi.encoders import jsonable_encoder
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from config import STRIPE_API_KEY, STRIPE_WEBHOOK_URL, CHECKOUT_STATUS_CACHE_SIZE, CHECKOUT_STATUS_POLL_TTL
+from inventory import inventory
+from seller_stats import seller_stats
+
+logger = logging.getLogger(__name__)
+
+SETTLED_TTL = 3600
+
+_client = None
+
+
+def stripe_checkout(base_url: str = ""):
+    """
+    The StripeCheckout client, created once per process. Its webhook URL is
+    STRIPE_WEBHOOK_URL, or when unset derived from the base URL of the first
+    request that passes one, as it was before the setting existed.
+    """
+    global _client
+    if _client is not None:
+        return _client
+    from emergentintegrations.payments.stripe.checkout import StripeCheckout
+    webhook_url = STRIPE_WEBHOOK_URL
+    if not webhook_url and base_url:
+        webhook_url = base_url.rstrip("/") + "/api/webhook/stripe"
+    if not webhook_url:
+        # Status lookups don't use the webhook URL; don't pin an empty one
+        return StripeCheckout(api_key=STRIPE_API_KEY, webhook_url="")
+    _client = StripeCheckout(api_key=STRIPE_API_KEY, webhook_url=webhook_url)
+    return _client
+
+
+def _settled(status: Dict[str, Any]) -> bool:
+    return status.get("payment_status") == "paid" or status.get("status") == "expired"
+
+
+def _local_status(payment: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Status of a settled transaction without asking Stripe; None while it is open"""
+    status = payment.get("checkout_status")
+    if status and _settled(status):
+        return status
+    if payment.get("payment_status") == "paid":
+        # Paid before statuses were stored locally
+        return {
+            "status": "complete",
+            "payment_status": "paid",
+            "amount_total": int(round(payment.get("amount", 0) * 100)),
+            "currency": payment.get("currency", "usd"),
+            "metadata": payment.get("metadata", {}),
+        }
+    return None
+
+
+async def mark_order_paid(db: AsyncIOMotorDatabase, order_id: str, payment_method: str) -> None:
+    """
+    A payment gateway confirmed the payment of an order: mark it paid, keep its
+    stock and clear the buyer's cart. Every step may be repeated safely.
+    """
+    now = datetime.now(timezone.utc)
+    # Conditional, so the order's revenue is counted only once
+    order = await db.orders.find_one_and_update(
+        {"id": order_id, "payment_status": {"$ne": "paid"}},
+        {"$set": {
+            "payment_status": "paid",
+            "status": "processing",
+            "payment_method": payment_method,
+            "updated_at": now
+        }},
+        projection={"_id": 0, "buyer_id": 1, "items": 1, "created_at": 1}
+    )
+    if order:
+        # Only on the transition: a repeated callback must not empty a new cart
+        seller_stats.record_paid_order(order)
+        await db.carts.update_one(
+            {"user_id": order["buyer_id"]},
+            {"$set": {"items": [], "updated_at": now}}
+        )
+    await inventory.commit(db, order_id)
+
+
+class CheckoutStatusCache:
+    """Serves checkout status polls with at most one remote call per session at a time"""
+
+    def __init__(self, maxsize: int = CHECKOUT_STATUS_CACHE_SIZE, poll_ttl: int = CHECKOUT_STATUS_POLL_TTL):
+        self._settled: TTLCache = TTLCache(maxsize=maxsize, ttl=SETTLED_TTL)
+        self._pending: TTLCache = TTLCache(maxsize=maxsize, ttl=poll_ttl)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.remote_calls = 0
+
+    def _store(self, session_id: str, status: Dict[str, Any]) -> None:
+        if _settled(status):
+            self._pending.pop(session_id, None)
+            self._settled[session_id] = status
+        else:
+            self._pending[session_id] = status
+
+    async def get(self, db: AsyncIOMotorDatabase, session_id: str) -> Dict[str, Any]:
+        """Current status of a checkout session"""
+        status = self._settled.get(session_id) or self._pending.get(session_id)
+        if status is not None:
+            return status
+
+        inflight = self._inflight.get(session_id)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        # Nobody may be waiting on a failure; don't warn about it
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[session_id] = future
+        try:
+            status = await self._lookup(db, session_id)
+            future.set_result(status)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            del self._inflight[session_id]
+        return status
+
+    async def _lookup(self, db: AsyncIOMotorDatabase, session_id: str) -> Dict[str, Any]:
+        payment = await db.payment_transactions.find_one({"session_id": session_id}, {"_id": 0})
+        status = _local_status(payment) if payment else None
+        if status is None:
+            self.remote_calls += 1
+            status = jsonable_encoder(await stripe_checkout().get_checkout_status(session_id))
+            if payment:
+                await self._apply(db, payment, status)
+        self._store(session_id, status)
+        return status
+
+    async def _apply(self, db: AsyncIOMotorDatabase, payment: Dict[str, Any], status: Dict[str, Any]) -> None:
+        if status.get("payment_status") == "paid":
+            await self._mark_paid(db, payment, status)
+        elif status.get("status") == "expired":
+            # The session can no longer be paid, give the reserved stock back
+            await inventory.release(db, payment["order_id"])
+            await db.payment_transactions.update_one(
+                {"session_id": payment["session_id"], "payment_status": {"$ne": "paid"}},
+                {"$set": {"checkout_status": status, "updated_at": datetime.now(timezone.utc)}}
+            )
+
+    async def _mark_paid(self, db: AsyncIOMotorDatabase, payment: Dict[str, Any], status: Dict[str, Any]) -> None:
+        if payment.get("payment_status") == "paid":
+            return
+        await mark_order_paid(db, payment["order_id"], "stripe")
+        # Last, so a failed step above is retried by the next poll or webhook
+        await db.payment_transactions.update_one(
+            {"session_id": payment["session_id"], "payment_status": {"$ne": "paid"}},
+            {"$set": {"payment_status": "paid", "checkout_status": status, "updated_at": datetime.now(timezone.utc)}}
+        )
+
+    async def apply_webhook(self, db: AsyncIOMotorDatabase, event: Any) -> None:
+        """Record the payment state a Stripe webhook reported"""
+        session_id = getattr(event, "session_id", None)
+        if not session_id or getattr(event, "payment_status", None) != "paid":
+            return
+        payment = await db.payment_transactions.find_one({"session_id": session_id}, {"_id": 0})
+        if not payment:
+            return
+        status = _local_status({**payment, "payment_status": "paid", "checkout_status": None})
+        if getattr(event, "metadata", None):
+            status["metadata"] = event.metadata
+        await self._mark_paid(db, payment, status)
+        self._store(session_id, status)
+
+
+# Global instance
+checkout_status_cache = CheckoutStatusCache()
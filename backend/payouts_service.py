@@ -71,8 +71,8 @@ class PayoutsService:
             "payment_method": payment_method,
             "payment_details": payment_details,
             "status": "pending",
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "updated_at": datetime.now(timezone.utc).isoformat(),
+            "created_at": datetime.now(timezone.utc),
+            "updated_at": datetime.now(timezone.utc),
             "processed_at": None
         }
         
@@ -115,9 +115,9 @@ class PayoutsService:
             {
                 "$set": {
                     "status": status,
-                    "processed_at": datetime.now(timezone.utc).isoformat(),
+                    "processed_at": datetime.now(timezone.utc),
                     "processed_by": admin_id,
-                    "updated_at": datetime.now(timezone.utc).isoformat()
+                    "updated_at": datetime.now(timezone.utc)
                 }
             }
         )
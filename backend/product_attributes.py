@@ -0,0 +1,160 @@
+"""
+Product Attributes
+Filterable attribute-pattern view of product specifications
+
+`specifications` is free-form (grouped {group_name, fields: [{key, value}]}
+or flat {group, key, value} entries, see STRUCTURED_SPECIFICATIONS_GUIDE.md).
+Every write also stores a flat `attrs` array
+
+    [{"k": "производитель", "v": "apple", "name": "Производитель", "value": "Apple"}, ...]
+
+where k/v are normalized for matching and name/value keep the display text.
+A multikey index on (attrs.k, attrs.v) serves `attr.<name>=<value>` filters
+and facet counts.
+
+Backfill existing products with:
+    python product_attributes.py [--batch-size 1000]
+"""
+import argparse
+import asyncio
+import os
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+from search_service import normalize
+
+ATTR_PARAM_PREFIX = "attr."
+MAX_FACET_VALUES = 50
+
+
+def normalize_attr(text: Any) -> str:
+    return " ".join(normalize(str(text)).split())
+
+
+def specification_attributes(specifications: Optional[Iterable[Dict[str, Any]]]) -> List[Dict[str, str]]:
+    """Flatten specifications into unique {k, v, name, value} entries"""
+    attrs, seen = [], set()
+    for entry in specifications or []:
+        if not isinstance(entry, dict):
+            continue
+        fields = entry.get("fields") if "fields" in entry else [entry]
+        for field in fields or []:
+            if not isinstance(field, dict):
+                continue
+            name, value = field.get("key"), field.get("value")
+            if name in (None, "") or value in (None, ""):
+                continue
+            k, v = normalize_attr(name), normalize_attr(value)
+            if not k or not v or (k, v) in seen:
+                continue
+            seen.add((k, v))
+            attrs.append({"k": k, "v": v, "name": str(name).strip(), "value": str(value).strip()})
+    return attrs
+
+
+def attribute_filters(params: Mapping[str, Any]) -> Dict[str, List[str]]:
+    """
+    Read `attr.<name>=<value>` query parameters. Repeating a parameter
+    matches any of its values.
+    """
+    filters: Dict[str, List[str]] = {}
+    for key in params.keys():
+        if not key.startswith(ATTR_PARAM_PREFIX):
+            continue
+        name = normalize_attr(key[len(ATTR_PARAM_PREFIX):])
+        values = [normalize_attr(v) for v in params.getlist(key) if v.strip()]
+        if name and values:
+            filters.setdefault(name, []).extend(values)
+    return filters
+
+
+def attribute_clause(name: str, values: List[str]) -> Dict[str, Any]:
+    return {"attrs": {"$elemMatch": {"k": name, "v": values[0] if len(values) == 1 else {"$in": values}}}}
+
+
+def attribute_clauses(filters: Dict[str, List[str]], exclude: Optional[str] = None) -> List[Dict[str, Any]]:
+    return [attribute_clause(name, values) for name, values in filters.items() if name != exclude]
+
+
+def _facet_pipeline(match: List[Dict[str, Any]], key: Optional[str] = None) -> List[Dict[str, Any]]:
+    pipeline = [{"$match": {"$and": match}}] if match else []
+    pipeline.append({"$unwind": "$attrs"})
+    if key is not None:
+        pipeline.append({"$match": {"attrs.k": key}})
+    pipeline += [
+        {"$group": {
+            "_id": {"k": "$attrs.k", "v": "$attrs.v"},
+            "name": {"$first": "$attrs.name"},
+            "value": {"$first": "$attrs.value"},
+            "count": {"$sum": 1},
+        }},
+        {"$sort": {"count": -1, "_id.v": 1}},
+        {"$group": {
+            "_id": "$_id.k",
+            "name": {"$first": "$name"},
+            "count": {"$sum": "$count"},
+            "values": {"$push": {"value": "$_id.v", "label": "$value", "count": "$count"}},
+        }},
+        {"$project": {"_id": 0, "key": "$_id", "name": 1, "count": 1,
+                      "values": {"$slice": ["$values", MAX_FACET_VALUES]}}},
+    ]
+    return pipeline
+
+
+async def attribute_facets(db, base_query: Dict[str, Any], filters: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+    """
+    Value counts per attribute for the current filter set, in one aggregation.
+    A selected attribute is counted without its own filter so the shopper
+    still sees the alternatives they can switch to.
+    """
+    facets = {"all": _facet_pipeline(attribute_clauses(filters))}
+    selected = list(filters)
+    for i, name in enumerate(selected):
+        facets[f"s{i}"] = _facet_pipeline(attribute_clauses(filters, exclude=name), key=name)
+
+    result = await db.products.aggregate([{"$match": base_query}, {"$facet": facets}]).to_list(1)
+    buckets = result[0] if result else {}
+
+    by_key = {facet["key"]: facet for facet in buckets.get("all", [])}
+    for i, name in enumerate(selected):
+        own = buckets.get(f"s{i}") or []
+        if own:
+            by_key[name] = own[0]
+    return sorted(by_key.values(), key=lambda facet: -facet["count"])
+
+
+async def backfill_attributes(batch_size: int):
+    """Compute `attrs` for every product that has specifications"""
+    mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+    db_name = os.environ.get('DB_NAME', 'marketplace_db')
+    client = AsyncIOMotorClient(mongo_url)
+    db = client[db_name]
+
+    print(f"📦 Using database: {db_name}")
+    updated = 0
+    operations = []
+    async for product in db.products.find({}, {"_id": 0, "id": 1, "specifications": 1}):
+        operations.append(UpdateOne(
+            {"id": product["id"]},
+            {"$set": {"attrs": specification_attributes(product.get("specifications"))}}
+        ))
+        if len(operations) >= batch_size:
+            await db.products.bulk_write(operations, ordered=False)
+            updated += len(operations)
+            operations = []
+            print(f"   {updated} products updated")
+    if operations:
+        await db.products.bulk_write(operations, ordered=False)
+        updated += len(operations)
+
+    print(f"✅ Attributes computed for {updated} products")
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill product attrs from specifications")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(backfill_attributes(args.batch_size))
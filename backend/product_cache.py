@@ -0,0 +1,88 @@
+"""
+Product Cache
+Bounded LRU/TTL read-through cache for single-product lookups
+
+Product pages are the hottest read path. Validated `Product` models are
+cached by id; every product write invalidates the entry through
+catalog_sync, and the TTL bounds staleness for writes that bypass it.
+"""
+import logging
+from typing import Awaitable, Callable, Dict, Optional
+
+from cachetools import TTLCache
+
+from config import PRODUCT_CACHE_SIZE, PRODUCT_CACHE_TTL
+from database import db
+from models.product import Product
+
+logger = logging.getLogger(__name__)
+
+
+async def load_product(product_id: str) -> Optional[Product]:
+    """Read one product from MongoDB"""
+    product = await db.products.find_one({"id": product_id}, {"_id": 0})
+    if not product:
+        return None
+    return Product(**product)
+
+
+class ProductCache:
+    """Read-through cache of Product models keyed by product id"""
+
+    def __init__(self, maxsize: int = PRODUCT_CACHE_SIZE, ttl: int = PRODUCT_CACHE_TTL):
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Bumped on every invalidation so a load that raced with a write
+        # does not store the stale document it read
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get_or_load(
+        self,
+        product_id: str,
+        loader: Callable[[str], Awaitable[Optional[Product]]],
+    ) -> Optional[Product]:
+        """Return the cached product or load it with `loader` and cache it"""
+        product = self._cache.get(product_id)
+        if product is not None:
+            self.hits += 1
+            return product
+
+        self.misses += 1
+        generation = self._generation
+        product = await loader(product_id)
+        if product is not None and generation == self._generation:
+            self._cache[product_id] = product
+        return product
+
+    async def get(self, product_id: str) -> Optional[Product]:
+        """Return the product by id, loading it from MongoDB on a miss"""
+        return await self.get_or_load(product_id, load_product)
+
+    def invalidate(self, product_id: str) -> None:
+        """Drop a product from the cache"""
+        self._generation += 1
+        self.invalidations += 1
+        self._cache.pop(product_id, None)
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters for sizing and monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "ttl": self._cache.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Global instance
+product_cache = ProductCache()
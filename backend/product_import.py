@@ -0,0 +1,263 @@
+"""
+Bulk Product Import
+Streams NDJSON or CSV catalog uploads into batched unordered upserts
+
+Rows are parsed as the request body arrives, validated with ProductCreate
+and written in batches with one unordered bulk_write each. Rows are upserted
+by (seller_id, sku) when a SKU is given, otherwise by (seller_id, slug).
+Every batch is re-read once and pushed to the in-process indexes, so the
+search and suggestion indexes are updated without a rebuild.
+"""
+import codecs
+import csv
+import json
+import logging
+import re
+import uuid
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+import catalog_sync
+from models.product import Product, ProductCreate
+from product_attributes import specification_attributes
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+
+# CSV cells holding lists use this separator; specifications are JSON
+CSV_LIST_FIELDS = {"images", "videos"}
+CSV_JSON_FIELDS = {"specifications"}
+
+
+def generate_slug(title: str) -> str:
+    """URL slug from a title with a short random suffix"""
+    slug_base = re.sub(r'[^a-z0-9]+', '-', title.lower()).strip('-')
+    return f"{slug_base}-{str(uuid.uuid4())[:8]}"
+
+
+# ============= STREAM PARSING =============
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """Yield (row_number, parsed_object_or_error) for each non-empty line"""
+    row = 0
+    async for line in _iter_lines(chunks):
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            yield row, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row, ValueError(f"Invalid JSON: {e.msg}")
+
+
+def _csv_cell(field: str, value: str) -> Any:
+    if value == "":
+        return None
+    if field in CSV_LIST_FIELDS:
+        return [v.strip() for v in value.split("|") if v.strip()]
+    if field in CSV_JSON_FIELDS:
+        return json.loads(value)
+    return value
+
+
+async def iter_csv(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Yield (row_number, dict_or_error) per CSV record. The first record is
+    the header. Quoted cells may span lines.
+    """
+    header: Optional[List[str]] = None
+    pending = ""
+    row = 0
+    async for line in _iter_lines(chunks):
+        pending = f"{pending}\n{line}" if pending else line
+        # An odd number of quotes means a quoted cell continues on the next line
+        if pending.count('"') % 2:
+            continue
+        record, pending = pending, ""
+        if not record.strip():
+            continue
+        cells = next(csv.reader([record]))
+        if header is None:
+            header = [h.strip() for h in cells]
+            continue
+        row += 1
+        try:
+            yield row, {
+                field: _csv_cell(field, value)
+                for field, value in zip(header, cells)
+                if field and value != ""
+            }
+        except json.JSONDecodeError as e:
+            yield row, ValueError(f"Invalid JSON in cell: {e.msg}")
+    if pending:
+        row += 1
+        yield row, ValueError("Unterminated quoted field")
+
+
+# ============= WRITING =============
+
+class ImportReport:
+    """Accumulates counts and per-row errors for one import"""
+
+    def __init__(self):
+        self.received = 0
+        self.inserted = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def add_error(self, row: int, errors: List[str]) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "errors": errors})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "received": self.received,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def _format_validation_error(error: ValidationError) -> List[str]:
+    return [f"{'.'.join(str(p) for p in e['loc']) or 'row'}: {e['msg']}" for e in error.errors()]
+
+
+def _build_upsert(seller_id: str, data: ProductCreate) -> Tuple[Dict[str, Any], UpdateOne]:
+    fields = data.model_dump(exclude_unset=True)
+    if not fields.get("slug"):
+        fields.pop("slug", None)
+
+    key = {"seller_id": seller_id}
+    if fields.get("sku"):
+        key["sku"] = fields["sku"]
+    else:
+        # The row's slug is its identity across re-imports; a row without
+        # one can only ever be inserted
+        key["slug"] = fields.setdefault("slug", generate_slug(data.title))
+
+    if "specifications" in fields:
+        fields["attrs"] = specification_attributes(fields["specifications"])
+    now = datetime.now(timezone.utc)
+    fields["updated_at"] = now
+    # A new product gets Product defaults for everything the row leaves out
+    defaults = Product(
+        seller_id=seller_id,
+        slug=generate_slug(data.title),
+        created_at=now,
+        **data.model_dump(exclude={"slug"}),
+    ).model_dump()
+    set_on_insert = {k: v for k, v in defaults.items() if k not in fields and k not in key}
+
+    return key, UpdateOne(key, {"$set": fields, "$setOnInsert": set_on_insert}, upsert=True)
+
+
+def _batch_query(seller_id: str, keys: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """One query matching every product addressed by `keys`"""
+    skus = [key["sku"] for key in keys if "sku" in key]
+    slugs = [key["slug"] for key in keys if "slug" in key]
+    clauses = []
+    if skus:
+        clauses.append({"sku": {"$in": skus}})
+    if slugs:
+        clauses.append({"slug": {"$in": slugs}})
+    return {"seller_id": seller_id, "$or": clauses} if clauses else None
+
+
+async def _flush(
+    db: AsyncIOMotorDatabase,
+    seller_id: str,
+    batch: List[Tuple[int, Dict[str, Any], UpdateOne]],
+    report: ImportReport,
+) -> None:
+    if not batch:
+        return
+    # Category stats need the replaced values of updated products
+    previous = {
+        doc["id"]: doc
+        async for doc in db.products.find(
+            _batch_query(seller_id, [key for _, key, _ in batch]),
+            {"_id": 0, "id": 1, "status": 1, "category_id": 1, "price": 1, "stock_level": 1}
+        )
+    }
+
+    operations = [op for _, _, op in batch]
+    failed_indexes = set()
+    try:
+        result = await db.products.bulk_write(operations, ordered=False)
+        details = result.bulk_api_result
+    except BulkWriteError as e:
+        details = e.details
+        for error in details.get("writeErrors", []):
+            failed_indexes.add(error["index"])
+            report.add_error(batch[error["index"]][0], [error.get("errmsg", "Write failed")])
+
+    report.inserted += details.get("nUpserted", 0)
+    report.updated += details.get("nMatched", 0)
+
+    # Re-read the written products once and refresh the in-process indexes
+    query = _batch_query(seller_id, [key for i, (_, key, _) in enumerate(batch) if i not in failed_indexes])
+    if query:
+        async for product in db.products.find(query, {"_id": 0}):
+            catalog_sync.product_saved(product, previous.get(product["id"]))
+
+
+async def import_products(
+    db: AsyncIOMotorDatabase,
+    seller_id: str,
+    rows: AsyncIterator[Tuple[int, Any]],
+    batch_size: int = IMPORT_BATCH_SIZE,
+) -> Dict[str, Any]:
+    """Validate streamed rows and upsert them in batches"""
+    report = ImportReport()
+    batch: List[Tuple[int, Dict[str, Any], UpdateOne]] = []
+
+    async for row, payload in rows:
+        report.received += 1
+        if isinstance(payload, Exception):
+            report.add_error(row, [str(payload)])
+            continue
+        if not isinstance(payload, dict):
+            report.add_error(row, ["Row must be an object"])
+            continue
+        try:
+            data = ProductCreate(**payload)
+        except ValidationError as e:
+            report.add_error(row, _format_validation_error(e))
+            continue
+
+        key, operation = _build_upsert(seller_id, data)
+        batch.append((row, key, operation))
+        if len(batch) >= batch_size:
+            await _flush(db, seller_id, batch, report)
+            batch = []
+
+    await _flush(db, seller_id, batch, report)
+    logger.info(
+        f"Product import for seller {seller_id}: {report.inserted} inserted, "
+        f"{report.updated} updated, {report.failed} failed"
+    )
+    return report.as_dict()
@@ -0,0 +1,63 @@
+"""
+Product Resolver
+Batched product lookups for carts and orders
+
+Checkout, order creation and order emails all need the same few fields of
+every product an order references. They are fetched with one `$in` query
+instead of a find_one per line, and line prices are taken from the fetched
+products so totals never depend on what the client or an old cart says.
+"""
+from typing import Any, Dict, Iterable, List, Tuple
+
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from models.order import OrderItem
+
+ORDER_PRODUCT_PROJECTION = {
+    "_id": 0, "id": 1, "title": 1, "price": 1, "seller_id": 1, "category_name": 1, "stock_level": 1, "status": 1
+}
+
+
+async def resolve_products(
+    db: AsyncIOMotorDatabase,
+    product_ids: Iterable[str],
+    projection: Dict[str, Any] = ORDER_PRODUCT_PROJECTION,
+) -> Dict[str, Dict[str, Any]]:
+    """Fetch products by id in one query; unknown ids are absent from the result"""
+    ids = list({pid for pid in product_ids if pid})
+    if not ids:
+        return {}
+    return {doc["id"]: doc async for doc in db.products.find({"id": {"$in": ids}}, projection)}
+
+
+def price_items(
+    lines: Iterable[Dict[str, Any]],
+    products: Dict[str, Dict[str, Any]],
+) -> Tuple[List[OrderItem], float, List[str]]:
+    """
+    Build order items at the current product prices.
+    Returns the items, their total and the ids of products that no longer exist.
+    Raises 400 for a quantity that is not a positive integer.
+    """
+    items: List[OrderItem] = []
+    missing: List[str] = []
+    total = 0.0
+    for line in lines:
+        product = products.get(line.get("product_id"))
+        if not product:
+            missing.append(line.get("product_id"))
+            continue
+        quantity = line.get("quantity")
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 1:
+            raise HTTPException(status_code=400, detail=f"Invalid quantity for product {product['id']}")
+        items.append(OrderItem(
+            product_id=product["id"],
+            title=product["title"],
+            quantity=quantity,
+            price=product["price"],
+            seller_id=product["seller_id"],
+            category_name=product.get("category_name"),
+        ))
+        total += product["price"] * quantity
+    return items, round(total, 2), missing
@@ -1,7 +1,7 @@
 """
 Routes package - all API route modules
 """
-from routes import auth, users, categories, products, reviews, comments, orders, admin, seller, ai, crm, seo
+from routes import auth, users, categories, products, reviews, comments, orders, payments, admin, seller, ai, crm, seo
 
 __all__ = [
     'auth',
@@ -11,6 +11,7 @@ __all__ = [
     'reviews',
     'comments',
     'orders',
+    'payments',
     'admin',
     'seller',
     'ai',
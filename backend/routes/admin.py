@@ -16,6 +16,9 @@ from models.promotion import (
 )
 from models.product import Product
 from dependencies import get_current_admin
+from product_cache import product_cache
+import catalog_sync
+import db_indexes
 
 router = APIRouter(tags=["Admin"])
 
@@ -402,4 +405,17 @@ async def toggle_product_bestseller(
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    catalog_sync.product_changed(product_id)
     return {"success": True, "product_id": product_id, "is_bestseller": is_bestseller}
+
+
+@router.get("/admin/products/cache-stats")
+async def get_product_cache_stats(current_user: User = Depends(get_current_admin)):
+    """Product cache hit/miss counters (admin only)"""
+    return product_cache.stats()
+
+
+@router.get("/admin/db/indexes")
+async def get_index_report(current_user: User = Depends(get_current_admin)):
+    """Missing and undeclared MongoDB indexes per collection (admin only)"""
+    return await db_indexes.check_indexes(db)
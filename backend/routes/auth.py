@@ -2,7 +2,6 @@
 Authentication routes
 """
 from fastapi import APIRouter, HTTPException, Depends
-from datetime import datetime
 
 from database import db
 from models.user import User, UserCreate, UserLogin, Token
@@ -27,7 +26,6 @@ async def register(user_data: UserCreate):
     
     user_doc = user.model_dump()
     user_doc["password_hash"] = get_password_hash(user_data.password)
-    user_doc["created_at"] = user_doc["created_at"].isoformat()
     
     await db.users.insert_one(user_doc)
     access_token = create_access_token({"sub": user.id})
@@ -46,8 +44,6 @@ async def login(credentials: UserLogin):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     user_doc.pop("password_hash", None)
-    if isinstance(user_doc.get("created_at"), str):
-        user_doc["created_at"] = datetime.fromisoformat(user_doc["created_at"])
     
     user = User(**user_doc)
     access_token = create_access_token({"sub": user.id})
@@ -3,12 +3,13 @@ Category routes
 """
 from fastapi import APIRouter, HTTPException, Depends
 from typing import List
-from datetime import datetime
 
 from database import db
 from models.category import Category, CategoryCreate
 from models.user import User
 from dependencies import get_current_admin
+from category_tree import category_tree
+from category_stats import category_stats
 
 router = APIRouter(prefix="/categories", tags=["Categories"])
 
@@ -19,27 +20,24 @@ async def get_categories(tree: bool = False):
     Get all categories. If tree=true, returns nested structure.
     Otherwise returns flat list.
     """
-    categories = await db.categories.find({}, {"_id": 0}).to_list(1000)
-    for cat in categories:
-        if isinstance(cat.get("created_at"), str):
-            cat["created_at"] = datetime.fromisoformat(cat["created_at"])
-    
-    if not tree:
-        return categories
-    
-    # Build tree structure
-    def build_tree(parent_id=None):
-        result = []
-        for cat in categories:
-            if cat.get("parent_id") == parent_id:
-                cat_copy = dict(cat)
-                children = build_tree(cat["id"])
-                if children:
-                    cat_copy["children"] = children
-                result.append(cat_copy)
-        return result
-    
-    return build_tree(None)
+    if tree:
+        return await category_tree.tree(db)
+    return await category_tree.categories(db)
+
+
+@router.get("/stats")
+async def get_category_stats():
+    """
+    Product counts and price ranges per category. `own` covers products
+    directly in the category, `total` includes all subcategories.
+    """
+    return await category_stats.get_all(db)
+
+
+@router.get("/{category_id}/stats")
+async def get_single_category_stats(category_id: str):
+    """Product counts and price range of one category"""
+    return await category_stats.get(db, category_id)
 
 
 @router.post("", response_model=Category)
@@ -50,8 +48,8 @@ async def create_category(
     """Create a new category (admin only)"""
     category = Category(**category_data.model_dump())
     cat_doc = category.model_dump()
-    cat_doc["created_at"] = cat_doc["created_at"].isoformat()
     await db.categories.insert_one(cat_doc)
+    category_tree.invalidate()
     return category
 
 
@@ -71,6 +69,8 @@ async def update_category(
     
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Category not found")
+    category_tree.invalidate()
+    category_stats.invalidate()
     
     updated_category = await db.categories.find_one({"id": category_id}, {"_id": 0})
     return Category(**updated_category)
@@ -86,5 +86,7 @@ async def delete_category(
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Category not found")
+    category_tree.invalidate()
+    category_stats.invalidate()
     
     return {"message": "Category deleted successfully"}
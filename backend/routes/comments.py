@@ -21,11 +21,6 @@ def build_comment_tree(comments: List[dict], parent_id: Optional[str] = None, cu
             # Check if current user reacted
             user_reacted = current_user_id in comment.get("user_reactions", []) if current_user_id else False
             
-            # Parse datetime
-            created_at = comment.get("created_at")
-            if isinstance(created_at, str):
-                created_at = datetime.fromisoformat(created_at)
-            
             # Parse reactions
             reactions_data = comment.get("reactions", {})
             if isinstance(reactions_data, dict):
@@ -42,7 +37,7 @@ def build_comment_tree(comments: List[dict], parent_id: Optional[str] = None, cu
                 parent_id=comment.get("parent_id"),
                 reactions=reactions,
                 user_reacted=user_reacted,
-                created_at=created_at,
+                created_at=comment["created_at"],
                 replies=build_comment_tree(comments, comment["id"], current_user_id)
             )
             result.append(comment_obj)
@@ -80,12 +75,6 @@ async def get_product_comments_flat(product_id: str):
         {"_id": 0}
     ).sort("created_at", -1).to_list(1000)
     
-    for comment in comments:
-        if isinstance(comment.get("created_at"), str):
-            comment["created_at"] = datetime.fromisoformat(comment["created_at"])
-        if isinstance(comment.get("updated_at"), str):
-            comment["updated_at"] = datetime.fromisoformat(comment["updated_at"])
-    
     return comments
 
 
@@ -113,8 +102,6 @@ async def create_comment(
     )
     
     comment_doc = comment.model_dump()
-    comment_doc["created_at"] = comment_doc["created_at"].isoformat()
-    comment_doc["updated_at"] = comment_doc["updated_at"].isoformat()
     comment_doc["reactions"] = {"likes": 0, "hearts": 0}
     comment_doc["user_reactions"] = []
     
@@ -157,7 +144,7 @@ async def react_to_comment(
             "$set": {
                 "reactions": reactions,
                 "user_reactions": user_reactions,
-                "updated_at": datetime.now(timezone.utc).isoformat()
+                "updated_at": datetime.now(timezone.utc)
             }
         }
     )
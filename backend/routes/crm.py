@@ -13,6 +13,7 @@ from models.crm import (
     Lead, LeadCreate, LeadUpdate
 )
 from dependencies import get_current_admin
+from inventory import inventory
 
 router = APIRouter(prefix="/crm", tags=["CRM"])
 
@@ -178,6 +179,9 @@ async def update_order_status(
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Order not found")
     
+    if status == "cancelled":
+        await inventory.release(db, order_id)
+    
     # Create note about status change
     order = await db.orders.find_one({"id": order_id}, {"_id": 0})
     if order:
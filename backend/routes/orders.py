@@ -1,17 +1,27 @@
 """
 Order and Cart routes
 """
-from fastapi import APIRouter, HTTPException, Depends, Request
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Any, Dict, List, Optional, Union
 from datetime import datetime, timezone
 import uuid
 import logging
-import os
+from pydantic import TypeAdapter
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 
 from database import db
+from product_resolver import resolve_products, price_items
+from inventory import inventory
+from email_outbox import email_outbox
+from seller_stats import seller_stats
+from payment_gateway import checkout_status_cache, stripe_checkout
+from idempotency import idempotency
+from pagination import with_tiebreaker, apply_cursor, cursor_from_document, page_response
 from models.order import (
     Cart, CartItem, AddToCartRequest,
-    Order, OrderItem, CheckoutRequest, PaymentTransaction
+    Order, OrderPage, CheckoutRequest, PaymentTransaction
 )
 from models.user import User
 from dependencies import get_current_user, get_current_admin
@@ -19,25 +29,28 @@ from dependencies import get_current_user, get_current_admin
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["Orders & Cart"])
 
+ORDER_SORT = with_tiebreaker([("created_at", -1)])
+MAX_ORDERS_PAGE = 1000
+# Payment methods confirmed by a gateway callback (the storefront sends "online" for RozetkaPay)
+ONLINE_PAYMENT_METHODS = {"online", "rozetkapay", "stripe"}
+
+_order_json = TypeAdapter(Dict[str, Any])
+_order_list = TypeAdapter(List[Dict[str, Any]])
+
 
 # ============= CART ENDPOINTS =============
 
 @router.get("/cart", response_model=Cart)
 async def get_cart(current_user: User = Depends(get_current_user)):
     """Get current user's cart"""
-    cart = await db.carts.find_one({"user_id": current_user.id}, {"_id": 0})
-    if not cart:
-        cart = Cart(user_id=current_user.id)
-        cart_doc = cart.model_dump()
-        cart_doc["created_at"] = cart_doc["created_at"].isoformat()
-        cart_doc["updated_at"] = cart_doc["updated_at"].isoformat()
-        await db.carts.insert_one(cart_doc)
-        return cart
-    
-    if isinstance(cart.get("created_at"), str):
-        cart["created_at"] = datetime.fromisoformat(cart["created_at"])
-    if isinstance(cart.get("updated_at"), str):
-        cart["updated_at"] = datetime.fromisoformat(cart["updated_at"])
+    # One upsert so concurrent first loads share a cart instead of racing the unique user_id index
+    cart = await db.carts.find_one_and_update(
+        {"user_id": current_user.id},
+        {"$setOnInsert": Cart(user_id=current_user.id).model_dump()},
+        projection={"_id": 0},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
     return Cart(**cart)
 
 
@@ -46,44 +59,69 @@ async def add_to_cart(
     item: AddToCartRequest,
     current_user: User = Depends(get_current_user)
 ):
-    """Add item to cart"""
-    product = await db.products.find_one({"id": item.product_id}, {"_id": 0})
+    """
+    Add item to cart.
+
+    The cart is changed with single atomic updates so concurrent requests
+    don't overwrite each other: a new line is pushed only while the cart has
+    no line for the product, an existing line is incremented only while the
+    resulting quantity stays within stock.
+    """
+    # Read from the database: cached products may lag behind stock changes
+    product = await db.products.find_one({"id": item.product_id}, {"_id": 0, "price": 1, "stock_level": 1})
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    
+
     if product["stock_level"] < item.quantity:
         raise HTTPException(status_code=400, detail="Insufficient stock")
-    
-    cart = await db.carts.find_one({"user_id": current_user.id}, {"_id": 0})
-    if not cart:
-        cart = Cart(user_id=current_user.id).model_dump()
-        cart["created_at"] = cart["created_at"].isoformat()
-        cart["updated_at"] = cart["updated_at"].isoformat()
-    
-    cart_item = CartItem(
-        product_id=item.product_id,
-        quantity=item.quantity,
-        price=product["price"]
-    )
-    
-    items = cart.get("items", [])
-    existing_idx = next((i for i, x in enumerate(items) if x["product_id"] == item.product_id), None)
-    
-    if existing_idx is not None:
-        items[existing_idx]["quantity"] += item.quantity
-    else:
-        items.append(cart_item.model_dump())
-    
-    cart["items"] = items
-    cart["updated_at"] = datetime.now(timezone.utc).isoformat()
-    
-    await db.carts.update_one(
-        {"user_id": current_user.id},
-        {"$set": cart},
-        upsert=True
-    )
-    
-    return {"message": "Item added to cart", "cart": cart}
+
+    now = datetime.now(timezone.utc)
+    line = CartItem(product_id=item.product_id, quantity=item.quantity, price=product["price"])
+    new_cart = Cart(user_id=current_user.id).model_dump(exclude={"items", "updated_at"})
+    for _ in range(2):
+        try:
+            # Carts are unique per user (db_indexes.REQUIRED_UNIQUE, checked
+            # at startup), so when the user's cart already has this product
+            # the upsert fails instead of creating a second cart
+            cart = await db.carts.find_one_and_update(
+                {"user_id": current_user.id, "items.product_id": {"$ne": item.product_id}},
+                {
+                    "$push": {"items": line.model_dump()},
+                    "$set": {"updated_at": now},
+                    "$setOnInsert": new_cart,
+                },
+                projection={"_id": 0},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            return {"message": "Item added to cart", "cart": cart}
+        except DuplicateKeyError:
+            pass
+
+        cart = await db.carts.find_one_and_update(
+            {
+                "user_id": current_user.id,
+                "items": {"$elemMatch": {
+                    "product_id": item.product_id,
+                    "quantity": {"$lte": product["stock_level"] - item.quantity},
+                }},
+            },
+            # `$` is the line matched by $elemMatch
+            {
+                "$inc": {"items.$.quantity": item.quantity},
+                "$set": {"items.$.price": product["price"], "updated_at": now},
+            },
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+        if cart:
+            return {"message": "Item added to cart", "cart": cart}
+
+        # Either the line would exceed stock or it was removed meanwhile
+        if await db.carts.count_documents({"user_id": current_user.id, "items.product_id": item.product_id}, limit=1):
+            raise HTTPException(status_code=400, detail="Insufficient stock")
+
+    raise HTTPException(status_code=409, detail="Cart was modified concurrently, please retry")
 
 
 @router.delete("/cart/items/{product_id}")
@@ -92,16 +130,15 @@ async def remove_from_cart(
     current_user: User = Depends(get_current_user)
 ):
     """Remove item from cart"""
-    cart = await db.carts.find_one({"user_id": current_user.id})
-    if not cart:
-        raise HTTPException(status_code=404, detail="Cart not found")
-    
-    items = [item for item in cart.get("items", []) if item["product_id"] != product_id]
-    
-    await db.carts.update_one(
+    result = await db.carts.update_one(
         {"user_id": current_user.id},
-        {"$set": {"items": items, "updated_at": datetime.now(timezone.utc).isoformat()}}
+        {
+            "$pull": {"items": {"product_id": product_id}},
+            "$set": {"updated_at": datetime.now(timezone.utc)},
+        }
     )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Cart not found")
     
     return {"message": "Item removed from cart"}
 
@@ -111,7 +148,7 @@ async def clear_cart(current_user: User = Depends(get_current_user)):
     """Clear entire cart"""
     await db.carts.update_one(
         {"user_id": current_user.id},
-        {"$set": {"items": [], "updated_at": datetime.now(timezone.utc).isoformat()}}
+        {"$set": {"items": [], "updated_at": datetime.now(timezone.utc)}}
     )
     return {"message": "Cart cleared"}
 
@@ -121,33 +158,39 @@ async def clear_cart(current_user: User = Depends(get_current_user)):
 @router.post("/checkout/create-session")
 async def create_checkout_session(
     request: Request,
+    response: Response,
     checkout_data: CheckoutRequest,
+    idempotency_key: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user)
 ):
-    """Create Stripe checkout session"""
-    from emergentintegrations.payments.stripe.checkout import StripeCheckout, CheckoutSessionRequest
+    """
+    Create Stripe checkout session.
+    Retries with the same `Idempotency-Key` header return the first session.
+    """
+    return await idempotency.run(
+        db, idempotency_key, "checkout", current_user.id, checkout_data,
+        lambda: _create_checkout_session(request, checkout_data, current_user),
+        response,
+    )
+
+
+async def _create_checkout_session(request: Request, checkout_data: CheckoutRequest, current_user: User):
+    from emergentintegrations.payments.stripe.checkout import CheckoutSessionRequest
     
     cart = await db.carts.find_one({"user_id": current_user.id}, {"_id": 0})
     if not cart or not cart.get("items"):
         raise HTTPException(status_code=400, detail="Cart is empty")
     
-    total = sum(item["price"] * item["quantity"] for item in cart["items"])
-    
-    order_items = []
-    for item in cart["items"]:
-        product = await db.products.find_one({"id": item["product_id"]}, {"_id": 0})
-        if product:
-            order_items.append(OrderItem(
-                product_id=item["product_id"],
-                title=product["title"],
-                quantity=item["quantity"],
-                price=item["price"],
-                seller_id=product["seller_id"]
-            ))
+    products = await resolve_products(db, (item["product_id"] for item in cart["items"]))
+    order_items, total, missing = price_items(cart["items"], products)
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Products no longer available: {', '.join(missing)}")
     
     order = Order(
         order_number=f"ORD-{datetime.now(timezone.utc).strftime('%Y%m%d')}-{str(uuid.uuid4())[:8].upper()}",
         buyer_id=current_user.id,
+        customer_name=current_user.full_name,
+        customer_email=current_user.email,
         items=order_items,
         total_amount=total,
         shipping_address=checkout_data.shipping_address,
@@ -155,16 +198,17 @@ async def create_checkout_session(
         payment_status="pending"
     )
     
+    # Held until the payment is confirmed or the hold expires
+    await inventory.reserve(db, order.id, order.items)
     order_doc = order.model_dump()
-    order_doc["created_at"] = order_doc["created_at"].isoformat()
-    order_doc["updated_at"] = order_doc["updated_at"].isoformat()
-    await db.orders.insert_one(order_doc)
+    try:
+        await db.orders.insert_one(order_doc)
+    except Exception:
+        await inventory.release(db, order.id)
+        raise
     
-    stripe_api_key = os.environ.get('STRIPE_API_KEY')
     host_url = str(request.base_url).rstrip('/')
-    webhook_url = f"{host_url}/api/webhook/stripe"
-    
-    stripe_checkout = StripeCheckout(api_key=stripe_api_key, webhook_url=webhook_url)
+    stripe_client = stripe_checkout(host_url)
     
     success_url = f"{request.headers.get('origin', host_url)}/checkout/success?session_id={{CHECKOUT_SESSION_ID}}"
     cancel_url = f"{request.headers.get('origin', host_url)}/checkout/cancel"
@@ -180,7 +224,15 @@ async def create_checkout_session(
         }
     )
     
-    session = await stripe_checkout.create_checkout_session(checkout_request)
+    try:
+        session = await stripe_client.create_checkout_session(checkout_request)
+    except Exception:
+        await inventory.release(db, order.id)
+        await db.orders.update_one(
+            {"id": order.id},
+            {"$set": {"status": "cancelled", "updated_at": datetime.now(timezone.utc)}}
+        )
+        raise
     
     payment = PaymentTransaction(
         order_id=order.id,
@@ -193,8 +245,6 @@ async def create_checkout_session(
     )
     
     payment_doc = payment.model_dump()
-    payment_doc["created_at"] = payment_doc["created_at"].isoformat()
-    payment_doc["updated_at"] = payment_doc["updated_at"].isoformat()
     await db.payment_transactions.insert_one(payment_doc)
     
     await db.orders.update_one(
@@ -211,61 +261,30 @@ async def create_checkout_session(
 
 @router.get("/checkout/status/{session_id}")
 async def get_checkout_status(session_id: str):
-    """Get checkout status"""
-    from emergentintegrations.payments.stripe.checkout import StripeCheckout
-    
-    stripe_api_key = os.environ.get('STRIPE_API_KEY')
-    stripe_checkout = StripeCheckout(api_key=stripe_api_key, webhook_url="")
-    
-    status = await stripe_checkout.get_checkout_status(session_id)
-    
-    if status.payment_status == "paid":
-        payment = await db.payment_transactions.find_one({"session_id": session_id})
-        if payment and payment.get("payment_status") != "paid":
-            await db.payment_transactions.update_one(
-                {"session_id": session_id},
-                {"$set": {"payment_status": "paid", "updated_at": datetime.now(timezone.utc).isoformat()}}
-            )
-            
-            await db.orders.update_one(
-                {"id": payment["order_id"]},
-                {"$set": {
-                    "payment_status": "paid",
-                    "status": "processing",
-                    "payment_method": "stripe",
-                    "updated_at": datetime.now(timezone.utc).isoformat()
-                }}
-            )
-            
-            order = await db.orders.find_one({"id": payment["order_id"]})
-            if order:
-                await db.carts.update_one(
-                    {"user_id": order["buyer_id"]},
-                    {"$set": {"items": [], "updated_at": datetime.now(timezone.utc).isoformat()}}
-                )
-    
-    return status
+    """
+    Get checkout status. Settled sessions are answered locally; open ones
+    ask Stripe at most once per few seconds, shared by concurrent polls.
+    """
+    return await checkout_status_cache.get(db, session_id)
 
 
 @router.post("/webhook/stripe")
 async def stripe_webhook(request: Request):
     """Handle Stripe webhook"""
-    from emergentintegrations.payments.stripe.checkout import StripeCheckout
-    
-    stripe_api_key = os.environ.get('STRIPE_API_KEY')
-    webhook_url = str(request.base_url).rstrip('/') + "/api/webhook/stripe"
-    stripe_checkout = StripeCheckout(api_key=stripe_api_key, webhook_url=webhook_url)
+    stripe_client = stripe_checkout(str(request.base_url))
     
     body = await request.body()
     signature = request.headers.get("Stripe-Signature")
     
     try:
-        webhook_response = await stripe_checkout.handle_webhook(body, signature)
+        webhook_response = await stripe_client.handle_webhook(body, signature)
         logger.info(f"Stripe webhook: {webhook_response.event_type}")
-        return {"status": "success"}
     except Exception as e:
         logger.error(f"Stripe webhook error: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
+    
+    await checkout_status_cache.apply_webhook(db, webhook_response)
+    return {"status": "success"}
 
 
 # ============= ORDERS ENDPOINTS =============
@@ -273,15 +292,50 @@ async def stripe_webhook(request: Request):
 @router.post("/orders", response_model=Order)
 async def create_order(
     order_data: dict,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user)
 ):
-    """Create a new order"""
+    """
+    Create a new order.
+    Retries with the same `Idempotency-Key` header return the first order.
+    """
+    return await idempotency.run(
+        db, idempotency_key, "order", current_user.id, order_data,
+        lambda: _create_order(order_data, current_user),
+        response,
+    )
+
+
+async def _create_order(order_data: dict, current_user: User) -> Order:
     try:
+        # Items are priced from the catalog, not from the request
+        lines = order_data.get("items", [])
+        products = await resolve_products(db, (line.get("product_id") for line in lines))
+        items, items_total, missing = price_items(lines, products)
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Products no longer available: {', '.join(missing)}")
+
+        # Delivery is the part of the client's total not covered by its item prices
+        delivery_price = order_data.get("delivery_price")
+        if delivery_price is None:
+            client_items_total = sum(line.get("price", 0) * line.get("quantity", 0) for line in lines)
+            delivery_price = max(order_data.get("total_amount", 0) - client_items_total, 0)
+        elif (
+            isinstance(delivery_price, bool)
+            or not isinstance(delivery_price, (int, float))
+            or not 0 <= delivery_price < float("inf")
+        ):
+            raise HTTPException(status_code=400, detail="Invalid delivery price")
+
+        buyer_id = order_data.get("buyer_id", current_user.id)
         order = Order(
             order_number=order_data.get("order_number", f"ORD-{datetime.now(timezone.utc).strftime('%Y%m%d')}-{str(uuid.uuid4())[:8].upper()}"),
-            buyer_id=order_data.get("buyer_id", current_user.id),
-            items=order_data.get("items", []),
-            total_amount=order_data.get("total_amount", 0),
+            buyer_id=buyer_id,
+            customer_name=current_user.full_name if buyer_id == current_user.id else None,
+            customer_email=current_user.email if buyer_id == current_user.id else None,
+            items=items,
+            total_amount=round(items_total + delivery_price, 2),
             currency=order_data.get("currency", "USD"),
             shipping_address=order_data.get("shipping_address", {}),
             status=order_data.get("status", "pending"),
@@ -289,10 +343,18 @@ async def create_order(
             payment_method=order_data.get("payment_method", "cash_on_delivery")
         )
         
+        # Orders paid online hold their stock until the gateway confirms the
+        # payment; orders paid on delivery take it right away
+        awaits_payment = order.payment_method in ONLINE_PAYMENT_METHODS and order.payment_status != "paid"
+        await inventory.reserve(db, order.id, order.items, commit=not awaits_payment)
         order_doc = order.model_dump()
-        order_doc["created_at"] = order_doc["created_at"].isoformat()
-        order_doc["updated_at"] = order_doc["updated_at"].isoformat()
-        await db.orders.insert_one(order_doc)
+        try:
+            await db.orders.insert_one(order_doc)
+        except Exception:
+            await inventory.release(db, order.id)
+            raise
+        if order.payment_status == "paid":
+            seller_stats.record_paid_order(order_doc)
         
         # Clear cart after successful order creation
         await db.carts.update_one(
@@ -300,62 +362,110 @@ async def create_order(
             {"$set": {"items": []}}
         )
         
-        # Send email notifications
+        # Queue email notifications; delivery happens in the outbox workers
         try:
-            from email_service import email_service
-            
-            customer = await db.users.find_one({"id": current_user.id}, {"_id": 0})
-            customer_name = customer.get("full_name", "Покупатель") if customer else "Покупатель"
-            customer_email = customer.get("email", "") if customer else ""
-            
             email_order_data = {
                 "order_number": order.order_number,
                 "buyer_id": order.buyer_id,
-                "customer_name": customer_name,
-                "customer_email": customer_email,
-                "items": [],
+                "customer_name": current_user.full_name or "Покупатель",
+                "customer_email": current_user.email,
+                "items": [
+                    {"product_name": item.title, "quantity": item.quantity, "price": item.price}
+                    for item in order.items
+                ],
                 "total_amount": order.total_amount,
                 "status": order.status,
                 "payment_method": order.payment_method
             }
-            
-            for item in order.items:
-                product = await db.products.find_one({"id": item.get("product_id")}, {"_id": 0})
-                email_order_data["items"].append({
-                    "product_name": product.get("title", "Unknown") if product else "Unknown",
-                    "quantity": item.get("quantity", 0),
-                    "price": item.get("price", 0)
-                })
-            
-            if customer_email:
-                email_service.send_order_confirmation(customer_email, email_order_data)
-            
-            email_service.send_admin_notification(email_order_data)
+            await email_outbox.enqueue_order_emails(db, email_order_data)
             
         except Exception as e:
-            logger.error(f"Failed to send email notifications: {str(e)}")
+            logger.error(f"Failed to queue email notifications: {str(e)}")
         
         return order
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error creating order: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to create order: {str(e)}")
 
 
-@router.get("/orders", response_model=List[Order])
-async def get_orders(current_user: User = Depends(get_current_user)):
-    """Get user's orders"""
-    query = {"buyer_id": current_user.id}
-    if current_user.role == "admin":
-        query = {}
-    
-    orders = await db.orders.find(query, {"_id": 0}).to_list(1000)
-    for order in orders:
-        if isinstance(order.get("created_at"), str):
-            order["created_at"] = datetime.fromisoformat(order["created_at"])
-        if isinstance(order.get("updated_at"), str):
-            order["updated_at"] = datetime.fromisoformat(order["updated_at"])
-    return orders
+def order_query(
+    status: Optional[str],
+    payment_status: Optional[str],
+    buyer_id: Optional[str],
+    created_from: Optional[datetime],
+    created_to: Optional[datetime],
+    seller_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Filter for order listings; `seller_id` matches orders with any line of that seller"""
+    query: Dict[str, Any] = {}
+    if buyer_id:
+        query["buyer_id"] = buyer_id
+    if seller_id:
+        query["items.seller_id"] = seller_id
+    if status:
+        query["status"] = status
+    if payment_status:
+        query["payment_status"] = payment_status
+    if created_from or created_to:
+        query["created_at"] = {}
+        if created_from:
+            query["created_at"]["$gte"] = created_from
+        if created_to:
+            query["created_at"]["$lt"] = created_to
+    return query
+
+
+def orders_response(orders: List[Dict[str, Any]], cursor: Optional[str], limit: int) -> Response:
+    """
+    Serialize a page of stored orders without re-validating them; a page
+    object is returned when the client paginates with `cursor`
+    """
+    next_cursor = cursor_from_document(orders[-1], ORDER_SORT) if len(orders) == limit else None
+    return page_response(_order_list.dump_json(orders), next_cursor, cursor is not None)
+
+
+@router.get("/orders", response_model=Union[List[Order], OrderPage])
+async def get_orders(
+    status: Optional[str] = None,
+    payment_status: Optional[str] = None,
+    buyer_id: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_ORDERS_PAGE),
+    format: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get user's orders, newest first. Admins see all orders and may filter
+    by `buyer_id`.
+
+    Pass `cursor` (empty for the first page) for keyset pagination; the
+    response is then a page object with `items` and `next_cursor`, which is
+    also sent in the `X-Next-Cursor` header. `format=ndjson` streams every
+    matching order (after `cursor`, if given) one JSON object per line.
+    """
+    if current_user.role != "admin":
+        if buyer_id and buyer_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Not authorized")
+        buyer_id = current_user.id
+    if format not in (None, "json", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'ndjson'")
+
+    query = order_query(status, payment_status, buyer_id, created_from, created_to)
+    find_query = apply_cursor(query, ORDER_SORT, cursor)
+
+    if format == "ndjson":
+        async def stream():
+            async for order in db.orders.find(find_query, {"_id": 0}).sort(ORDER_SORT).batch_size(500):
+                yield _order_json.dump_json(order) + b"\n"
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    orders = await db.orders.find(find_query, {"_id": 0}).sort(ORDER_SORT).limit(limit).to_list(limit)
+    return orders_response(orders, cursor, limit)
 
 
 @router.get("/orders/{order_id}", response_model=Order)
@@ -368,46 +478,50 @@ async def get_order(order_id: str, current_user: User = Depends(get_current_user
     if order["buyer_id"] != current_user.id and current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    if isinstance(order.get("created_at"), str):
-        order["created_at"] = datetime.fromisoformat(order["created_at"])
-    if isinstance(order.get("updated_at"), str):
-        order["updated_at"] = datetime.fromisoformat(order["updated_at"])
     return Order(**order)
 
 
-@router.get("/admin/orders")
-async def get_admin_orders(current_user: User = Depends(get_current_admin)):
-    """Get all orders with details for admin"""
-    try:
-        orders = await db.orders.find({}, {"_id": 0}).to_list(10000)
-        
-        for order in orders:
-            customer = await db.users.find_one({"id": order.get("buyer_id")}, {"_id": 0})
-            if customer:
-                order["customer_name"] = customer.get("full_name", "N/A")
-                order["customer_email"] = customer.get("email", "N/A")
-            else:
-                order["customer_name"] = "Unknown"
-                order["customer_email"] = "N/A"
-            
-            for item in order.get("items", []):
-                product = await db.products.find_one({"id": item.get("product_id")}, {"_id": 0})
-                if product:
-                    item["product_name"] = product.get("title", "Unknown Product")
-                    item["category_name"] = product.get("category_name")
-                    item["price"] = item.get("price", product.get("price", 0))
-            
-            if isinstance(order.get("created_at"), str):
-                order["created_at"] = order["created_at"]
-            elif hasattr(order.get("created_at"), 'isoformat'):
-                order["created_at"] = order["created_at"].isoformat()
-                
-            if isinstance(order.get("updated_at"), str):
-                order["updated_at"] = order["updated_at"]
-            elif hasattr(order.get("updated_at"), 'isoformat'):
-                order["updated_at"] = order["updated_at"].isoformat()
-        
-        return orders
-    except Exception as e:
-        logger.error(f"Error fetching admin orders: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+@router.get("/admin/orders", response_model=Union[List[Order], OrderPage])
+async def get_admin_orders(
+    status: Optional[str] = None,
+    payment_status: Optional[str] = None,
+    buyer_id: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(MAX_ORDERS_PAGE, ge=1, le=MAX_ORDERS_PAGE),
+    current_user: User = Depends(get_current_admin)
+):
+    """
+    Get orders with customer and product details for admin, newest first.
+    Filters and `cursor` pagination work as in GET /orders.
+    """
+    query = order_query(status, payment_status, buyer_id, created_from, created_to)
+    orders = await db.orders.find(
+        apply_cursor(query, ORDER_SORT, cursor), {"_id": 0}
+    ).sort(ORDER_SORT).limit(limit).to_list(limit)
+
+    # Orders carry customer and item snapshots; older ones without them are
+    # completed with one batched lookup per collection
+    buyer_ids = {o.get("buyer_id") for o in orders if not o.get("customer_email")}
+    product_ids = {
+        item.get("product_id") for o in orders for item in o.get("items", [])
+        if "category_name" not in item
+    }
+    customers = {
+        user["id"]: user
+        async for user in db.users.find({"id": {"$in": list(buyer_ids)}}, {"_id": 0, "id": 1, "full_name": 1, "email": 1})
+    } if buyer_ids else {}
+    products = await resolve_products(db, product_ids, {"_id": 0, "id": 1, "title": 1, "category_name": 1})
+
+    for order in orders:
+        if not order.get("customer_email"):
+            customer = customers.get(order.get("buyer_id"))
+            order["customer_name"] = customer.get("full_name", "N/A") if customer else "Unknown"
+            order["customer_email"] = customer.get("email", "N/A") if customer else "N/A"
+        for item in order.get("items", []):
+            if "category_name" not in item:
+                item["category_name"] = products.get(item.get("product_id"), {}).get("category_name")
+            item["product_name"] = item.get("title", "Unknown Product")
+
+    return orders_response(orders, cursor, limit)
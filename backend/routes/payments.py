@@ -0,0 +1,186 @@
+"""
+RozetkaPay payment routes
+"""
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from datetime import datetime, timezone
+import json
+import os
+import uuid
+import logging
+
+from database import db
+from config import ROZETKAPAY_WIDGET_KEY
+from rozetkapay_service import rozetkapay_service
+from inventory import inventory
+from payment_gateway import mark_order_paid
+from models.order import RozetkaPayCreatePaymentRequest, RozetkaPayPaymentResponse
+from models.user import User
+from dependencies import get_current_user
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/payment/rozetkapay", tags=["Payments"])
+
+
+def _order_currency(order: dict) -> str:
+    return order.get("currency") or "USD"
+
+
+def _pays_order(payload: dict, order: dict) -> bool:
+    """The callback is for the order's full total, in the order's currency"""
+    details = payload.get("details") or {}
+    amount = payload.get("amount", details.get("amount"))
+    currency = payload.get("currency", details.get("currency"))
+    try:
+        amount = float(amount)
+    except (TypeError, ValueError):
+        return False
+    return (
+        round(amount, 2) == round(order["total_amount"], 2)
+        and str(currency).upper() == _order_currency(order).upper()
+    )
+
+
+@router.get("/widget-key")
+async def get_widget_key():
+    """Public widget key for the storefront's RozetkaPay card form"""
+    return {"widget_key": ROZETKAPAY_WIDGET_KEY}
+
+
+@router.post("/create", response_model=RozetkaPayPaymentResponse)
+async def create_rozetkapay_payment(
+    request: RozetkaPayCreatePaymentRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Create payment using RozetkaPay Hosted Checkout.
+    `external_id` is the order number; amount and currency are taken from the order.
+    """
+    order = await db.orders.find_one({"order_number": request.external_id}, {"_id": 0})
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    if order["buyer_id"] != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    backend_url = os.environ.get('REACT_APP_BACKEND_URL', 'http://localhost:8001')
+    frontend_url = backend_url.replace(':8001', ':3000').replace('/api', '')
+
+    # The service uses blocking HTTP calls
+    result = await run_in_threadpool(
+        rozetkapay_service.create_payment,
+        external_id=request.external_id,
+        amount=order["total_amount"],
+        currency=_order_currency(order),
+        customer=request.customer,
+        callback_url=f"{backend_url}/api/payment/rozetkapay/webhook",
+        result_url=f"{frontend_url}/checkout/success",
+        description=request.description
+    )
+
+    if not result.get("success"):
+        logger.error(f"Payment creation failed: {result.get('error')}")
+        return RozetkaPayPaymentResponse(
+            success=False,
+            error=result.get("error"),
+            message="Failed to create payment"
+        )
+
+    now = datetime.now(timezone.utc)
+    await db.payment_transactions.insert_one({
+        "id": str(uuid.uuid4()),
+        "order_id": order["id"],
+        "order_number": request.external_id,
+        "payment_id": result.get("payment_id"),
+        "user_id": current_user.id,
+        "amount": order["total_amount"],
+        "currency": _order_currency(order),
+        "status": result.get("status", "pending"),
+        "payment_status": "pending",
+        "payment_method": "rozetkapay",
+        "created_at": now,
+        "updated_at": now,
+        "raw_response": result.get("raw_response")
+    })
+
+    return RozetkaPayPaymentResponse(
+        success=True,
+        payment_id=result.get("payment_id"),
+        external_id=result.get("external_id"),
+        is_success=result.get("is_success"),
+        action_required=result.get("action_required", False),
+        action=result.get("action"),
+        status=result.get("status"),
+        message="Payment created successfully"
+    )
+
+
+@router.post("/webhook")
+async def rozetkapay_webhook(request: Request):
+    """
+    Handle payment callbacks from RozetkaPay. A successful payment commits the
+    order's stock, a failed one gives it back.
+    """
+    body_str = (await request.body()).decode('utf-8')
+    signature = request.headers.get('X-ROZETKAPAY-SIGNATURE', '')
+    if not rozetkapay_service.verify_webhook_signature(body_str, signature):
+        logger.warning("Invalid RozetkaPay webhook signature")
+        raise HTTPException(status_code=403, detail="Invalid signature")
+
+    try:
+        payload = json.loads(body_str)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid payload")
+
+    external_id = payload.get("external_id")
+    payment_id = payload.get("id")
+    status = (payload.get("details") or {}).get("status")
+    logger.info(f"RozetkaPay webhook for order {external_id}: status={status}, success={payload.get('is_success')}")
+
+    order = await db.orders.find_one(
+        {"order_number": external_id}, {"_id": 0, "id": 1, "total_amount": 1, "currency": 1}
+    ) if external_id else None
+    now = datetime.now(timezone.utc)
+    await db.payment_transactions.update_one(
+        {"order_number": external_id, "payment_method": "rozetkapay"},
+        {"$set": {
+            "status": status,
+            "is_success": payload.get("is_success"),
+            "webhook_received": True,
+            "webhook_data": payload,
+            "updated_at": now
+        }}
+    )
+    if not order:
+        return {"status": "ignored", "order_id": external_id}
+
+    if status == "success":
+        if not _pays_order(payload, order):
+            logger.error(
+                f"RozetkaPay webhook for order {external_id} paid {payload.get('amount')} {payload.get('currency')}, "
+                f"expected {order['total_amount']} {_order_currency(order)}"
+            )
+            return {"status": "amount_mismatch", "order_id": external_id}
+        await db.orders.update_one({"id": order["id"]}, {"$set": {"payment_session_id": payment_id}})
+        # Repeated callbacks are harmless: settling the order is idempotent
+        await mark_order_paid(db, order["id"], "rozetkapay")
+        await db.payment_transactions.update_one(
+            {"order_number": external_id, "payment_method": "rozetkapay"},
+            {"$set": {"payment_status": "paid"}}
+        )
+    elif status == "failure":
+        await db.orders.update_one(
+            {"id": order["id"], "payment_status": {"$ne": "paid"}},
+            {"$set": {"payment_status": "payment_failed", "payment_session_id": payment_id, "updated_at": now}}
+        )
+        await inventory.release(db, order["id"])
+
+    return {"status": "processed", "order_id": external_id}
+
+
+@router.get("/info/{payment_id}")
+async def get_payment_info(
+    payment_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Get payment information from RozetkaPay"""
+    return await run_in_threadpool(rozetkapay_service.get_payment_info, payment_id)
@@ -1,92 +1,258 @@
 """
 Product routes
 """
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+from pydantic import TypeAdapter
 from datetime import datetime, timezone
-import uuid
-import re
+from cachetools import TTLCache
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
 
 from database import db
-from models.product import Product, ProductCreate, ProductUpdate
+from config import SEARCH_STATS_CACHE_SIZE, SEARCH_STATS_CACHE_TTL
+from models.product import (
+    Product, ProductCreate, ProductUpdate, ProductPage, ProductCard, ProductCardPage,
+    ProductBulkUpdateItem, ProductBulkUpdateResult
+)
 from models.user import User
 from dependencies import get_current_seller
+from search_service import search_index, normalize
+from suggestion_service import suggestion_index
+from product_cache import product_cache
+from catalog_snapshot import catalog_snapshot
+from category_tree import category_tree
+import catalog_sync
+from product_import import generate_slug, import_products, iter_csv, iter_ndjson
+from product_attributes import attribute_clauses, attribute_facets, attribute_filters, specification_attributes
+from pagination import (
+    with_tiebreaker, apply_cursor, cursor_from_document, cursor_values, encode_cursor, decode_cursor, page_response
+)
 
 router = APIRouter(prefix="/products", tags=["Products"])
 
 
-@router.get("", response_model=List[Product])
+# Sort orders for product listings. Every order ends with a unique `id`
+# tie-breaker so keyset pagination is stable.
+SORT_OPTIONS = {
+    "newest": [("created_at", -1)],
+    "price_asc": [("price", 1)],
+    "price_desc": [("price", -1)],
+    "rating": [("rating", -1), ("reviews_count", -1)],
+    "popularity": [("views_count", -1), ("rating", -1)],
+    "trending": [("trending_rank", -1), ("views_count", -1)],
+}
+
+MAX_BULK_UPDATE_ITEMS = 10000
+
+# slug and sku are unique per seller (db_indexes)
+_DUPLICATE_PRODUCT = "You already have a product with this slug or SKU"
+
+# Fields needed to build a cursor for any sort order
+_SORT_KEY_FIELDS = {"id", "created_at", "price", "rating", "reviews_count", "views_count", "trending_rank"}
+
+_card_list = TypeAdapter(List[ProductCard])
+_field_list = TypeAdapter(List[Dict[str, Any]])
+
+
+def _listing_projection(view: Optional[str], fields: Optional[str]) -> Tuple[dict, Optional[Set[str]]]:
+    """
+    Mongo projection for a listing request, plus the set of fields the
+    client asked for when `fields=` is used
+    """
+    if fields:
+        requested = {f.strip() for f in fields.split(",") if f.strip()}
+        unknown = requested - set(Product.model_fields)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        requested.add("id")
+        projection = {"_id": 0, **{f: 1 for f in requested | _SORT_KEY_FIELDS}}
+        if "images" in projection and view == "card":
+            projection["images"] = {"$slice": 1}
+        return projection, requested
+    if view == "card":
+        projection = {"_id": 0, **{f: 1 for f in set(ProductCard.model_fields) | _SORT_KEY_FIELDS}}
+        projection["images"] = {"$slice": 1}
+        return projection, None
+    if view is not None:
+        raise HTTPException(status_code=400, detail="Unknown view; supported: card")
+    return {"_id": 0}, None
+
+
+def _slim_response(
+    products: List[dict],
+    requested: Optional[Set[str]],
+    cursor_mode: bool,
+    next_cursor: Optional[str],
+) -> Response:
+    """
+    Serialize card / field-limited listings straight to JSON, skipping the
+    full Product response model
+    """
+    if requested is not None:
+        items = [{k: v for k, v in prod.items() if k in requested} for prod in products]
+        body = _field_list.dump_json(items)
+    else:
+        body = _card_list.dump_json(_card_list.validate_python(products))
+    return page_response(body, next_cursor, cursor_mode)
+
+
+def _listing_query(
+    category_ids: Optional[List[str]],
+    seller_id: Optional[str],
+    min_price: Optional[float],
+    max_price: Optional[float],
+) -> Dict[str, Any]:
+    query: Dict[str, Any] = {"status": "published"}
+    if category_ids:
+        query["category_id"] = category_ids[0] if len(category_ids) == 1 else {"$in": category_ids}
+    if seller_id:
+        query["seller_id"] = seller_id
+    if min_price is not None or max_price is not None:
+        query["price"] = {}
+        if min_price is not None:
+            query["price"]["$gte"] = min_price
+        if max_price is not None:
+            query["price"]["$lte"] = max_price
+    return query
+
+
+@router.get("", response_model=Union[List[Product], ProductPage, List[ProductCard], ProductCardPage])
 async def get_products(
+    request: Request,
+    response: Response,
     category_id: Optional[str] = None,
     search: Optional[str] = None,
     seller_id: Optional[str] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     sort_by: Optional[str] = None,
+    cursor: Optional[str] = None,
+    view: Optional[str] = None,
+    fields: Optional[str] = None,
     skip: int = 0,
     limit: int = 50
 ):
-    """Get products with filters and sorting"""
-    query = {"status": "published"}
+    """
+    Get products with filters and sorting.
+
+    Pass `cursor` (empty for the first page) to use keyset pagination; the
+    response is then a page object with `items` and `next_cursor`. Without
+    `cursor` a plain list is returned and `skip` is honoured for
+    compatibility. The next cursor is also sent in the `X-Next-Cursor` header.
+
+    `view=card` returns slim ProductCard items (first image only) for
+    listing grids; `fields=a,b,c` returns only the listed Product fields.
+    Both are projected in Mongo and skip full Product validation.
+
+    `attr.<name>=<value>` filters on specification attributes; repeat a
+    parameter to match any of several values.
+
+    `category_id` includes products of all subcategories.
+    """
+    category_ids = await category_tree.descendant_ids(db, category_id) if category_id else None
+    query = _listing_query(category_ids, seller_id, min_price, max_price)
+    attr_filters = attribute_filters(request.query_params)
+    if attr_filters:
+        query["$and"] = attribute_clauses(attr_filters)
     
-    # Build filter query
-    if category_id:
-        query["category_id"] = category_id
-    if seller_id:
-        query["seller_id"] = seller_id
-    if min_price is not None or max_price is not None:
-        query["price"] = {}
-        if min_price is not None:
-            query["price"]["$gte"] = min_price
-        if max_price is not None:
-            query["price"]["$lte"] = max_price
+    cursor_mode = cursor is not None
+    projection, requested_fields = _listing_projection(view, fields)
+    next_cursor = None
     
-    # Use MongoDB text search for better relevance
-    if search:
-        query["$text"] = {"$search": search}
-        projection = {"_id": 0, "score": {"$meta": "textScore"}}
+    if search and not cursor and not skip:
+        suggestion_index.record_query(search)
+    
+    if search and search_index.ready and not attr_filters:
+        # Served from the in-process BM25 index; only the final page of
+        # documents is fetched from Mongo. The cursor carries an offset.
+        offset = decode_cursor(cursor).get("o", 0) if cursor else skip
+        page_ids = search_index.search(
+            search,
+            sort_by=sort_by,
+            offset=offset,
+            limit=limit,
+            category_ids=category_ids,
+            seller_id=seller_id,
+            min_price=min_price,
+            max_price=max_price,
+        )
+        found = await db.products.find({"id": {"$in": page_ids}}, projection).to_list(len(page_ids))
+        by_id = {p["id"]: p for p in found}
+        products = [by_id[pid] for pid in page_ids if pid in by_id]
         
-        # Default sort by relevance when searching
-        sort_field = [("score", {"$meta": "textScore"})]
+        if len(page_ids) == limit:
+            next_cursor = encode_cursor({"o": offset + limit})
+    elif search and sort_by not in SORT_OPTIONS:
+        # Mongo $text fallback while the search index is loading.
+        # Relevance order has no stable key to seek on, so the cursor
+        # carries an offset instead
+        query["$text"] = {"$search": search}
+        projection["score"] = {"$meta": "textScore"}
+        offset = skip
+        if cursor:
+            offset = decode_cursor(cursor).get("o", 0)
         
-        # Override sort if explicitly requested
-        if sort_by == "popularity":
-            sort_field = [("views_count", -1), ("rating", -1)]
-        elif sort_by == "newest":
-            sort_field = [("created_at", -1)]
-        elif sort_by == "price_asc":
-            sort_field = [("price", 1)]
-        elif sort_by == "price_desc":
-            sort_field = [("price", -1)]
-        elif sort_by == "rating":
-            sort_field = [("rating", -1), ("reviews_count", -1)]
+        products = await db.products.find(query, projection).sort(
+            [("score", {"$meta": "textScore"}), ("id", 1)]
+        ).skip(offset).limit(limit).to_list(limit)
         
-        products = await db.products.find(query, projection).sort(sort_field).skip(skip).limit(limit).to_list(limit)
+        if len(products) == limit:
+            next_cursor = encode_cursor({"o": offset + limit})
         
         # Remove score from response
         for prod in products:
             prod.pop("score", None)
     else:
-        # No search query - use standard sorting
-        sort_field = [("created_at", -1)]  # Default: newest first
-        if sort_by == "popularity":
-            sort_field = [("views_count", -1), ("rating", -1)]
-        elif sort_by == "newest":
-            sort_field = [("created_at", -1)]
-        elif sort_by == "price_asc":
-            sort_field = [("price", 1)]
-        elif sort_by == "price_desc":
-            sort_field = [("price", -1)]
-        elif sort_by == "rating":
-            sort_field = [("rating", -1), ("reviews_count", -1)]
+        if search:
+            query["$text"] = {"$search": search}
+        sort_field = with_tiebreaker(SORT_OPTIONS.get(sort_by, SORT_OPTIONS["newest"]))
         
-        products = await db.products.find(query, {"_id": 0}).sort(sort_field).skip(skip).limit(limit).to_list(limit)
+        page_ids = last_key = None
+        if not search and not attr_filters and catalog_snapshot.fresh:
+            # Filter and sort in the columnar snapshot; only the page is read from Mongo
+            after = cursor_values(cursor) if cursor else None
+            if after is not None and len(after) != len(sort_field):
+                raise HTTPException(status_code=400, detail="Cursor does not match sort order")
+            page_ids = catalog_snapshot.listing(
+                sort_field,
+                category_ids=category_ids,
+                seller_id=seller_id,
+                min_price=min_price,
+                max_price=max_price,
+                after=after,
+                offset=0 if cursor_mode else skip,
+                limit=limit,
+            )
+            # Taken from the snapshot, as products deleted or unpublished
+            # meanwhile are missing from the page read below
+            if page_ids is not None and len(page_ids) == limit:
+                last_key = catalog_snapshot.sort_key(page_ids[-1], sort_field)
+        
+        if page_ids is not None:
+            found = await db.products.find(
+                {"id": {"$in": page_ids}, "status": "published"}, projection
+            ).to_list(len(page_ids))
+            by_id = {p["id"]: p for p in found}
+            products = [by_id[pid] for pid in page_ids if pid in by_id]
+        elif cursor_mode:
+            find_query = apply_cursor(query, sort_field, cursor)
+            products = await db.products.find(find_query, projection).sort(sort_field).limit(limit).to_list(limit)
+        else:
+            products = await db.products.find(query, projection).sort(sort_field).skip(skip).limit(limit).to_list(limit)
+        
+        if last_key is not None:
+            next_cursor = encode_cursor({"k": last_key})
+        elif page_ids is None and len(products) == limit:
+            next_cursor = cursor_from_document(products[-1], sort_field)
+    
+    if view == "card" or requested_fields is not None:
+        return _slim_response(products, requested_fields, cursor_mode, next_cursor)
     
-    for prod in products:
-        if isinstance(prod.get("created_at"), str):
-            prod["created_at"] = datetime.fromisoformat(prod["created_at"])
-        if isinstance(prod.get("updated_at"), str):
-            prod["updated_at"] = datetime.fromisoformat(prod["updated_at"])
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if cursor_mode:
+        return ProductPage(items=products, next_cursor=next_cursor)
     return products
 
 
@@ -96,6 +262,10 @@ async def search_suggestions(q: str, limit: int = 5):
     if not q or len(q) < 2:
         return []
     
+    if suggestion_index.ready:
+        return suggestion_index.suggest(q, limit)
+    
+    # Mongo fallback while the suggestion index is building
     query = {
         "$or": [
             {"title": {"$regex": q, "$options": "i"}},
@@ -121,71 +291,112 @@ async def search_suggestions(q: str, limit: int = 5):
     ]
 
 
+@router.get("/search/completions")
+async def search_completions(q: str, limit: int = 5):
+    """Get popular search queries starting with the typed text"""
+    return suggestion_index.complete_query(q, limit)
+
+
+# Popular searches repeat constantly; their stats are cached briefly,
+# keyed by the normalized query text
+_search_stats_cache = TTLCache(maxsize=SEARCH_STATS_CACHE_SIZE, ttl=SEARCH_STATS_CACHE_TTL)
+
+
+async def _compute_search_stats(search: str) -> dict:
+    if search_index.ready:
+        stats = search_index.stats(search)
+    else:
+        # Mongo $text fallback while the search index is loading:
+        # one $facet pass instead of three separate $text matches
+        pipeline = [
+            {"$match": {"$text": {"$search": search}, "status": "published"}},
+            {"$facet": {
+                "total": [{"$count": "count"}],
+                "price_range": [{"$group": {
+                    "_id": None,
+                    "min_price": {"$min": "$price"},
+                    "max_price": {"$max": "$price"},
+                    "avg_price": {"$avg": "$price"}
+                }}],
+                "categories": [
+                    {"$group": {"_id": "$category_id", "count": {"$sum": 1}}},
+                    {"$sort": {"count": -1}},
+                    {"$limit": 10}
+                ]
+            }}
+        ]
+        result = (await db.products.aggregate(pipeline).to_list(1))[0]
+        stats = {
+            "total": result["total"][0]["count"] if result["total"] else 0,
+            "price_range": result["price_range"][0] if result["price_range"] else {},
+            "categories": result["categories"]
+        }
+    
+    # Enrich with category names in one lookup
+    category_ids = [cat["_id"] for cat in stats["categories"] if cat["_id"]]
+    names = {}
+    if category_ids:
+        names = {
+            cat["id"]: cat["name"]
+            for cat in await db.categories.find(
+                {"id": {"$in": category_ids}}, {"_id": 0, "id": 1, "name": 1}
+            ).to_list(len(category_ids))
+        }
+    
+    return {
+        "total": stats["total"],
+        "price_range": stats["price_range"],
+        "categories": [
+            {"id": cat["_id"], "name": names[cat["_id"]], "count": cat["count"]}
+            for cat in stats["categories"]
+            if cat["_id"] in names
+        ]
+    }
+
+
 @router.get("/search/stats")
 async def search_stats(search: str):
     """Get search statistics - total results, price range, available categories"""
     if not search:
         return {"total": 0, "price_range": {}, "categories": []}
     
-    query = {
-        "$text": {"$search": search},
-        "status": "published"
-    }
-    
-    # Get total count
-    total = await db.products.count_documents(query)
-    
-    # Get price range
-    price_pipeline = [
-        {"$match": query},
-        {"$group": {
-            "_id": None,
-            "min_price": {"$min": "$price"},
-            "max_price": {"$max": "$price"},
-            "avg_price": {"$avg": "$price"}
-        }}
-    ]
-    price_result = await db.products.aggregate(price_pipeline).to_list(1)
-    
-    # Get categories distribution
-    category_pipeline = [
-        {"$match": query},
-        {"$group": {"_id": "$category_id", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}},
-        {"$limit": 10}
-    ]
-    category_results = await db.products.aggregate(category_pipeline).to_list(10)
-    
-    # Enrich with category names
-    categories = []
-    for cat in category_results:
-        if cat["_id"]:
-            category = await db.categories.find_one({"id": cat["_id"]}, {"_id": 0, "name": 1})
-            if category:
-                categories.append({
-                    "id": cat["_id"],
-                    "name": category["name"],
-                    "count": cat["count"]
-                })
+    cache_key = " ".join(normalize(search).split())
+    cached = _search_stats_cache.get(cache_key)
+    if cached is not None:
+        return cached
     
-    return {
-        "total": total,
-        "price_range": price_result[0] if price_result else {},
-        "categories": categories
-    }
+    stats = await _compute_search_stats(search)
+    _search_stats_cache[cache_key] = stats
+    return stats
+
+
+@router.get("/facets")
+async def get_attribute_facets(
+    request: Request,
+    category_id: Optional[str] = None,
+    search: Optional[str] = None,
+    seller_id: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+):
+    """
+    Value counts per specification attribute for the same filters as the
+    product listing, including `attr.<name>=<value>`.
+    """
+    category_ids = await category_tree.descendant_ids(db, category_id) if category_id else None
+    query = _listing_query(category_ids, seller_id, min_price, max_price)
+    if search:
+        query["$text"] = {"$search": search}
+    return {"attributes": await attribute_facets(db, query, attribute_filters(request.query_params))}
 
 
 @router.get("/{product_id}", response_model=Product)
 async def get_product(product_id: str):
     """Get a single product by ID"""
-    product = await db.products.find_one({"id": product_id}, {"_id": 0})
+    product = await product_cache.get(product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    if isinstance(product.get("created_at"), str):
-        product["created_at"] = datetime.fromisoformat(product["created_at"])
-    if isinstance(product.get("updated_at"), str):
-        product["updated_at"] = datetime.fromisoformat(product["updated_at"])
-    return Product(**product)
+    return product
 
 
 @router.post("", response_model=Product)
@@ -196,8 +407,7 @@ async def create_product(
     """Create a new product"""
     product_dict = product_data.model_dump()
     if not product_dict.get("slug"):
-        slug_base = re.sub(r'[^a-z0-9]+', '-', product_dict["title"].lower()).strip('-')
-        product_dict["slug"] = f"{slug_base}-{str(uuid.uuid4())[:8]}"
+        product_dict["slug"] = generate_slug(product_dict["title"])
     
     product = Product(
         seller_id=current_user.id,
@@ -205,13 +415,93 @@ async def create_product(
     )
     
     prod_doc = product.model_dump()
-    prod_doc["created_at"] = prod_doc["created_at"].isoformat()
-    prod_doc["updated_at"] = prod_doc["updated_at"].isoformat()
-    
-    await db.products.insert_one(prod_doc)
+    prod_doc["attrs"] = specification_attributes(prod_doc["specifications"])
+    try:
+        await db.products.insert_one(prod_doc)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail=_DUPLICATE_PRODUCT)
+    catalog_sync.product_saved(prod_doc)
     return product
 
 
+@router.post("/import")
+async def import_product_catalog(
+    request: Request,
+    format: Optional[str] = None,
+    seller_id: Optional[str] = None,
+    current_user: User = Depends(get_current_seller)
+):
+    """
+    Bulk create or update products from an NDJSON or CSV upload.
+    Rows are upserted by SKU when present, otherwise by slug.
+    """
+    if seller_id and seller_id != current_user.id and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    if not format:
+        content_type = request.headers.get("content-type", "")
+        format = "csv" if "csv" in content_type else "ndjson"
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'")
+
+    parse = iter_csv if format == "csv" else iter_ndjson
+    return await import_products(db, seller_id or current_user.id, parse(request.stream()))
+
+
+@router.patch("/bulk", response_model=ProductBulkUpdateResult)
+async def bulk_update_products(
+    updates: List[ProductBulkUpdateItem],
+    current_user: User = Depends(get_current_seller)
+):
+    """
+    Apply many price/stock/status changes at once, e.g. from a seller's ERP sync.
+    Unknown ids and products of other sellers are reported and skipped.
+    """
+    if len(updates) > MAX_BULK_UPDATE_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_UPDATE_ITEMS} items per request")
+
+    # Unordered bulk writes may run in any order, so keep the last change per id
+    changes: Dict[str, Dict[str, Any]] = {}
+    for item in updates:
+        fields = item.model_dump(exclude={"id"}, exclude_none=True)
+        if fields:
+            changes.setdefault(item.id, {}).update(fields)
+
+    result = ProductBulkUpdateResult()
+    if not changes:
+        return result
+
+    # Fields the category stats are derived from are read along with the owner
+    previous = {
+        doc["id"]: doc
+        async for doc in db.products.find(
+            {"id": {"$in": list(changes)}},
+            {"_id": 0, "id": 1, "seller_id": 1, "status": 1, "category_id": 1, "price": 1, "stock_level": 1}
+        )
+    }
+    result.not_found = [pid for pid in changes if pid not in previous]
+    forbidden: Set[str] = set()
+    if current_user.role != "admin":
+        forbidden = {pid for pid, doc in previous.items() if doc["seller_id"] != current_user.id}
+        result.forbidden = [pid for pid in previous if pid in forbidden]
+    allowed = [pid for pid in previous if pid not in forbidden]
+    if not allowed:
+        return result
+
+    now = datetime.now(timezone.utc)
+    write = await db.products.bulk_write(
+        [UpdateOne({"id": pid}, {"$set": {**changes[pid], "updated_at": now}}) for pid in allowed],
+        ordered=False
+    )
+    result.matched = write.matched_count
+    result.modified = write.modified_count
+
+    # Price and status feed the search and suggestion indexes
+    async for product in db.products.find({"id": {"$in": allowed}}, {"_id": 0}):
+        catalog_sync.product_saved(product, previous[product["id"]])
+    return result
+
+
 @router.patch("/{product_id}", response_model=Product)
 async def update_product(
     product_id: str,
@@ -227,15 +517,17 @@ async def update_product(
         raise HTTPException(status_code=403, detail="Not authorized")
     
     update_dict = {k: v for k, v in update_data.model_dump(exclude_unset=True).items() if v is not None}
+    if "specifications" in update_dict:
+        update_dict["attrs"] = specification_attributes(update_dict["specifications"])
     if update_dict:
-        update_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
-        await db.products.update_one({"id": product_id}, {"$set": update_dict})
+        update_dict["updated_at"] = datetime.now(timezone.utc)
+        try:
+            await db.products.update_one({"id": product_id}, {"$set": update_dict})
+        except DuplicateKeyError:
+            raise HTTPException(status_code=409, detail=_DUPLICATE_PRODUCT)
     
     updated_product = await db.products.find_one({"id": product_id}, {"_id": 0})
-    if isinstance(updated_product.get("created_at"), str):
-        updated_product["created_at"] = datetime.fromisoformat(updated_product["created_at"])
-    if isinstance(updated_product.get("updated_at"), str):
-        updated_product["updated_at"] = datetime.fromisoformat(updated_product["updated_at"])
+    catalog_sync.product_saved(updated_product, product)
     return Product(**updated_product)
 
 
@@ -253,4 +545,5 @@ async def delete_product(
         raise HTTPException(status_code=403, detail="Not authorized")
     
     await db.products.delete_one({"id": product_id})
+    catalog_sync.product_deleted(product_id, product)
     return {"message": "Product deleted successfully"}
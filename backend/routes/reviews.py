@@ -3,12 +3,12 @@ Review routes
 """
 from fastapi import APIRouter, HTTPException, Depends
 from typing import List
-from datetime import datetime
 
 from database import db
 from models.review import Review, ReviewCreate, ReviewWithProduct
 from models.user import User
 from dependencies import get_current_user, get_current_admin
+import catalog_sync
 
 router = APIRouter(tags=["Reviews"])
 
@@ -17,9 +17,6 @@ router = APIRouter(tags=["Reviews"])
 async def get_product_reviews(product_id: str):
     """Get all reviews for a product"""
     reviews = await db.reviews.find({"product_id": product_id}, {"_id": 0}).to_list(1000)
-    for review in reviews:
-        if isinstance(review.get("created_at"), str):
-            review["created_at"] = datetime.fromisoformat(review["created_at"])
     return reviews
 
 
@@ -67,7 +64,6 @@ async def create_review(
     )
     
     review_doc = review.model_dump()
-    review_doc["created_at"] = review_doc["created_at"].isoformat()
     await db.reviews.insert_one(review_doc)
     
     # Update product rating
@@ -77,6 +73,9 @@ async def create_review(
         {"id": review_data.product_id},
         {"$set": {"rating": round(avg_rating, 1), "reviews_count": len(all_reviews)}}
     )
+    catalog_sync.product_stats_changed(
+        review_data.product_id, rating=round(avg_rating, 1), reviews_count=len(all_reviews)
+    )
     
     return review
 
@@ -131,10 +130,6 @@ async def get_featured_reviews():
         user = await db.users.find_one({"id": review.get("user_id")}, {"_id": 0})
         user_email = user.get("email", "N/A") if user else "N/A"
         
-        created_at = review.get("created_at")
-        if isinstance(created_at, str):
-            created_at = datetime.fromisoformat(created_at)
-        
         enriched_review = ReviewWithProduct(
             id=review["id"],
             product_id=review["product_id"],
@@ -144,7 +139,7 @@ async def get_featured_reviews():
             user_email=user_email,
             rating=review["rating"],
             comment=review["comment"],
-            created_at=created_at
+            created_at=review["created_at"]
         )
         enriched_reviews.append(enriched_review)
     
@@ -165,10 +160,6 @@ async def get_all_reviews_admin(current_user: User = Depends(get_current_admin))
         user = await db.users.find_one({"id": review.get("user_id")}, {"_id": 0})
         user_email = user.get("email", "N/A") if user else "N/A"
         
-        created_at = review.get("created_at")
-        if isinstance(created_at, str):
-            created_at = datetime.fromisoformat(created_at)
-        
         enriched_review = ReviewWithProduct(
             id=review["id"],
             product_id=review["product_id"],
@@ -178,7 +169,7 @@ async def get_all_reviews_admin(current_user: User = Depends(get_current_admin))
             user_email=user_email,
             rating=review["rating"],
             comment=review["comment"],
-            created_at=created_at
+            created_at=review["created_at"]
         )
         enriched_reviews.append(enriched_review)
     
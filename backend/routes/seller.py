@@ -1,13 +1,16 @@
 """
 Seller dashboard routes
 """
-from fastapi import APIRouter, Depends
-from typing import List
-from datetime import datetime
+from fastapi import APIRouter, Depends, Query
+from typing import List, Optional, Union
+from datetime import datetime, timedelta, timezone
 
 from database import db
+from pagination import apply_cursor
+from seller_stats import seller_stats
+from routes.orders import ORDER_SORT, MAX_ORDERS_PAGE, order_query, orders_response
 from models.product import Product
-from models.order import Order
+from models.order import Order, OrderPage
 from models.user import User
 from dependencies import get_current_seller
 
@@ -18,50 +21,42 @@ router = APIRouter(prefix="/seller", tags=["Seller"])
 async def get_seller_products(current_user: User = Depends(get_current_seller)):
     """Get seller's products"""
     products = await db.products.find({"seller_id": current_user.id}, {"_id": 0}).to_list(1000)
-    for prod in products:
-        if isinstance(prod.get("created_at"), str):
-            prod["created_at"] = datetime.fromisoformat(prod["created_at"])
-        if isinstance(prod.get("updated_at"), str):
-            prod["updated_at"] = datetime.fromisoformat(prod["updated_at"])
     return products
 
 
-@router.get("/orders", response_model=List[Order])
-async def get_seller_orders(current_user: User = Depends(get_current_seller)):
-    """Get orders containing seller's products"""
-    orders = await db.orders.find({}, {"_id": 0}).to_list(1000)
-    seller_orders = []
-    
-    for order in orders:
-        if any(item["seller_id"] == current_user.id for item in order.get("items", [])):
-            if isinstance(order.get("created_at"), str):
-                order["created_at"] = datetime.fromisoformat(order["created_at"])
-            if isinstance(order.get("updated_at"), str):
-                order["updated_at"] = datetime.fromisoformat(order["updated_at"])
-            seller_orders.append(order)
-    
-    return seller_orders
+@router.get("/orders", response_model=Union[List[Order], OrderPage])
+async def get_seller_orders(
+    status: Optional[str] = None,
+    payment_status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(MAX_ORDERS_PAGE, ge=1, le=MAX_ORDERS_PAGE),
+    current_user: User = Depends(get_current_seller)
+):
+    """
+    Get orders containing seller's products, newest first.
+    Filters and `cursor` pagination work as in GET /orders.
+    """
+    query = order_query(status, payment_status, None, created_from, created_to, seller_id=current_user.id)
+    orders = await db.orders.find(
+        apply_cursor(query, ORDER_SORT, cursor), {"_id": 0}
+    ).sort(ORDER_SORT).limit(limit).to_list(limit)
+    return orders_response(orders, cursor, limit)
 
 
 @router.get("/stats")
 async def get_seller_stats(current_user: User = Depends(get_current_seller)):
-    """Get seller statistics"""
-    products = await db.products.find({"seller_id": current_user.id}).to_list(1000)
-    orders = await db.orders.find({}).to_list(1000)
-    
-    total_products = len(products)
-    total_revenue = 0.0
-    total_orders = 0
-    
-    for order in orders:
-        if order.get("payment_status") == "paid":
-            for item in order.get("items", []):
-                if item["seller_id"] == current_user.id:
-                    total_revenue += item["price"] * item["quantity"]
-                    total_orders += 1
-    
-    return {
-        "total_products": total_products,
-        "total_revenue": total_revenue,
-        "total_orders": total_orders
-    }
+    """Get seller statistics from the materialized seller_stats document"""
+    return await seller_stats.get(db, current_user.id)
+
+
+@router.get("/stats/daily")
+async def get_seller_daily_stats(
+    days: int = Query(30, ge=1, le=366),
+    current_user: User = Depends(get_current_seller)
+):
+    """Get seller's paid revenue per day (UTC) for the last `days` days, oldest first"""
+    today = datetime.now(timezone.utc).date()
+    dates = [(today - timedelta(days=offset)).isoformat() for offset in range(days - 1, -1, -1)]
+    return await seller_stats.get_daily(db, current_user.id, dates)
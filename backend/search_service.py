@@ -0,0 +1,442 @@
+"""
+Product Search Service
+In-process inverted index over product text with BM25 ranking
+
+Replaces the MongoDB $text index for storefront search. Documents are
+analyzed with a Cyrillic-aware analyzer (Ukrainian/Russian/English light
+stemming), so "ноутбуки" finds "ноутбук" and "комп'ютерів" finds
+"комп'ютер". Field weights match setup_search_index.py:
+title 10, short_description 7, description 5.
+
+The index is kept up to date by the product routes and periodically
+snapshotted to disk, so a restart only needs to catch up on changes.
+"""
+import asyncio
+import gzip
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import unicodedata
+from datetime import datetime
+from typing import Any, Collection, Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from config import SEARCH_INDEX_PATH, SEARCH_SNAPSHOT_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+FIELD_WEIGHTS = {
+    "title": 10,
+    "short_description": 7,
+    "description": 5,
+}
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Snapshots hold analyzed terms; bump when the analyzer changes
+SNAPSHOT_VERSION = 2
+
+# Product fields kept next to the postings for filtering and sorting
+META_FIELDS = (
+    "status", "category_id", "seller_id", "price", "rating", "reviews_count", "views_count", "trending_rank",
+)
+
+
+# ============= ANALYZER =============
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_APOSTROPHES_RE = re.compile(r"(?<=\w)['’ʼ`](?=\w)")
+
+STOP_WORDS = frozenset(
+    # English
+    "a an and are as at be by for from in is it of on or the to with"
+    # Russian
+    " а в во да для до же за и из или к как на не но о об от по под при с со то у что это"
+    # Ukrainian
+    " є з зі й та також ти ці цей що як які".split()
+)
+
+# Longest suffixes first so the greediest ending is stripped
+_CYRILLIC_SUFFIXES = sorted({
+    # Russian adjective / participle endings
+    "ее", "ие", "ые", "ое", "ими", "ыми", "ей", "ий", "ый", "ой", "ем", "им", "ым", "ом",
+    "его", "ого", "ему", "ому", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею",
+    # Russian noun endings
+    "а", "ев", "ов", "ие", "ье", "е", "иями", "ями", "ами", "еи", "ии", "и", "ией",
+    "ий", "й", "иям", "ям", "ием", "ам", "о", "у", "ах", "иях", "ях", "ы", "ь",
+    "ию", "ью", "ю", "ия", "ья", "я",
+    # Ukrainian endings
+    "ів", "їв", "ові", "еві", "ам", "ям", "ах", "ях", "ою", "ею", "єю", "ій", "ого",
+    "ому", "ими", "іми", "их", "іх", "ї", "і", "є",
+}, key=len, reverse=True)
+
+# "es" is a plural ending only after these (glasses, boxes, watches);
+# elsewhere the "e" belongs to the stem and only the "s" goes (cases, phones)
+_LATIN_ES_STEMS = ("ss", "x", "z", "ch", "sh")
+
+
+def normalize(text: str) -> str:
+    """Lowercase and fold characters that should not affect matching"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = text.replace("ё", "е").replace("ґ", "г")
+    return _APOSTROPHES_RE.sub("", text)
+
+
+def stem(token: str) -> str:
+    """Light suffix-stripping stemmer for Cyrillic and Latin tokens"""
+    if token.isdigit() or len(token) <= 3:
+        return token
+    if "а" <= token[-1] <= "я" or token[-1] in "іїє":
+        for suffix in _CYRILLIC_SUFFIXES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+                return token[:-len(suffix)]
+        return token
+    if token.endswith("ies") and len(token) >= 6:
+        return token[:-3] + "y"
+    if token.endswith("es") and token[:-2].endswith(_LATIN_ES_STEMS) and len(token) >= 5:
+        return token[:-2]
+    if token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Split normalized text into tokens, dropping stop words"""
+    return [t for t in _TOKEN_RE.findall(normalize(text)) if t not in STOP_WORDS and t != "_"]
+
+
+def analyze(text: Optional[str]) -> List[str]:
+    """Full analysis chain: normalize, tokenize, stem"""
+    if not text:
+        return []
+    return [stem(t) for t in tokenize(text)]
+
+
+def _timestamp(value: Any) -> float:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            return 0.0
+    return 0.0
+
+
+# ============= INDEX =============
+
+class SearchIndex:
+    """Inverted index with BM25 scoring over weighted product fields"""
+
+    def __init__(self, snapshot_path: str = SEARCH_INDEX_PATH):
+        self.snapshot_path = snapshot_path
+        self.ready = False
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._total_length = 0.0
+        self._dirty = False
+        self._snapshot_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    # ---- incremental maintenance ----
+
+    def index_product(self, product: Dict[str, Any]) -> None:
+        """Add or replace a product in the index"""
+        product_id = product.get("id")
+        if not product_id:
+            return
+        self.remove_product(product_id)
+
+        terms: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in analyze(product.get(field)):
+                terms[term] = terms.get(term, 0.0) + weight
+
+        meta = {field: product.get(field) for field in META_FIELDS}
+        meta["created_ts"] = _timestamp(product.get("created_at"))
+        meta["updated_at"] = str(product.get("updated_at") or "")
+        self._add(product_id, terms, meta)
+
+    def remove_product(self, product_id: str) -> None:
+        """Drop a product from the index if present"""
+        doc = self._docs.pop(product_id, None)
+        if doc is None:
+            return
+        for term in doc["terms"]:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(product_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= doc["length"]
+        self._dirty = True
+
+    def update_meta(self, product_id: str, **fields: Any) -> None:
+        """Refresh sort/filter attributes (rating, views...) without re-analyzing text"""
+        doc = self._docs.get(product_id)
+        if doc is None:
+            return
+        meta = {**doc["meta"], **{k: v for k, v in fields.items() if k in META_FIELDS}}
+        self._docs[product_id] = {**doc, "meta": meta}
+        self._dirty = True
+
+    def _add(self, product_id: str, terms: Dict[str, float], meta: Dict[str, Any]) -> None:
+        length = sum(terms.values())
+        self._docs[product_id] = {"terms": terms, "length": length, "meta": meta}
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[product_id] = tf
+        self._total_length += length
+        self._dirty = True
+
+    # ---- querying ----
+
+    def _matches_filters(
+        self,
+        meta: Dict[str, Any],
+        status: Optional[str],
+        category_ids: Optional[Collection[str]],
+        seller_id: Optional[str],
+        min_price: Optional[float],
+        max_price: Optional[float],
+    ) -> bool:
+        if status and meta.get("status") != status:
+            return False
+        if category_ids and meta.get("category_id") not in category_ids:
+            return False
+        if seller_id and meta.get("seller_id") != seller_id:
+            return False
+        price = meta.get("price") or 0
+        if min_price is not None and price < min_price:
+            return False
+        if max_price is not None and price > max_price:
+            return False
+        return True
+
+    def match(
+        self,
+        text: str,
+        status: Optional[str] = "published",
+        category_ids: Optional[Collection[str]] = None,
+        seller_id: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+    ) -> Dict[str, float]:
+        """Return BM25 scores for every product matching any query term"""
+        n_docs = len(self._docs)
+        if not n_docs:
+            return {}
+        avgdl = self._total_length / n_docs or 1.0
+
+        scores: Dict[str, float] = {}
+        for term in set(analyze(text)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for product_id, tf in postings.items():
+                dl = self._docs[product_id]["length"]
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * dl / avgdl)
+                scores[product_id] = scores.get(product_id, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+
+        return {
+            product_id: score
+            for product_id, score in scores.items()
+            if self._matches_filters(
+                self._docs[product_id]["meta"], status, category_ids, seller_id, min_price, max_price
+            )
+        }
+
+    def search(
+        self,
+        text: str,
+        sort_by: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 50,
+        **filters: Any,
+    ) -> List[str]:
+        """Return one page of matching product ids in the requested order"""
+        scores = self.match(text, **filters)
+        if not scores:
+            return []
+
+        def sort_key(product_id: str):
+            meta = self._docs[product_id]["meta"]
+            score = scores[product_id]
+            if sort_by == "newest":
+                return (meta["created_ts"], score)
+            if sort_by == "price_asc":
+                return (-(meta.get("price") or 0), score)
+            if sort_by == "price_desc":
+                return (meta.get("price") or 0, score)
+            if sort_by == "rating":
+                return (meta.get("rating") or 0, meta.get("reviews_count") or 0, score)
+            if sort_by == "popularity":
+                return (meta.get("views_count") or 0, meta.get("rating") or 0, score)
+            if sort_by == "trending":
+                return (meta.get("trending_rank") or 0, meta.get("views_count") or 0, score)
+            return (score,)
+
+        top = heapq.nlargest(offset + limit, scores, key=lambda pid: (sort_key(pid), pid))
+        return top[offset:offset + limit]
+
+    def stats(self, text: str, top_categories: int = 10) -> Dict[str, Any]:
+        """Aggregate count, price range and category distribution for a query"""
+        scores = self.match(text)
+        if not scores:
+            return {"total": 0, "price_range": {}, "categories": []}
+
+        prices = []
+        categories: Dict[str, int] = {}
+        for product_id in scores:
+            meta = self._docs[product_id]["meta"]
+            if meta.get("price") is not None:
+                prices.append(meta["price"])
+            if meta.get("category_id"):
+                categories[meta["category_id"]] = categories.get(meta["category_id"], 0) + 1
+
+        price_range = {}
+        if prices:
+            price_range = {
+                "_id": None,
+                "min_price": min(prices),
+                "max_price": max(prices),
+                "avg_price": sum(prices) / len(prices),
+            }
+        top = heapq.nlargest(top_categories, categories.items(), key=lambda item: item[1])
+        return {
+            "total": len(scores),
+            "price_range": price_range,
+            "categories": [{"_id": cat_id, "count": count} for cat_id, count in top],
+        }
+
+    # ---- building & persistence ----
+
+    async def build(self, db: AsyncIOMotorDatabase) -> None:
+        """Rebuild the whole index from the products collection"""
+        self._docs = {}
+        self._postings = {}
+        self._total_length = 0.0
+        projection = {"_id": 0, "id": 1, "created_at": 1, "updated_at": 1, **{f: 1 for f in FIELD_WEIGHTS}}
+        projection.update({f: 1 for f in META_FIELDS})
+
+        count = 0
+        async for product in db.products.find({}, projection):
+            self.index_product(product)
+            count += 1
+            if count % 1000 == 0:
+                await asyncio.sleep(0)
+        self.ready = True
+        logger.info(f"Search index built with {count} products")
+
+    async def catch_up(self, db: AsyncIOMotorDatabase) -> int:
+        """Re-index products changed or deleted since the snapshot was taken"""
+        seen = set()
+        stale = []
+        async for product in db.products.find({}, {"_id": 0, "id": 1, "updated_at": 1}):
+            product_id = product.get("id")
+            seen.add(product_id)
+            doc = self._docs.get(product_id)
+            if doc is None or doc["meta"].get("updated_at") != str(product.get("updated_at") or ""):
+                stale.append(product_id)
+
+        for product_id in [pid for pid in self._docs if pid not in seen]:
+            self.remove_product(product_id)
+
+        for i in range(0, len(stale), 500):
+            batch = stale[i:i + 500]
+            async for product in db.products.find({"id": {"$in": batch}}, {"_id": 0}):
+                self.index_product(product)
+        return len(stale)
+
+    async def load_or_build(self, db: AsyncIOMotorDatabase) -> None:
+        """Load the on-disk snapshot and catch up, or rebuild from scratch"""
+        try:
+            if await asyncio.to_thread(self._load_snapshot):
+                changed = await self.catch_up(db)
+                self.ready = True
+                logger.info(f"Search index loaded from snapshot ({len(self)} products, {changed} refreshed)")
+                return
+        except Exception as e:
+            logger.warning(f"Search index snapshot unusable, rebuilding: {str(e)}")
+        await self.build(db)
+        await self.save_snapshot()
+
+    def _load_snapshot(self) -> bool:
+        if not os.path.exists(self.snapshot_path):
+            return False
+        with gzip.open(self.snapshot_path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != SNAPSHOT_VERSION:
+            return False
+
+        self._docs = {}
+        self._postings = {}
+        self._total_length = 0.0
+        for product_id, doc in data["docs"].items():
+            self._add(product_id, doc["terms"], doc["meta"])
+        self._dirty = False
+        return True
+
+    def _write_snapshot(self, docs: Dict[str, Dict[str, Any]]) -> None:
+        os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+        tmp_path = f"{self.snapshot_path}.tmp"
+        payload = {
+            "version": SNAPSHOT_VERSION,
+            "docs": {pid: {"terms": doc["terms"], "meta": doc["meta"]} for pid, doc in docs.items()},
+        }
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.snapshot_path)
+
+    async def save_snapshot(self) -> None:
+        """Persist the index to disk without blocking the event loop"""
+        if not self.ready:
+            return
+        # Documents are replaced, never mutated, so a shallow copy is a
+        # consistent view for the writer thread
+        docs = dict(self._docs)
+        self._dirty = False
+        try:
+            await asyncio.to_thread(self._write_snapshot, docs)
+        except Exception as e:
+            self._dirty = True
+            logger.error(f"Failed to write search index snapshot: {str(e)}")
+
+    async def _run(self, db: AsyncIOMotorDatabase) -> None:
+        try:
+            await self.load_or_build(db)
+        except Exception as e:
+            logger.error(f"Search index failed to load, using Mongo text search: {str(e)}")
+            return
+        while True:
+            await asyncio.sleep(SEARCH_SNAPSHOT_INTERVAL)
+            if self._dirty:
+                await self.save_snapshot()
+
+    def start(self, db: AsyncIOMotorDatabase) -> None:
+        """
+        Load the index in the background and snapshot it periodically.
+        Searches fall back to Mongo until `ready` is set.
+        """
+        self._snapshot_task = asyncio.create_task(self._run(db))
+
+    async def stop(self) -> None:
+        """Stop snapshotting and write a final snapshot"""
+        if self._snapshot_task:
+            self._snapshot_task.cancel()
+            self._snapshot_task = None
+        if self._dirty:
+            await self.save_snapshot()
+
+
+# Global instance
+search_index = SearchIndex()
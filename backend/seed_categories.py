@@ -155,7 +155,7 @@ async def seed_categories():
             "slug": category_data["slug"],
             "parent_id": None,
             "image_url": None,
-            "created_at": datetime.now(timezone.utc).isoformat()
+            "created_at": datetime.now(timezone.utc)
         }
         
         await db.categories.insert_one(main_category)
@@ -170,7 +170,7 @@ async def seed_categories():
                 "slug": subcat["slug"],
                 "parent_id": main_category["id"],
                 "image_url": None,
-                "created_at": datetime.now(timezone.utc).isoformat()
+                "created_at": datetime.now(timezone.utc)
             }
             
             await db.categories.insert_one(subcategory)
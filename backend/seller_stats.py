@@ -0,0 +1,282 @@
+"""
+Seller Stats
+Materialized dashboard totals per seller
+
+The `seller_stats` collection holds one document per seller:
+
+    {"id": <seller_id>, "product_count", "order_count", "line_count", "revenue"}
+
+and `seller_stats_daily` one document per seller and day with the order
+count, line count and revenue of paid orders created that day (UTC).
+
+Product creates and deletes are reported through catalog_sync, orders when
+their payment_status becomes "paid". The deltas are buffered and flushed as
+one bulk_write of $inc upserts; deltas that could not be written go back to
+the buffer. A daily reconcile recomputes everything from `products` and
+`orders`, logs how many sellers had drifted and replaces the documents, which
+also absorbs writes made by other processes or scripts. The time of the last
+reconcile is stored in `seller_stats_meta`, so restarts don't postpone it.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import DeleteMany, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from config import SELLER_STATS_FLUSH_INTERVAL, SELLER_STATS_RECONCILE_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ("product_count", "order_count", "line_count", "revenue")
+
+Deltas = Dict[Hashable, Dict[str, float]]
+
+
+def _day(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d")
+    return str(value or "")[:10]
+
+
+def _order_lines(order: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """Line count and revenue per seller of one order"""
+    sellers: Dict[str, Dict[str, float]] = {}
+    for item in order.get("items", []):
+        data = item if isinstance(item, dict) else item.model_dump()
+        if not data.get("seller_id"):
+            continue
+        totals = sellers.setdefault(data["seller_id"], {"line_count": 0, "revenue": 0.0})
+        totals["line_count"] += 1
+        totals["revenue"] += data.get("price", 0) * data.get("quantity", 0)
+    return sellers
+
+
+def _add(target: Deltas, key: Hashable, fields: Dict[str, float]) -> None:
+    counters = target.setdefault(key, {})
+    for field, value in fields.items():
+        counters[field] = counters.get(field, 0) + value
+
+
+def _utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def format_stats(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Dashboard representation"""
+    return {
+        "total_products": doc.get("product_count", 0),
+        "total_revenue": round(doc.get("revenue", 0.0), 2),
+        # Paid order lines, as the dashboard has always counted them
+        "total_orders": doc.get("line_count", 0),
+        "total_paid_orders": doc.get("order_count", 0),
+    }
+
+
+class SellerStats:
+    """Buffers product and order changes and maintains the seller_stats collections"""
+
+    def __init__(self):
+        # Pending $inc deltas per seller and per (seller, day)
+        self._totals: Deltas = {}
+        self._daily: Deltas = {}
+        self._db: Optional[AsyncIOMotorDatabase] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._next_reconcile: Optional[datetime] = None
+
+    def record_product(self, previous: Optional[Dict[str, Any]], current: Optional[Dict[str, Any]]) -> None:
+        """Queue the change from `previous` to `current` (None = absent)"""
+        old = previous.get("seller_id") if previous else None
+        new = current.get("seller_id") if current else None
+        if old == new:
+            return
+        for seller_id, delta in ((old, -1), (new, 1)):
+            if seller_id:
+                _add(self._totals, seller_id, {"product_count": delta})
+
+    def record_paid_order(self, order: Dict[str, Any]) -> None:
+        """Queue an order whose payment_status just became "paid"; count it once"""
+        day = _day(order.get("created_at"))
+        for seller_id, lines in _order_lines(order).items():
+            fields = {"order_count": 1, "line_count": lines["line_count"], "revenue": lines["revenue"]}
+            _add(self._totals, seller_id, fields)
+            _add(self._daily, (seller_id, day), fields)
+
+    async def _write(self, collection: str, buffer: Deltas, pending: Deltas, operation) -> int:
+        """bulk_write one $inc upsert per pending entry; failed entries go back to `buffer`"""
+        keys = [key for key, fields in pending.items() if any(fields.values())]
+        if not keys:
+            return 0
+        failed = keys
+        try:
+            await self._db[collection].bulk_write([operation(key, pending[key]) for key in keys], ordered=False)
+            failed = []
+        except BulkWriteError as e:
+            failed = [keys[error["index"]] for error in e.details.get("writeErrors", [])]
+            logger.error(f"Failed to update {len(failed)} {collection} documents, retrying: {str(e)}")
+        except Exception as e:
+            logger.error(f"Failed to update {collection}, retrying: {str(e)}")
+        for key in failed:
+            _add(buffer, key, pending[key])
+        return len(keys) - len(failed)
+
+    async def flush(self) -> int:
+        """Apply buffered changes; returns the number of documents touched"""
+        if self._db is None:
+            return 0
+        async with self._lock:
+            totals, self._totals = self._totals, {}
+            daily, self._daily = self._daily, {}
+            now = datetime.now(timezone.utc)
+            touched = await self._write("seller_stats", self._totals, totals, lambda seller_id, fields: UpdateOne(
+                {"id": seller_id}, {"$inc": fields, "$set": {"updated_at": now}}, upsert=True
+            ))
+            touched += await self._write("seller_stats_daily", self._daily, daily, lambda key, fields: UpdateOne(
+                {"id": f"{key[0]}:{key[1]}"},
+                {"$inc": fields, "$setOnInsert": {"seller_id": key[0], "day": key[1]}},
+                upsert=True
+            ))
+            return touched
+
+    async def reconcile(self, db: AsyncIOMotorDatabase) -> int:
+        """Recompute all stats from products and paid orders; returns the number of drifted sellers"""
+        async with self._lock:
+            # Changes queued so far are contained in the aggregations below
+            totals, self._totals = self._totals, {}
+            daily, self._daily = self._daily, {}
+            try:
+                drifted = await self._reconcile(db)
+            except Exception:
+                for buffer, pending in ((self._totals, totals), (self._daily, daily)):
+                    for key, fields in pending.items():
+                        _add(buffer, key, fields)
+                raise
+            now = datetime.now(timezone.utc)
+            await db.seller_stats_meta.update_one(
+                {"id": "reconcile"}, {"$set": {"reconciled_at": now}}, upsert=True
+            )
+            self._next_reconcile = now + timedelta(seconds=SELLER_STATS_RECONCILE_INTERVAL)
+        if drifted:
+            logger.warning(f"Seller stats reconciled, {drifted} sellers had drifted")
+        return drifted
+
+    async def _reconcile_due(self, db: AsyncIOMotorDatabase) -> bool:
+        """Whether the last reconcile by any process is an interval ago (or never happened)"""
+        now = datetime.now(timezone.utc)
+        if self._next_reconcile and now < self._next_reconcile:
+            return False
+        meta = await db.seller_stats_meta.find_one({"id": "reconcile"}, {"_id": 0})
+        if not meta or not meta.get("reconciled_at"):
+            return True
+        self._next_reconcile = _utc(meta["reconciled_at"]) + timedelta(seconds=SELLER_STATS_RECONCILE_INTERVAL)
+        return now >= self._next_reconcile
+
+    async def _reconcile(self, db: AsyncIOMotorDatabase) -> int:
+        totals: Dict[str, Dict[str, Any]] = {}
+        async for row in db.products.aggregate([
+            {"$match": {"seller_id": {"$ne": None}}},
+            {"$group": {"_id": "$seller_id", "count": {"$sum": 1}}},
+        ]):
+            totals.setdefault(row["_id"], dict.fromkeys(COUNTERS, 0))["product_count"] = row["count"]
+
+        daily: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        async for row in db.orders.aggregate([
+            {"$match": {"payment_status": "paid"}},
+            {"$unwind": "$items"},
+            {"$group": {
+                "_id": {
+                    "seller_id": "$items.seller_id",
+                    "order_id": "$id",
+                    # Legacy orders store created_at as an ISO string; $toString
+                    # renders dates as ISO strings in UTC, so both start with the day
+                    "day": {"$substrCP": [{"$toString": "$created_at"}, 0, 10]},
+                },
+                "line_count": {"$sum": 1},
+                "revenue": {"$sum": {"$multiply": ["$items.price", "$items.quantity"]}},
+            }},
+        ]):
+            key = row["_id"]
+            if not key.get("seller_id"):
+                continue
+            for fields in (
+                totals.setdefault(key["seller_id"], dict.fromkeys(COUNTERS, 0)),
+                daily.setdefault((key["seller_id"], key["day"]), {"order_count": 0, "line_count": 0, "revenue": 0.0}),
+            ):
+                fields["order_count"] += 1
+                fields["line_count"] += row["line_count"]
+                fields["revenue"] += row["revenue"]
+
+        existing = {doc["id"]: doc async for doc in db.seller_stats.find({}, {"_id": 0})}
+        drifted = sum(
+            1 for seller_id in set(existing) | set(totals)
+            if any(
+                round(existing.get(seller_id, {}).get(field, 0), 2) != round(totals.get(seller_id, {}).get(field, 0), 2)
+                for field in COUNTERS
+            )
+        )
+
+        now = datetime.now(timezone.utc)
+        operations = [ReplaceOne({"id": seller_id}, {"id": seller_id, **fields, "updated_at": now}, upsert=True)
+                      for seller_id, fields in totals.items()]
+        operations.append(DeleteMany({"id": {"$nin": list(totals)}}))
+        await db.seller_stats.bulk_write(operations, ordered=False)
+
+        day_ids = [f"{seller_id}:{day}" for seller_id, day in daily]
+        operations = [
+            ReplaceOne({"id": f"{seller_id}:{day}"}, {"id": f"{seller_id}:{day}", "seller_id": seller_id, "day": day, **fields}, upsert=True)
+            for (seller_id, day), fields in daily.items()
+        ]
+        operations.append(DeleteMany({"id": {"$nin": day_ids}}))
+        await db.seller_stats_daily.bulk_write(operations, ordered=False)
+        return drifted
+
+    async def get(self, db: AsyncIOMotorDatabase, seller_id: str) -> Dict[str, Any]:
+        doc = await db.seller_stats.find_one({"id": seller_id}, {"_id": 0})
+        return format_stats(doc or {})
+
+    async def get_daily(
+        self, db: AsyncIOMotorDatabase, seller_id: str, days: Iterable[str]
+    ) -> List[Dict[str, Any]]:
+        """Revenue buckets for the given days (YYYY-MM-DD), zero-filled"""
+        days = list(days)
+        found = {
+            doc["day"]: doc
+            async for doc in db.seller_stats_daily.find(
+                {"seller_id": seller_id, "day": {"$gte": min(days), "$lte": max(days)}}, {"_id": 0}
+            )
+        } if days else {}
+        return [{
+            "date": day,
+            "revenue": round(found.get(day, {}).get("revenue", 0.0), 2),
+            "orders": found.get(day, {}).get("order_count", 0),
+            "lines": found.get(day, {}).get("line_count", 0),
+        } for day in days]
+
+    async def _run(self, db: AsyncIOMotorDatabase) -> None:
+        while True:
+            try:
+                if await self._reconcile_due(db):
+                    await self.reconcile(db)
+                else:
+                    await asyncio.shield(self.flush())
+            except Exception as e:
+                logger.error(f"Seller stats update failed: {str(e)}")
+            await asyncio.sleep(SELLER_STATS_FLUSH_INTERVAL)
+
+    def start(self, db: AsyncIOMotorDatabase) -> None:
+        """Flush changes periodically and reconcile once a day"""
+        self._db = db
+        self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+
+# Global instance
+seller_stats = SellerStats()
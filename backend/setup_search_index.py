@@ -1,10 +1,16 @@
 """
 Setup MongoDB text search indexes for products
+
+Storefront search is served by the in-process index in search_service.py;
+the $text index created here is only used as a fallback while that index
+is loading. Index definitions live in db_indexes.py.
 """
 import asyncio
 import os
 from motor.motor_asyncio import AsyncIOMotorClient
 
+from db_indexes import ensure_indexes
+
 async def setup_search_indexes():
     """Create text search indexes for products collection"""
     mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
@@ -23,38 +29,14 @@ async def setup_search_indexes():
     except:
         print("ℹ️  No existing text index to drop")
     
-    # Create text index on title (weight 10) and description (weight 5)
-    # Higher weight = more relevance in search results
-    await db.products.create_index([
-        ("title", "text"),
-        ("description", "text"),
-        ("short_description", "text")
-    ], weights={
-        "title": 10,
-        "description": 5,
-        "short_description": 7
-    }, name="product_text_search")
-    
-    print("✅ Created text search index with weights:")
-    print("   - title: 10 (highest relevance)")
-    print("   - short_description: 7")
-    print("   - description: 5")
-    
-    # Create additional indexes for filtering
-    await db.products.create_index([("category_id", 1)])
-    print("✅ Created category_id index")
-    
-    await db.products.create_index([("price", 1)])
-    print("✅ Created price index")
-    
-    await db.products.create_index([("rating", -1)])
-    print("✅ Created rating index")
-    
-    await db.products.create_index([("created_at", -1)])
-    print("✅ Created created_at index")
-    
-    await db.products.create_index([("views_count", -1)])
-    print("✅ Created views_count index")
+    # Text index and listing indexes come from the shared registry
+    report = await ensure_indexes(db, ["products"])
+    for name in report["products"]["created"]:
+        print(f"✅ Created {name}")
+    for name, error in report["products"]["failed"].items():
+        print(f"❌ Failed {name}: {error}")
+    for name in report["products"]["extra"]:
+        print(f"⚠️  Undeclared index {name}")
     
     # List all indexes
     indexes = await db.products.list_indexes().to_list(100)
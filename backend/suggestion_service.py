@@ -0,0 +1,237 @@
+"""
+Search Suggestion Service
+Prefix index for search-as-you-type suggestions
+
+Holds a sorted array of normalized title tokens with a posting set per
+token, plus a small card (title, price, first image) per published product,
+so suggestions are answered without touching MongoDB. Results are ranked
+by popularity (views_count, then rating) like the `popularity` listing sort.
+Top-k results for single-token prefixes are cached and invalidated per
+token when products change.
+
+Popular search queries are counted as they are issued and completed from
+a second sorted array.
+"""
+import asyncio
+import heapq
+import logging
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from search_service import normalize, tokenize
+
+logger = logging.getLogger(__name__)
+
+MAX_SUGGESTIONS = 20
+PREFIX_CACHE_SIZE = 50000
+MAX_TRACKED_QUERIES = 20000
+MIN_PREFIX_LENGTH = 2
+
+
+def _prefix_end(prefix: str) -> str:
+    """Smallest string greater than every string starting with `prefix`"""
+    return prefix + "\U0010ffff"
+
+
+class SuggestionIndex:
+    """Sorted prefix array over product title tokens and popular queries"""
+
+    def __init__(self):
+        self.ready = False
+        self._terms: List[str] = []
+        self._postings: Dict[str, Set[str]] = {}
+        self._products: Dict[str, Dict[str, Any]] = {}
+        self._prefix_cache: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._queries: Dict[str, int] = {}
+        self._query_keys: List[str] = []
+        self._task: Optional[asyncio.Task] = None
+
+    # ---- incremental maintenance ----
+
+    def index_product(self, product: Dict[str, Any]) -> None:
+        """Add or replace a product; unpublished products are removed"""
+        product_id = product.get("id")
+        if not product_id:
+            return
+        self.remove_product(product_id)
+        if product.get("status", "published") != "published" or not product.get("title"):
+            return
+
+        tokens = set(tokenize(product["title"]))
+        images = product.get("images") or []
+        self._products[product_id] = {
+            "title": product["title"],
+            "price": product.get("price"),
+            "image": images[0] if images else None,
+            "rank": (product.get("views_count") or 0, product.get("rating") or 0),
+            "tokens": tokens,
+        }
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = set()
+                if self.ready:
+                    # While building, the term array is sorted once at the end
+                    insort(self._terms, token)
+            postings.add(product_id)
+            self._invalidate(token)
+
+    def remove_product(self, product_id: str) -> None:
+        """Drop a product if present"""
+        card = self._products.pop(product_id, None)
+        if card is None:
+            return
+        for token in card["tokens"]:
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.discard(product_id)
+            if not postings:
+                del self._postings[token]
+                i = bisect_left(self._terms, token)
+                if i < len(self._terms) and self._terms[i] == token:
+                    del self._terms[i]
+            self._invalidate(token)
+
+    def update_rank(self, product_id: str, views_count: Optional[int] = None, rating: Optional[float] = None) -> None:
+        """Refresh the popularity rank of a product"""
+        card = self._products.get(product_id)
+        if card is None:
+            return
+        views, current_rating = card["rank"]
+        card["rank"] = (
+            views if views_count is None else views_count,
+            current_rating if rating is None else rating,
+        )
+        for token in card["tokens"]:
+            self._invalidate(token)
+
+    def _invalidate(self, token: str) -> None:
+        for end in range(MIN_PREFIX_LENGTH, len(token) + 1):
+            self._prefix_cache.pop(token[:end], None)
+
+    # ---- querying ----
+
+    def _terms_with_prefix(self, prefix: str) -> List[str]:
+        lo = bisect_left(self._terms, prefix)
+        hi = bisect_left(self._terms, _prefix_end(prefix), lo)
+        return self._terms[lo:hi]
+
+    def _top_for_prefix(self, prefix: str) -> List[str]:
+        cached = self._prefix_cache.get(prefix)
+        if cached is not None:
+            self._prefix_cache.move_to_end(prefix)
+            return cached
+
+        candidates: Set[str] = set()
+        for term in self._terms_with_prefix(prefix):
+            candidates |= self._postings[term]
+        top = heapq.nlargest(MAX_SUGGESTIONS, candidates, key=lambda pid: (self._products[pid]["rank"], pid))
+
+        self._prefix_cache[prefix] = top
+        if len(self._prefix_cache) > PREFIX_CACHE_SIZE:
+            self._prefix_cache.popitem(last=False)
+        return top
+
+    def suggest(self, text: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Return up to `limit` product suggestions. Every complete word must
+        appear in the title and the last word is matched as a prefix.
+        """
+        tokens = tokenize(text)
+        if not tokens or len(tokens[-1]) < MIN_PREFIX_LENGTH and len(tokens) == 1:
+            return []
+        *words, prefix = tokens
+
+        if not words:
+            ids = self._top_for_prefix(prefix)[:limit]
+        else:
+            postings = sorted((self._postings.get(w, set()) for w in words), key=len)
+            required = set.intersection(*postings) if postings else set()
+            candidates = [
+                pid for pid in required
+                if any(t.startswith(prefix) for t in self._products[pid]["tokens"])
+            ]
+            ids = heapq.nlargest(limit, candidates, key=lambda pid: (self._products[pid]["rank"], pid))
+
+        return [
+            {
+                "title": self._products[pid]["title"],
+                "id": pid,
+                "price": self._products[pid]["price"],
+                "image": self._products[pid]["image"],
+            }
+            for pid in ids
+        ]
+
+    # ---- popular queries ----
+
+    def record_query(self, text: str) -> None:
+        """Count a search query issued by a shopper"""
+        key = " ".join(normalize(text).split())
+        if len(key) < MIN_PREFIX_LENGTH:
+            return
+        if key not in self._queries:
+            if len(self._queries) >= MAX_TRACKED_QUERIES:
+                self._prune_queries()
+            insort(self._query_keys, key)
+            self._queries[key] = 0
+        self._queries[key] += 1
+
+    def _prune_queries(self) -> None:
+        # Keep the most frequent half; rare long-tail queries are forgotten
+        keep = heapq.nlargest(MAX_TRACKED_QUERIES // 2, self._queries.items(), key=lambda item: item[1])
+        self._queries = dict(keep)
+        self._query_keys = sorted(self._queries)
+
+    def complete_query(self, text: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Return the most frequent past queries starting with `text`"""
+        prefix = " ".join(normalize(text).split())
+        if len(prefix) < MIN_PREFIX_LENGTH:
+            return []
+        lo = bisect_left(self._query_keys, prefix)
+        hi = bisect_left(self._query_keys, _prefix_end(prefix), lo)
+        top: List[Tuple[str, int]] = heapq.nlargest(
+            limit, ((q, self._queries[q]) for q in self._query_keys[lo:hi]), key=lambda item: item[1]
+        )
+        return [{"query": q, "count": count} for q, count in top]
+
+    # ---- building ----
+
+    async def build(self, db: AsyncIOMotorDatabase) -> None:
+        """Build the index from published products"""
+        projection = {
+            "_id": 0, "id": 1, "title": 1, "price": 1, "status": 1,
+            "views_count": 1, "rating": 1, "images": {"$slice": 1},
+        }
+        count = 0
+        async for product in db.products.find({"status": "published"}, projection):
+            self.index_product(product)
+            count += 1
+            if count % 1000 == 0:
+                await asyncio.sleep(0)
+        self._terms = sorted(self._postings)
+        self.ready = True
+        logger.info(f"Suggestion index built with {count} products, {len(self._terms)} terms")
+
+    async def _run(self, db: AsyncIOMotorDatabase) -> None:
+        try:
+            await self.build(db)
+        except Exception as e:
+            logger.error(f"Suggestion index failed to build, using Mongo regex: {str(e)}")
+
+    def start(self, db: AsyncIOMotorDatabase) -> None:
+        """Build the index in the background; suggestions use Mongo until ready"""
+        self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+
+# Global instance
+suggestion_index = SuggestionIndex()
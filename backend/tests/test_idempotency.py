@@ -0,0 +1,96 @@
+"""
+Tests for Idempotency-Key handling on POST /api/orders
+
+Tests cover:
+- A retry with the same key and body replays the first order
+- The same key with a different body is rejected with 422
+- Concurrent requests with one key create a single order
+"""
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+if not BASE_URL:
+    BASE_URL = "https://store-rebuild-3.preview.emergentagent.com"
+
+# Credentials
+ADMIN_EMAIL = "admin@ystore.com"
+ADMIN_PASSWORD = "admin"
+
+SHIPPING_ADDRESS = {
+    "street": "TEST Street 1", "city": "Kyiv", "state": "Kyiv",
+    "postal_code": "01001", "country": "UA"
+}
+
+
+class TestIdempotentOrders:
+    """Order creation runs once per Idempotency-Key"""
+
+    @pytest.fixture(scope="class")
+    def auth_headers(self):
+        """Headers with admin auth token"""
+        response = requests.post(
+            f"{BASE_URL}/api/auth/login",
+            json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD}
+        )
+        assert response.status_code == 200, f"Login failed: {response.text}"
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    @pytest.fixture(scope="class")
+    def product_id(self, auth_headers):
+        """A product with enough stock for every order below"""
+        categories = requests.get(f"{BASE_URL}/api/categories").json()
+        if not categories:
+            pytest.skip("No categories to create a product in")
+        response = requests.post(
+            f"{BASE_URL}/api/products",
+            json={"title": f"TEST Idempotency {uuid.uuid4().hex[:8]}", "description": "d",
+                  "category_id": categories[0]["id"], "price": 10.0, "stock_level": 100},
+            headers=auth_headers
+        )
+        assert response.status_code == 200, f"Product creation failed: {response.text}"
+        return response.json()["id"]
+
+    def _order(self, auth_headers, key, product_id, quantity=1):
+        return requests.post(
+            f"{BASE_URL}/api/orders",
+            json={"items": [{"product_id": product_id, "quantity": quantity}],
+                  "shipping_address": SHIPPING_ADDRESS, "delivery_price": 0},
+            headers={**auth_headers, "Idempotency-Key": key}
+        )
+
+    def test_retry_replays_first_order(self, auth_headers, product_id):
+        """The same key and body return the stored order"""
+        key = f"test-{uuid.uuid4()}"
+        first = self._order(auth_headers, key, product_id)
+        assert first.status_code == 200, f"Order failed: {first.text}"
+
+        retry = self._order(auth_headers, key, product_id)
+        assert retry.status_code == 200
+        assert retry.json()["id"] == first.json()["id"]
+        assert retry.headers.get("Idempotent-Replayed") == "true"
+        print(f"✓ Retry replayed order {first.json()['order_number']}")
+
+    def test_different_body_is_rejected(self, auth_headers, product_id):
+        """Reusing a key for another request returns 422"""
+        key = f"test-{uuid.uuid4()}"
+        assert self._order(auth_headers, key, product_id).status_code == 200
+
+        response = self._order(auth_headers, key, product_id, quantity=2)
+        assert response.status_code == 422, f"Expected 422, got {response.status_code}: {response.text}"
+        print(f"✓ Different body with the same key rejected")
+
+    def test_concurrent_requests_create_one_order(self, auth_headers, product_id):
+        """Simultaneous requests with one key share a single order"""
+        key = f"test-{uuid.uuid4()}"
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            responses = list(pool.map(lambda _: self._order(auth_headers, key, product_id), range(5)))
+
+        assert all(r.status_code == 200 for r in responses), [r.text for r in responses]
+        order_ids = {r.json()["id"] for r in responses}
+        assert len(order_ids) == 1, f"Expected one order, got {len(order_ids)}"
+        print(f"✓ 5 concurrent requests created one order")
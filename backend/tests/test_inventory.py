@@ -0,0 +1,113 @@
+"""
+Tests for stock reservation on order creation (POST /api/orders)
+
+Tests cover:
+- Cash on delivery orders take their stock right away
+- Orders paid online hold their stock until the payment is confirmed
+- Cancelling an order gives its stock back
+- Orders beyond the available stock are rejected without taking any
+"""
+import os
+import uuid
+
+import pytest
+import requests
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+if not BASE_URL:
+    BASE_URL = "https://store-rebuild-3.preview.emergentagent.com"
+
+# Credentials
+ADMIN_EMAIL = "admin@ystore.com"
+ADMIN_PASSWORD = "admin"
+
+SHIPPING_ADDRESS = {
+    "street": "TEST Street 1", "city": "Kyiv", "state": "Kyiv",
+    "postal_code": "01001", "country": "UA"
+}
+INITIAL_STOCK = 5
+
+
+class TestInventory:
+    """Orders reserve stock by payment method"""
+
+    @pytest.fixture(scope="class")
+    def auth_headers(self):
+        """Headers with admin auth token"""
+        response = requests.post(
+            f"{BASE_URL}/api/auth/login",
+            json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD}
+        )
+        assert response.status_code == 200, f"Login failed: {response.text}"
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    @pytest.fixture(scope="class")
+    def product_id(self, auth_headers):
+        """A product with INITIAL_STOCK units"""
+        categories = requests.get(f"{BASE_URL}/api/categories").json()
+        if not categories:
+            pytest.skip("No categories to create a product in")
+        response = requests.post(
+            f"{BASE_URL}/api/products",
+            json={"title": f"TEST Inventory {uuid.uuid4().hex[:8]}", "description": "d",
+                  "category_id": categories[0]["id"], "price": 10.0, "stock_level": INITIAL_STOCK},
+            headers=auth_headers
+        )
+        assert response.status_code == 200, f"Product creation failed: {response.text}"
+        return response.json()["id"]
+
+    @pytest.fixture(scope="class")
+    def online_order(self, auth_headers, product_id):
+        """An order of 1 unit waiting for its online payment, with the stock seen before it"""
+        stock_before = self._stock(product_id)
+        response = self._order(auth_headers, product_id, 1, "online")
+        assert response.status_code == 200, f"Order failed: {response.text}"
+        return {"order": response.json(), "stock_before": stock_before}
+
+    def _order(self, auth_headers, product_id, quantity, payment_method):
+        return requests.post(
+            f"{BASE_URL}/api/orders",
+            json={"items": [{"product_id": product_id, "quantity": quantity}],
+                  "shipping_address": SHIPPING_ADDRESS, "delivery_price": 0,
+                  "payment_method": payment_method},
+            headers=auth_headers
+        )
+
+    def _stock(self, product_id):
+        response = requests.get(f"{BASE_URL}/api/products/{product_id}")
+        assert response.status_code == 200
+        return response.json()["stock_level"]
+
+    def test_cash_on_delivery_takes_stock(self, auth_headers, product_id):
+        """A cash on delivery order lowers the stock immediately"""
+        before = self._stock(product_id)
+        response = self._order(auth_headers, product_id, 2, "cash_on_delivery")
+        assert response.status_code == 200, f"Order failed: {response.text}"
+        assert self._stock(product_id) == before - 2
+        print(f"✓ Cash on delivery order took 2 units")
+
+    def test_online_order_holds_stock(self, product_id, online_order):
+        """An unpaid online order keeps its units out of stock"""
+        assert online_order["order"]["payment_status"] == "pending"
+        assert self._stock(product_id) == online_order["stock_before"] - 1
+        print(f"✓ Online order holds 1 unit until payment")
+
+    def test_cancel_returns_held_stock(self, auth_headers, product_id, online_order):
+        """Cancelling the unpaid order gives its unit back"""
+        before = self._stock(product_id)
+        response = requests.put(
+            f"{BASE_URL}/api/crm/order/{online_order['order']['id']}/status",
+            params={"status": "cancelled"},
+            headers=auth_headers
+        )
+        assert response.status_code == 200, f"Cancel failed: {response.text}"
+        assert self._stock(product_id) == before + 1
+        print(f"✓ Cancelled order returned its unit")
+
+    def test_order_beyond_stock_is_rejected(self, auth_headers, product_id):
+        """Asking for more than is left fails and takes nothing"""
+        before = self._stock(product_id)
+        response = self._order(auth_headers, product_id, before + 1, "cash_on_delivery")
+        assert response.status_code == 409, f"Expected 409, got {response.status_code}: {response.text}"
+        assert self._stock(product_id) == before
+        print(f"✓ Order beyond stock rejected with 409")
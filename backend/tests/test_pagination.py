@@ -0,0 +1,116 @@
+"""
+Tests for keyset (cursor) pagination of GET /api/products
+
+Tests cover:
+- Walking every sort order page by page returns each product once
+- Products with equal sort keys are split across pages without loss
+- The cursor walk matches the order of a single unpaginated request
+"""
+import os
+import uuid
+
+import pytest
+import requests
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+if not BASE_URL:
+    BASE_URL = "https://store-rebuild-3.preview.emergentagent.com"
+
+# Credentials
+ADMIN_EMAIL = "admin@ystore.com"
+ADMIN_PASSWORD = "admin"
+
+SORT_MODES = ["newest", "price_asc", "price_desc", "rating", "popularity", "trending"]
+# Repeated prices so every sort order has ties to break by id
+PRICES = [10.0, 10.0, 10.0, 20.0, 20.0, 30.0, 30.0]
+
+
+class TestProductCursors:
+    """Cursor pages over a category of products with tied sort keys"""
+
+    @pytest.fixture(scope="class")
+    def auth_headers(self):
+        """Headers with admin auth token"""
+        response = requests.post(
+            f"{BASE_URL}/api/auth/login",
+            json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD}
+        )
+        assert response.status_code == 200, f"Login failed: {response.text}"
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    @pytest.fixture(scope="class")
+    def category_id(self, auth_headers):
+        """A new category holding only the products created here"""
+        run = uuid.uuid4().hex[:8]
+        response = requests.post(
+            f"{BASE_URL}/api/categories",
+            json={"name": f"TEST Cursors {run}", "slug": f"test-cursors-{run}"},
+            headers=auth_headers
+        )
+        assert response.status_code == 200, f"Category creation failed: {response.text}"
+        category_id = response.json()["id"]
+
+        for i, price in enumerate(PRICES):
+            response = requests.post(
+                f"{BASE_URL}/api/products",
+                json={"title": f"TEST Cursor {run} {i}", "description": "d",
+                      "category_id": category_id, "price": price, "stock_level": 1},
+                headers=auth_headers
+            )
+            assert response.status_code == 200, f"Product creation failed: {response.text}"
+        return category_id
+
+    def _walk(self, category_id, sort_by, limit):
+        ids, cursor, pages = [], "", 0
+        while cursor is not None:
+            response = requests.get(
+                f"{BASE_URL}/api/products",
+                params={"category_id": category_id, "sort_by": sort_by, "limit": limit, "cursor": cursor}
+            )
+            assert response.status_code == 200, f"Page failed: {response.text}"
+            data = response.json()
+            ids += [p["id"] for p in data["items"]]
+            cursor = data["next_cursor"]
+            pages += 1
+            assert pages <= len(PRICES) + 1, "Cursor walk does not terminate"
+        return ids
+
+    @pytest.mark.parametrize("sort_by", SORT_MODES)
+    def test_walk_returns_every_product_once(self, category_id, sort_by):
+        """Pages of two cover the category without gaps or repeats"""
+        ids = self._walk(category_id, sort_by, limit=2)
+        assert len(ids) == len(PRICES), f"{sort_by}: expected {len(PRICES)} products, got {len(ids)}"
+        assert len(set(ids)) == len(ids), f"{sort_by}: products repeated across pages"
+        print(f"✓ {sort_by}: {len(ids)} products, no repeats")
+
+    @pytest.mark.parametrize("sort_by", SORT_MODES)
+    def test_walk_matches_single_page(self, category_id, sort_by):
+        """The cursor order equals the order of one large page"""
+        response = requests.get(
+            f"{BASE_URL}/api/products",
+            params={"category_id": category_id, "sort_by": sort_by, "limit": 50}
+        )
+        assert response.status_code == 200
+        expected = [p["id"] for p in response.json()]
+        assert self._walk(category_id, sort_by, limit=3) == expected
+        print(f"✓ {sort_by}: cursor order matches single page")
+
+    def test_ties_are_ordered_by_price_then_id(self, category_id):
+        """price_asc breaks ties between equal prices by id"""
+        response = requests.get(
+            f"{BASE_URL}/api/products",
+            params={"category_id": category_id, "sort_by": "price_asc", "limit": 50, "cursor": ""}
+        )
+        items = response.json()["items"]
+        keys = [(p["price"], p["id"]) for p in items]
+        assert keys == sorted(keys), f"Unexpected order: {keys}"
+        print(f"✓ Equal prices ordered by id")
+
+    def test_next_cursor_header(self, category_id):
+        """A full page sends its cursor in X-Next-Cursor too"""
+        response = requests.get(
+            f"{BASE_URL}/api/products",
+            params={"category_id": category_id, "limit": 2, "cursor": ""}
+        )
+        assert response.headers.get("X-Next-Cursor") == response.json()["next_cursor"]
+        print(f"✓ X-Next-Cursor header matches next_cursor")
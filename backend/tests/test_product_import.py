@@ -0,0 +1,103 @@
+"""
+Tests for bulk product import (POST /api/products/import)
+
+Re-importing the same file must update the products it created, never add
+new rows: rows are matched by SKU, otherwise by the slug given in the row.
+"""
+import json
+import os
+import uuid
+
+import pytest
+import requests
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+if not BASE_URL:
+    BASE_URL = "https://store-rebuild-3.preview.emergentagent.com"
+
+# Credentials
+ADMIN_EMAIL = "admin@ystore.com"
+ADMIN_PASSWORD = "admin"
+
+
+class TestProductImport:
+    """Import upserts by SKU or slug"""
+
+    @pytest.fixture(scope="class")
+    def auth_headers(self):
+        """Headers with admin auth token"""
+        response = requests.post(
+            f"{BASE_URL}/api/auth/login",
+            json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD}
+        )
+        assert response.status_code == 200, f"Login failed: {response.text}"
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    @pytest.fixture(scope="class")
+    def category_id(self):
+        """Any existing category"""
+        categories = requests.get(f"{BASE_URL}/api/categories").json()
+        if not categories:
+            pytest.skip("No categories to import into")
+        return categories[0]["id"]
+
+    @pytest.fixture(scope="class")
+    def ndjson_file(self, category_id):
+        """Two rows keyed by slug and one keyed by SKU"""
+        run = uuid.uuid4().hex[:8]
+        rows = [
+            {"title": f"TEST Import Slug A {run}", "slug": f"test-import-a-{run}",
+             "description": "d", "category_id": category_id, "price": 10.0, "stock_level": 5},
+            {"title": f"TEST Import Slug B {run}", "slug": f"test-import-b-{run}",
+             "description": "d", "category_id": category_id, "price": 20.0, "stock_level": 5},
+            {"title": f"TEST Import SKU {run}", "sku": f"TEST-SKU-{run}",
+             "description": "d", "category_id": category_id, "price": 30.0, "stock_level": 5},
+        ]
+        return run, "\n".join(json.dumps(row) for row in rows) + "\n"
+
+    def _import(self, auth_headers, body):
+        response = requests.post(
+            f"{BASE_URL}/api/products/import",
+            params={"format": "ndjson"},
+            data=body.encode("utf-8"),
+            headers={**auth_headers, "Content-Type": "application/x-ndjson"}
+        )
+        assert response.status_code == 200, f"Import failed: {response.text}"
+        return response.json()
+
+    def _imported(self, auth_headers, run):
+        products = requests.get(f"{BASE_URL}/api/seller/products", headers=auth_headers).json()
+        return [p for p in products if run in p["title"]]
+
+    def test_first_import_inserts(self, auth_headers, ndjson_file):
+        """A new file inserts every row"""
+        run, body = ndjson_file
+        report = self._import(auth_headers, body)
+        assert report["received"] == 3
+        assert report["inserted"] == 3, f"Unexpected report: {report}"
+        assert report["failed"] == 0
+        assert len(self._imported(auth_headers, run)) == 3
+        print(f"✓ First import inserted 3 products")
+
+    def test_reimport_adds_no_rows(self, auth_headers, ndjson_file):
+        """The same file again updates the same products"""
+        run, body = ndjson_file
+        report = self._import(auth_headers, body)
+        assert report["inserted"] == 0, f"Re-import inserted duplicates: {report}"
+        assert report["updated"] == 3
+
+        products = self._imported(auth_headers, run)
+        assert len(products) == 3, f"Expected 3 products, found {len(products)}"
+        assert {p["slug"] for p in products} >= {f"test-import-a-{run}", f"test-import-b-{run}"}
+        print(f"✓ Re-import updated 3 products and inserted none")
+
+    def test_reimport_applies_changes(self, auth_headers, ndjson_file):
+        """Changed fields of an existing row are written"""
+        run, body = ndjson_file
+        changed = body.replace('"price": 10.0', '"price": 11.5')
+        report = self._import(auth_headers, changed)
+        assert report["inserted"] == 0
+
+        products = {p["slug"]: p for p in self._imported(auth_headers, run)}
+        assert products[f"test-import-a-{run}"]["price"] == 11.5
+        print(f"✓ Re-import updated the price in place")
@@ -0,0 +1,48 @@
+"""
+Tests for unique product slugs (POST /api/products)
+
+Tests cover:
+- Reusing a slug is rejected with 409 instead of a server error
+"""
+import os
+import uuid
+
+import pytest
+import requests
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+if not BASE_URL:
+    BASE_URL = "https://store-rebuild-3.preview.emergentagent.com"
+
+# Credentials
+ADMIN_EMAIL = "admin@ystore.com"
+ADMIN_PASSWORD = "admin"
+
+
+class TestProductSlugs:
+    """A seller's slugs are unique"""
+
+    @pytest.fixture(scope="class")
+    def auth_headers(self):
+        """Headers with admin auth token"""
+        response = requests.post(
+            f"{BASE_URL}/api/auth/login",
+            json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD}
+        )
+        assert response.status_code == 200, f"Login failed: {response.text}"
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    def test_reused_slug_is_rejected(self, auth_headers):
+        """The second product with a slug gets 409"""
+        categories = requests.get(f"{BASE_URL}/api/categories").json()
+        if not categories:
+            pytest.skip("No categories to create a product in")
+        slug = f"test-slug-{uuid.uuid4().hex[:8]}"
+        product = {"title": f"TEST Slug {slug}", "slug": slug, "description": "d",
+                   "category_id": categories[0]["id"], "price": 10.0, "stock_level": 1}
+
+        response = requests.post(f"{BASE_URL}/api/products", json=product, headers=auth_headers)
+        assert response.status_code == 200, f"Product creation failed: {response.text}"
+        response = requests.post(f"{BASE_URL}/api/products", json=product, headers=auth_headers)
+        assert response.status_code == 409, f"Expected 409, got {response.status_code}: {response.text}"
+        print(f"✓ Reused slug rejected with 409")
@@ -0,0 +1,69 @@
+"""
+Tests for the search analyzer and in-process index (search_service)
+
+Tests cover:
+- Singular and plural English forms stem to the same term
+- A singular query finds plural titles and the other way round
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_service import SearchIndex, analyze, stem  # noqa: E402
+
+PLURALS = [
+    ("phone", "phones"),
+    ("case", "cases"),
+    ("cable", "cables"),
+    ("box", "boxes"),
+    ("watch", "watches"),
+    ("brush", "brushes"),
+    ("glass", "glasses"),
+    ("battery", "batteries"),
+]
+
+
+class TestStemmer:
+    """Light English stemming"""
+
+    @pytest.mark.parametrize("singular,plural", PLURALS)
+    def test_singular_and_plural_stem_alike(self, singular, plural):
+        """Both forms of a word give one term"""
+        assert stem(singular) == stem(plural), f"{singular}->{stem(singular)}, {plural}->{stem(plural)}"
+        print(f"✓ {singular} / {plural} -> {stem(plural)}")
+
+    def test_double_s_is_kept(self):
+        """Words ending in "ss" are not plurals"""
+        assert stem("dress") == "dress"
+        print(f"✓ dress is left alone")
+
+    def test_analyze_lowercases_and_stems(self):
+        """The full chain normalizes before stemming"""
+        assert analyze("USB Cables") == ["usb", "cable"]
+        print(f"✓ analyze('USB Cables') == ['usb', 'cable']")
+
+
+class TestSearchPlurals:
+    """Queries match titles regardless of number"""
+
+    @pytest.fixture(scope="class")
+    def index(self, tmp_path_factory):
+        """An index over a few products, never persisted"""
+        index = SearchIndex(snapshot_path=str(tmp_path_factory.mktemp("search") / "index.json.gz"))
+        for product_id, title in [("p1", "iPhone cases"), ("p2", "USB cable"), ("p3", "Watch straps")]:
+            index.index_product({"id": product_id, "title": title, "status": "published"})
+        return index
+
+    @pytest.mark.parametrize("query,expected", [
+        ("case", "p1"),
+        ("cables", "p2"),
+        ("watches", "p3"),
+        ("strap", "p3"),
+    ])
+    def test_query_finds_other_number(self, index, query, expected):
+        """A singular query finds plural titles and vice versa"""
+        assert expected in index.search(query), f"search({query!r}) missed {expected}"
+        print(f"✓ search({query!r}) finds {expected}")
@@ -0,0 +1,96 @@
+"""
+Tests for the materialized seller dashboard stats (GET /api/seller/stats)
+
+Tests cover:
+- Creating and deleting a product moves total_products once the buffered
+  changes are flushed
+- Daily stats are zero-filled, oldest first
+"""
+import os
+import time
+import uuid
+
+import pytest
+import requests
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+if not BASE_URL:
+    BASE_URL = "https://store-rebuild-3.preview.emergentagent.com"
+
+# Credentials
+ADMIN_EMAIL = "admin@ystore.com"
+ADMIN_PASSWORD = "admin"
+
+# SELLER_STATS_FLUSH_INTERVAL defaults to 5 seconds
+FLUSH_INTERVAL_SECONDS = 5
+FLUSH_WAIT_SECONDS = 4 * FLUSH_INTERVAL_SECONDS
+
+
+class TestSellerStats:
+    """Seller stats follow product changes"""
+
+    @pytest.fixture(scope="class")
+    def auth_headers(self):
+        """Headers with admin auth token"""
+        response = requests.post(
+            f"{BASE_URL}/api/auth/login",
+            json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD}
+        )
+        assert response.status_code == 200, f"Login failed: {response.text}"
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    def _total_products(self, auth_headers):
+        response = requests.get(f"{BASE_URL}/api/seller/stats", headers=auth_headers)
+        assert response.status_code == 200, f"Stats failed: {response.text}"
+        return response.json()["total_products"]
+
+    def _settled_total(self, auth_headers):
+        """total_products once changes made by earlier tests are flushed"""
+        deadline = time.monotonic() + FLUSH_WAIT_SECONDS
+        total = self._total_products(auth_headers)
+        while time.monotonic() < deadline:
+            time.sleep(FLUSH_INTERVAL_SECONDS + 1)
+            previous, total = total, self._total_products(auth_headers)
+            if total == previous:
+                return total
+        pytest.fail(f"total_products still changing after {FLUSH_WAIT_SECONDS}s")
+
+    def _wait_for_total(self, auth_headers, expected):
+        deadline = time.monotonic() + FLUSH_WAIT_SECONDS
+        total = self._total_products(auth_headers)
+        while total != expected and time.monotonic() < deadline:
+            time.sleep(1)
+            total = self._total_products(auth_headers)
+        return total
+
+    def test_product_changes_reach_stats(self, auth_headers):
+        """total_products goes up for a new product and back down on delete"""
+        categories = requests.get(f"{BASE_URL}/api/categories").json()
+        if not categories:
+            pytest.skip("No categories to create a product in")
+        before = self._settled_total(auth_headers)
+
+        response = requests.post(
+            f"{BASE_URL}/api/products",
+            json={"title": f"TEST Seller Stats {uuid.uuid4().hex[:8]}", "description": "d",
+                  "category_id": categories[0]["id"], "price": 10.0, "stock_level": 1},
+            headers=auth_headers
+        )
+        assert response.status_code == 200, f"Product creation failed: {response.text}"
+        assert self._wait_for_total(auth_headers, before + 1) == before + 1
+        print(f"✓ New product counted")
+
+        response = requests.delete(f"{BASE_URL}/api/products/{response.json()['id']}", headers=auth_headers)
+        assert response.status_code == 200, f"Delete failed: {response.text}"
+        assert self._wait_for_total(auth_headers, before) == before
+        print(f"✓ Deleted product no longer counted")
+
+    def test_daily_stats_are_zero_filled(self, auth_headers):
+        """One bucket per requested day, oldest first"""
+        response = requests.get(f"{BASE_URL}/api/seller/stats/daily", params={"days": 7}, headers=auth_headers)
+        assert response.status_code == 200, f"Daily stats failed: {response.text}"
+        days = response.json()
+        assert len(days) == 7
+        assert [d["date"] for d in days] == sorted(d["date"] for d in days)
+        assert all({"revenue", "orders", "lines"} <= set(d) for d in days)
+        print(f"✓ Daily stats return 7 zero-filled buckets")
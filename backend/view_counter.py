@@ -0,0 +1,127 @@
+"""
+Product View Counter
+Write-behind aggregation of product views
+
+Views are counted in memory per product id and flushed periodically as one
+unordered bulk_write, so a hot product costs one update per flush instead of
+one per view. Each flush also maintains a time-decayed trending score:
+
+    trending_score  decayed view count as of trending_at
+    trending_rank   log2(trending_score) + half-lives elapsed since TRENDING_EPOCH
+
+Ordering by trending_rank equals ordering by the score decayed to "now" for
+every product at once, so the `trending` sort can use a plain index.
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+import catalog_sync
+from config import TRENDING_HALF_LIFE_HOURS, VIEW_FLUSH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+TRENDING_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _view_update(views: int, now: datetime, half_life_ms: float) -> list:
+    """Update pipeline adding `views` to the raw counter and the decayed score"""
+    elapsed = {"$subtract": [now, {"$ifNull": ["$trending_at", now]}]}
+    decay = {"$pow": [0.5, {"$divide": [elapsed, half_life_ms]}]}
+    return [
+        {"$set": {
+            "views_count": {"$add": [{"$ifNull": ["$views_count", 0]}, views]},
+            "trending_score": {"$add": [{"$multiply": [{"$ifNull": ["$trending_score", 0]}, decay]}, views]},
+            "trending_at": now,
+        }},
+        {"$set": {
+            "trending_rank": {"$add": [
+                {"$log": ["$trending_score", 2]},
+                (now - TRENDING_EPOCH).total_seconds() * 1000 / half_life_ms,
+            ]},
+        }},
+    ]
+
+
+class ViewCounter:
+    """Accumulates product views and flushes them in batches"""
+
+    def __init__(self, interval: int = VIEW_FLUSH_INTERVAL, half_life_hours: float = TRENDING_HALF_LIFE_HOURS):
+        self.interval = interval
+        self.half_life_ms = half_life_hours * 3600 * 1000
+        self._pending: Dict[str, int] = {}
+        self._db: Optional[AsyncIOMotorDatabase] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    def record(self, product_id: str, views: int = 1) -> None:
+        """Count a view; nothing is written until the next flush"""
+        self._pending[product_id] = self._pending.get(product_id, 0) + views
+
+    @property
+    def pending(self) -> int:
+        return sum(self._pending.values())
+
+    async def flush(self) -> int:
+        """Write accumulated views; returns the number of products updated"""
+        if self._db is None:
+            return 0
+        async with self._lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, {}
+            product_ids = list(pending)
+            now = datetime.now(timezone.utc)
+            operations = [
+                UpdateOne({"id": product_id}, _view_update(pending[product_id], now, self.half_life_ms))
+                for product_id in product_ids
+            ]
+            # Keep the counts of failed updates for the next attempt
+            try:
+                await self._db.products.bulk_write(operations, ordered=False)
+                failed = set()
+            except BulkWriteError as e:
+                failed = {product_ids[error["index"]] for error in e.details.get("writeErrors", [])}
+                logger.error(f"Failed to flush {len(failed)} product view counters: {str(e)}")
+            except Exception as e:
+                failed = set(product_ids)
+                logger.error(f"Failed to flush {len(failed)} product view counters: {str(e)}")
+            for product_id in failed:
+                self.record(product_id, pending[product_id])
+
+            written = [product_id for product_id in product_ids if product_id not in failed]
+            if not written:
+                return 0
+            projection = {"_id": 0, "id": 1, "views_count": 1, "trending_rank": 1}
+            async for product in self._db.products.find({"id": {"$in": written}}, projection):
+                catalog_sync.product_views_changed(
+                    product["id"], product.get("views_count"), product.get("trending_rank")
+                )
+            return len(written)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            # Shielded so stop() never cancels a flush halfway through
+            await asyncio.shield(self.flush())
+
+    def start(self, db: AsyncIOMotorDatabase) -> None:
+        """Start flushing periodically"""
+        self._db = db
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the periodic flush and write what is still pending"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+
+# Global instance
+view_counter = ViewCounter()